@@ -0,0 +1,705 @@
+import asyncio
+import logging
+import os
+import time
+
+import serial
+
+from AuroraErrorCodes import log_reply
+from AuroraCRC16 import check_reply
+from AuroraBX import BX_START_BYTES, BX_HEADER_SIZE, bx_reply_length, bx_reply_decode, bx_reply_options
+from AuroraTX import tx_reply_decode, tx_reply_options
+from AuroraDriver import HelperClass, PortHandleInfo
+from AuroraPortStatus import decode_port_status
+from AuroraToolCache import CHUNK_SIZE, DEFINITION_SIZE, chunks
+from AuroraLogging import get_logger, enable_console_logging
+
+log = get_logger("async")
+
+# After a timeout the reader is drained until it stays quiet this long (seconds) before the next command
+FLUSH_QUIET_TIME = 0.05
+
+
+async def open_serial_streams(serial_port, baudrate=9600):
+    """
+    Opens a serial port as an asyncio (reader, writer) pair.
+    Uses pyserial-asyncio when it is installed, otherwise watches the port's file descriptor on the running event loop
+    (POSIX only).
+    """
+    try:
+        import serial_asyncio
+    except ImportError:
+        serial_asyncio = None
+    if(serial_asyncio is not None):
+        return await serial_asyncio.open_serial_connection(url=serial_port, baudrate=baudrate)
+    if(os.name == "nt"):
+        raise NotImplementedError("Install pyserial-asyncio to use AsyncNDI_Aurora on Windows")
+    ser = serial.Serial(serial_port, baudrate, timeout=0)
+    return SerialStreamTransport(ser, asyncio.get_running_loop()).streams()
+
+
+def serial_of(writer):
+    """
+    pyserial port behind a writer of open_serial_streams (SerialStreamWriter or pyserial-asyncio), None for other streams
+    """
+    transport = getattr(writer, "transport", None)
+    return getattr(transport, "ser", None) or getattr(transport, "serial", None)
+
+
+class SerialStreamTransport:
+    """
+    Minimal non-blocking transport for a pyserial port.
+    Incoming bytes are fed to an asyncio.StreamReader from the event loop's reader callback, outgoing bytes are written
+    with os.write and the remainder is flushed when the port becomes writable again.
+    """
+    def __init__(self, ser, loop):
+        self.ser = ser
+        self.loop = loop
+        self.fd = ser.fileno()
+        os.set_blocking(self.fd, False)
+        self.reader = asyncio.StreamReader()
+        self._write_buffer = bytearray()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        loop.add_reader(self.fd, self._on_readable)
+
+    def streams(self):
+        return self.reader, SerialStreamWriter(self)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.loop.remove_reader(self.fd)
+            self.reader.set_exception(e)
+            return
+        if(data):
+            self.reader.feed_data(data)
+
+    def write(self, data):
+        if(self._write_buffer):
+            self._write_buffer += data
+            return
+        try:
+            written = os.write(self.fd, data)
+        except BlockingIOError:
+            written = 0
+        if(written < len(data)):
+            self._write_buffer += data[written:]
+            self._drained.clear()
+            self.loop.add_writer(self.fd, self._on_writable)
+
+    def _on_writable(self):
+        try:
+            written = os.write(self.fd, self._write_buffer)
+        except BlockingIOError:
+            return
+        del self._write_buffer[:written]
+        if(not self._write_buffer):
+            self.loop.remove_writer(self.fd)
+            self._drained.set()
+
+    async def drain(self):
+        await self._drained.wait()
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        if(self._write_buffer):
+            self.loop.remove_writer(self.fd)
+        self.reader.feed_eof()
+        self.ser.close()
+
+
+class SerialStreamWriter:
+    """
+    StreamWriter-like object (write, drain, close) for SerialStreamTransport
+    """
+    def __init__(self, transport):
+        self.transport = transport
+
+    def write(self, data):
+        self.transport.write(data)
+
+    async def drain(self):
+        await self.transport.drain()
+
+    def close(self):
+        self.transport.close()
+
+    async def wait_closed(self):
+        pass
+
+
+class AsyncNDI_Aurora:
+    """
+    asyncio version of AuroraDriver.NDI_Aurora.
+    Commands are awaited instead of blocking the event loop, one command/reply exchange runs at a time.
+    Supported commands: APIREV, BEEP, BX, COMM, ECHO, GET, INIT, LED, PENA, PHF, PHSR, PINIT, PPRD, PPWR, PSEL, PSRCH,
+    PVWR, RESET, SFLIST, TSTART, TSTOP, TX and VER, serial breaks, bring_up_tools, load_tool_definitions and
+    negotiate_fastest_link. RESET, serial breaks and baud rate changes need the pyserial port (serial_of(writer), or the
+    ser argument). Not available here: the tool definition and SROM cache (PVWR uploads are always sent), device profiles,
+    the command scheduler, TrackingStream, recording, metrics and session recovery; frames() polls instead.
+    Usage:
+        ndi_obj = await AsyncNDI_Aurora.open("/dev/cu.usbserial-1320")
+        await ndi_obj.init()
+        async for timestamp, frame in ndi_obj.frames():
+            ...
+    """
+    def __init__(self, reader, writer, serial_port=None, debug_mode=False, timeout=10.0, ser=None):
+        """
+        reader/writer: asyncio streams connected to the system, see open_serial_streams
+        timeout: seconds to wait for a reply, the system replies to any command in under 10 seconds
+        ser: the serial port behind the streams, for baud rate changes and serial breaks, found with serial_of by default
+        """
+        self.reader = reader
+        self.writer = writer
+        self.ser = ser if(ser is not None) else serial_of(writer)
+        self.serial_port = serial_port
+        self.set_debug_mode(debug_mode)
+        self.timeout = timeout
+        self.init_flag = False
+        self.port_handles = None
+        self._lock = asyncio.Lock()
+        self._out_of_sync = False # a read was abandoned part way, the rest of that reply may still arrive
+
+    @classmethod
+    async def open(cls, serial_port, baudrate=9600, debug_mode=False, timeout=10.0):
+        reader, writer = await open_serial_streams(serial_port, baudrate)
+        return cls(reader, writer, serial_port, debug_mode, timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_debug_mode(self):
+        return self.debug_mode
+    def set_debug_mode(self, debug_mode):
+        self.debug_mode = debug_mode
+        if(debug_mode):
+            enable_console_logging(logging.DEBUG)
+
+    def get_init_flag(self):
+        return self.init_flag
+    def get_port_handles(self):
+        return self.port_handles
+
+    async def send_command(self, command):
+        """
+        Sends a command and awaits its text reply
+        """
+        reply = await self._exchange(command, self.read_text_reply)
+        reply = reply.decode()
+        if(log.isEnabledFor(logging.INFO)):
+            self.reply_decoder(reply, command)
+        return reply
+
+    async def send_commands(self, commands):
+        """
+        Sends several commands back to back, no other command can run in between
+        Returns the list of replies in the same order
+        """
+        async with self._lock:
+            replies = [(await self._exchange_locked(command, self.read_text_reply)).decode() for command in commands]
+        if(log.isEnabledFor(logging.INFO)):
+            for reply, command in zip(replies, commands):
+                self.reply_decoder(reply, command)
+        return replies
+
+    async def _exchange(self, command, read_reply, before_read=None):
+        async with self._lock:
+            return await self._exchange_locked(command, read_reply, before_read)
+
+    async def _exchange_locked(self, command, read_reply, before_read=None):
+        """
+        Writes a command and awaits read_reply() for at most self.timeout seconds, before_read() runs in between.
+        A timeout or cancellation can interrupt a read after part of the reply was consumed (e.g. the BX header), the
+        reader is then flushed before the next command so its replies are not parsed from the middle of an old one.
+        """
+        if(self._out_of_sync):
+            await self._flush_reader()
+        self.writer.write(bytes(command, 'utf-8'))
+        await self.writer.drain()
+        if(before_read is not None):
+            before_read()
+        try:
+            return await asyncio.wait_for(read_reply(), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._out_of_sync = True
+            raise
+
+    async def _flush_reader(self):
+        # Discards everything the system sends until it is quiet for FLUSH_QUIET_TIME
+        discarded = 0
+        while(True):
+            try:
+                data = await asyncio.wait_for(self.reader.read(4096), FLUSH_QUIET_TIME)
+            except asyncio.TimeoutError:
+                break
+            if(not data):
+                break
+            discarded += len(data)
+        self._out_of_sync = False
+        if(discarded):
+            log.info("Discarded %d bytes of an abandoned reply", discarded)
+
+    def read_text_reply(self):
+        return self.reader.readuntil(b'\r')
+
+    def _serial(self, action):
+        if(self.ser is None):
+            raise RuntimeError(f"{action} needs the serial port, pass it as 'ser'")
+        return self.ser
+
+    async def read_bx_reply(self):
+        """
+        Awaits one reply to a BX command, binary replies are read by the length in their header
+        """
+        header = await self.reader.readexactly(BX_HEADER_SIZE)
+        if(header[:2] != BX_START_BYTES):
+            if(header.endswith(b'\r')):
+                return header
+            return header + await self.reader.readuntil(b'\r')
+        return header + await self.reader.readexactly(bx_reply_length(header) - BX_HEADER_SIZE)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    def reply_decoder(self, reply, command):
+        """
+        Interprets replies including error codes, see AuroraErrorCodes.log_reply
+        """
+        log_reply(log, reply, command)
+
+    # Section 2
+    # Same commands as NDI_Aurora, see the class docstring
+    async def api_rev(self):
+        """
+        Returns the API revision
+        """
+        return await self.send_command("APIREV \r")
+
+    async def beep(self, num_beeps=1):
+        """
+        Generates a beep
+        """
+        if(num_beeps < 1 or num_beeps > 9):
+            log.warning("Keep number of beeps within 1-9")
+            num_beeps = 9
+        return await self.send_command(f"BEEP {num_beeps}\r")
+
+    async def bx(self, reply_option="0001"):
+        """
+        Returns the latest tool transformations and system status in binary format
+        Returns a TrackingFrame, or None if the system replied with an error
+        """
+        if(not reply_option in bx_reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, bx_reply_options)
+            log.warning("Switching to default option '0001'")
+            reply_option = "0001"
+        bx = f"BX {reply_option}\r"
+        reply = await self._exchange(bx, self.read_bx_reply)
+        if(reply[:2] != BX_START_BYTES):
+            if(log.isEnabledFor(logging.INFO)):
+                self.reply_decoder(reply.decode(errors='replace'), bx)
+            return None
+        return bx_reply_decode(reply)
+
+    async def comm(self, baud_rate="0", data_bits="0", parity="0", stop_bits="0", hardware_handshaking="0"):
+        """
+        Sets the serial connection settings for the system
+        Syntax:
+            COMM<SPACE><Baud Rate><Data Bits><Parity><Stop Bits><Hardware Handshaking><CR>
+        """
+        valid_options = [
+            ["0", "1", "2", "3", "4", "5", "6", "A"],
+            ["0", "1"],
+            ["0", "1", "2"],
+            ["0", "1"],
+            ["0", "1"]
+        ]
+        user_parameters = [baud_rate, data_bits, parity, stop_bits, hardware_handshaking]
+        parameter_names = ["Baud rate", "Data bits", "Parity", "Stop bits", "Hardware handshaking"]
+        valid_command = True
+        for param, options, name in zip(user_parameters, valid_options, parameter_names):
+            if(not param in options):
+                log.warning("Failure - %s: %s", name, param)
+                log.warning("Select an option from %s", options)
+                valid_command = False
+        if(valid_command):
+            return await self.send_command(f"COMM {baud_rate}{data_bits}{parity}{stop_bits}{hardware_handshaking}\r")
+
+    async def negotiate_fastest_link(self, max_baud_rate=921600, hardware_handshaking=False, probe_timeout=0.5):
+        """
+        Moves the system and the host serial port to the fastest baud rate both support, see
+        NDI_Aurora.negotiate_fastest_link. Returns the baud rate in use afterwards.
+        """
+        ser = self._serial("negotiate_fastest_link")
+        previous_timeout = self.timeout
+        self.timeout = probe_timeout
+        try:
+            api_revision = (await self.api_rev()).strip()[:-4]
+            firmware = (await self.send_command("VER 5\r")).strip()[:-4]
+            fast_rates_supported = HelperClass.firmware_supports_fast_baud_rates(api_revision, firmware)
+            candidates = [(code, rate) for code, rate in HelperClass.baud_rate_options.items()
+                          if rate <= max_baud_rate and rate != 19200 and (fast_rates_supported or rate <= 115200)]
+            candidates.sort(key=lambda option: option[1], reverse=True)
+            handshaking = "1" if(hardware_handshaking) else "0"
+            for code, rate in candidates:
+                if(rate == ser.baudrate and await self.echo_check()):
+                    return rate
+                if(await self.change_link_baud_rate(code, rate, handshaking)):
+                    return rate
+                log.warning("Link check failed at %d baud, falling back", rate)
+                if(not await self.echo_check()):
+                    await self.serial_break()
+            return ser.baudrate
+        finally:
+            self.timeout = previous_timeout
+
+    async def change_link_baud_rate(self, baud_rate_code, baud_rate, hardware_handshaking="0"):
+        """
+        Sends COMM, then switches the host port to the same settings and checks the link with ECHO
+        Returns True if the link works at the new baud rate
+        """
+        ser = self._serial("change_link_baud_rate")
+        reply = await self.comm(baud_rate=baud_rate_code, hardware_handshaking=hardware_handshaking)
+        if(reply is None or not reply.startswith("OKAY")):
+            return False
+        # The system needs ~100 ms after its OKAY reply before the host changes its own settings
+        await asyncio.sleep(0.1)
+        async with self._lock:
+            ser.baudrate = baud_rate
+            ser.rtscts = hardware_handshaking == "1"
+            await self._flush_reader()
+        return await self.echo_check()
+
+    async def echo_check(self, payload="LinkCheck"):
+        """
+        Returns True if ECHO returns exactly the payload with a valid CRC16
+        """
+        try:
+            reply = await self.send_command(f"ECHO {payload}\r")
+        except (asyncio.TimeoutError, UnicodeDecodeError, OSError):
+            return False
+        return reply.endswith("\r") and reply[:-5] == payload and check_reply(reply)
+
+    async def echo(self, reply_str):
+        """
+        Returns exactly what is sent with the command
+        """
+        return await self.send_command(f"ECHO {reply_str}\r")
+
+    async def get(self, user_param="*"):
+        """
+        Returns the values of user parameters, all of them by default
+        """
+        return await self.send_command(f"GET {user_param}\r")
+
+    async def init(self):
+        """
+        Initializes the system
+        """
+        reply = await self.send_command("INIT \r")
+        self.init_flag = reply.startswith("OKAY")
+        return reply
+
+    async def led(self, port_handle="0A", led_number="1", led_state="S"):
+        """
+        Changes the state of visible LEDs on a tool
+        """
+        if(not port_handle in HelperClass.port_handle_options or not led_number in ["1", "2", "3"] or not led_state in ["B", "F", "S"]):
+            log.warning("Failure - LED %s%s%s", port_handle, led_number, led_state)
+            return None
+        return await self.send_command(f"LED {port_handle}{led_number}{led_state}\r")
+
+    async def pena(self, port_handle, tool_tracking_priority="D"):
+        """
+        Enables reporting of transformations for a particular port handle
+        """
+        if(not tool_tracking_priority in ["S", "D", "B"]):
+            log.warning("Invalid option (%s). Select one from ['S', 'D', 'B'].", tool_tracking_priority)
+            log.warning("Switching to dynamic option 'D'")
+            tool_tracking_priority = "D"
+        return await self.send_command(f"PENA {port_handle}{tool_tracking_priority}\r")
+
+    async def phf(self, port_handle):
+        """
+        Releases system resources from an unused port handle
+        """
+        return await self.send_command(f"PHF {port_handle}\r")
+
+    async def phsr(self, option="00"):
+        """
+        Returns the number of assigned port handles and the port status for each one
+        Returns (number of port handles, [(port handle, port handle status), ...], CRC16)
+        """
+        if(not self.get_init_flag()):
+            log.info("Initializing via PHSR")
+            await self.init()
+        if(not option in ["00", "01", "02", "03", "04"]):
+            log.warning("Invalid option (%s). Switching to default option '00'", option)
+            option = "00"
+        reply = await self.send_command(f"PHSR {option}\r")
+        if(reply.startswith("ERROR")):
+            return None
+        decoded = HelperClass.phsr_reply_parse(reply)
+        if(option == "00"):
+            self.port_handles = decoded[1]
+        return decoded
+
+    async def bring_up_tools(self, tool_tracking_priority="D", priorities=None, max_attempts=3, definitions=None):
+        """
+        Frees, initializes and enables the port handles of all connected tools, see NDI_Aurora.bring_up_tools
+        definitions: optional {port handle: tool definition (bytes or .rom path)} uploaded with PVWR before PINIT
+        Returns {port handle: PortHandleInfo} for every port handle reported by PHSR 00 afterwards
+        """
+        if(priorities is None):
+            priorities = {}
+        definitions = definitions or {}
+        if(not self.get_init_flag()):
+            await self.init()
+        errors = {}
+        attempted = set()
+        while(True):
+            # A split port reports its second port handle only after the first one is initialized, so check again
+            to_free = [port_handle for port_handle in await self.phsr_port_handles("01") if not ("PHF", port_handle) in attempted]
+            errors.update(await self.send_with_retries(to_free, lambda port_handle: f"PHF {port_handle}\r", max_attempts))
+            to_init = [port_handle for port_handle in await self.phsr_port_handles("02") if not ("PINIT", port_handle) in attempted]
+            upload_errors = await self.load_tool_definitions({port_handle: definitions[port_handle] for port_handle in to_init
+                                                              if port_handle in definitions})
+            errors.update(upload_errors)
+            errors.update(await self.send_with_retries([port_handle for port_handle in to_init if not port_handle in upload_errors],
+                                                       lambda port_handle: f"PINIT {port_handle}\r", max_attempts))
+            if(not to_free and not to_init):
+                break
+            attempted.update(("PHF", port_handle) for port_handle in to_free)
+            attempted.update(("PINIT", port_handle) for port_handle in to_init)
+        to_enable = await self.phsr_port_handles("03")
+        def pena_command(port_handle):
+            return f"PENA {port_handle}{priorities.get(port_handle, tool_tracking_priority)}\r"
+        errors.update(await self.send_with_retries(to_enable, pena_command, max_attempts))
+
+        decoded = await self.phsr("00")
+        port_handles = [] if(decoded is None) else decoded[1]
+        table = {}
+        for port_handle, port_status in port_handles:
+            status = int(port_status, 16)
+            flags = decode_port_status(status)
+            priority = priorities.get(port_handle, tool_tracking_priority) if(flags.enabled) else None
+            table[port_handle] = PortHandleInfo(port_handle, status, flags.occupied, flags.initialized, flags.enabled,
+                                                priority, errors.get(port_handle))
+        return table
+
+    async def phsr_port_handles(self, option):
+        """
+        Port handles reported by PHSR with the given option, empty on error
+        """
+        decoded = await self.phsr(option)
+        if(decoded is None):
+            return []
+        return [port_handle for port_handle, _ in decoded[1]]
+
+    async def send_with_retries(self, port_handles, make_command, max_attempts=3):
+        """
+        Sends make_command(port_handle) for every port handle back to back, then resends only the failed ones
+        Returns {port handle: last ERROR reply} for port handles that still fail after max_attempts
+        """
+        errors = {}
+        pending = list(port_handles)
+        for _ in range(max_attempts):
+            if(not pending):
+                break
+            replies = await self.send_commands([make_command(port_handle) for port_handle in pending])
+            errors = {port_handle: reply.strip() for port_handle, reply in zip(pending, replies) if not reply.startswith("OKAY")}
+            pending = [port_handle for port_handle in pending if port_handle in errors]
+        return errors
+
+    async def pinit(self, port_handle):
+        """
+        Initializes a port handle
+        """
+        return await self.send_command(f"PINIT {port_handle}\r")
+
+    async def pprd(self, port_handle, address=0):
+        """
+        Reads the 64 bytes at address (a multiple of 64) of the SROM device selected with PSEL, None on error. Raises
+        CRCMismatchError for a corrupted reply.
+        """
+        return HelperClass.pprd_reply_parse(await self.send_command(f"PPRD {port_handle}{address:04X}\r"))
+
+    async def ppwr(self, port_handle, address, data):
+        """
+        Writes one 64 byte chunk at address to the SROM device selected with PSEL, padded with 0xFF. SROM devices are
+        write-once.
+        """
+        chunk = bytes(data).ljust(CHUNK_SIZE, b"\xff")
+        return await self.send_command(f"PPWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+
+    async def psel(self, port_handle, device_id):
+        """
+        Selects a tool SROM device as the target for reading or writing with PPRD or PPWR
+        """
+        return await self.send_command(f"PSEL {port_handle}{device_id}\r")
+
+    async def psrch(self, port_handle):
+        """
+        Returns the SROM device IDs of a tool, None on error
+        """
+        return HelperClass.psrch_reply_parse(await self.send_command(f"PSRCH {port_handle}\r"))
+
+    async def pvwr(self, port_handle, address, data):
+        """
+        Writes one 64 byte chunk of a tool definition at address (0000 to 03C0), padded with zeros
+        """
+        chunk = bytes(data).ljust(CHUNK_SIZE, b"\x00")
+        return await self.send_command(f"PVWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+
+    async def load_tool_definitions(self, definitions):
+        """
+        Uploads tool definitions with PVWR before PINIT, definitions is {port handle: bytes or .rom path}. The 64 byte
+        chunks of all port handles are sent back to back.
+        Returns {port handle: ERROR reply} for the port handles whose upload failed
+        """
+        commands = []
+        owners = []
+        for port_handle, definition in definitions.items():
+            if(isinstance(definition, (bytes, bytearray, memoryview))):
+                data = bytes(definition)
+            else:
+                with open(definition, "rb") as f:
+                    data = f.read()
+            if(not data or len(data) > DEFINITION_SIZE):
+                raise ValueError(f"Tool definition of {len(data)} bytes, 1 to {DEFINITION_SIZE} fit")
+            for address, chunk in chunks(data):
+                commands.append(f"PVWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+                owners.append(port_handle)
+        errors = {}
+        for port_handle, reply in zip(owners, await self.send_commands(commands) if(commands) else []):
+            if(not reply.startswith("OKAY")):
+                errors.setdefault(port_handle, reply.strip())
+        return errors
+
+    async def reset(self, reset_option="0"):
+        """
+        Resets the system, the host port is switched to 9600 baud right after the command is written since the reply
+        already comes at the default settings, see NDI_Aurora.reset
+        """
+        if(not reset_option in ("0", "1")):
+            log.warning("Invalid option (%s). Select one from ['0', '1'].", reset_option)
+            return None
+        ser = self._serial("RESET")
+        def switch_host_port():
+            ser.baudrate = 9600
+            ser.rtscts = False
+        reply = await self._exchange(f"RESET {reset_option}\r", self.read_text_reply, switch_host_port)
+        self.init_flag = False
+        reply = reply.decode(errors='replace')
+        if(log.isEnabledFor(logging.INFO)):
+            self.reply_decoder(reply, f"RESET {reset_option}")
+        return reply
+
+    async def serial_break(self, duration=0.25, reply_timeout=3.0):
+        """
+        Resets the system with a serial break, the host port is switched back to 9600 baud without handshaking
+        Reply:
+            RESET<CRC16><CR>
+        """
+        ser = self._serial("A serial break")
+        async with self._lock:
+            ser.baudrate = 9600
+            ser.rtscts = False
+            await self._flush_reader()
+            # send_break blocks for the break duration
+            await asyncio.get_running_loop().run_in_executor(None, ser.send_break, duration)
+            try:
+                reply = await asyncio.wait_for(self.read_text_reply(), duration + reply_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._out_of_sync = True
+                raise
+        self.init_flag = False
+        return reply.decode(errors='replace')
+
+    async def sflist(self, reply_option="00"):
+        """
+        Returns information about the supported features of the system, reply options 00, 03 and 10, see
+        AuroraCapabilities for the decoded values
+        """
+        if(not reply_option in ["00", "03", "10"]):
+            log.warning("Invalid option (%s). Select one from ['00', '03', '10'].", reply_option)
+            return None
+        return await self.send_command(f"SFLIST {reply_option}\r")
+
+    async def tstart(self, reply_option="00"):
+        """
+        Starts tracking mode
+        """
+        if(not reply_option in ["00", "40", "80", "C0"]):
+            log.warning("Invalid option (%s). Switching to default option '00'", reply_option)
+            reply_option = "00"
+        return await self.send_command(f"TSTART {reply_option}\r")
+
+    async def tstop(self):
+        """
+        Stops tracking mode
+        """
+        return await self.send_command("TSTOP \r")
+
+    async def tx(self, reply_option="0001"):
+        """
+        Returns the latest tool transformations and system status in text format
+        Returns a TrackingFrame, or None if the system replied with an error
+        """
+        if(not reply_option in tx_reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, tx_reply_options)
+            log.warning("Switching to default option '0001'")
+            reply_option = "0001"
+        tx = f"TX {reply_option}\r"
+        reply = await self._exchange(tx, self.read_text_reply)
+        if(reply.startswith(b"ERROR")):
+            if(log.isEnabledFor(logging.INFO)):
+                self.reply_decoder(reply.decode(errors='replace'), tx)
+            return None
+        return tx_reply_decode(reply)
+
+    async def ver(self, reply_option=0):
+        """
+        Returns the firmware revision number of critical processors installed in the system
+        """
+        if(not reply_option in [0, 4, 5, 7, 8]):
+            log.warning("*** Error 'ver' does not have reply option '%s' as a valid option.", reply_option)
+            return None
+        return await self.send_command(f"VER {reply_option}\r")
+
+    async def frames(self, reply_option="0001", skip_duplicates=True, interval=0.0, mode="BX"):
+        """
+        Async iterator over tracking frames, yields (host receive time, TrackingFrame)
+        Tracking mode must already be started with tstart().
+        interval: minimum seconds between polls, 0 polls back to back
+        mode: "BX" (binary) or "TX" (text) replies
+        """
+        modes = {
+            "BX": self.bx,
+            "TX": self.tx
+        }
+        if(not mode in modes):
+            raise ValueError(f"Invalid mode ({mode}). Select one from {list(modes.keys())}.")
+        poll = modes[mode]
+        last_frame_numbers = None
+        while(True):
+            frame = await poll(reply_option)
+            timestamp = time.monotonic()
+            if(frame is not None):
+                frame_numbers = [handle.frame_number for handle in frame.handles]
+                if(not skip_duplicates or frame_numbers != last_frame_numbers):
+                    last_frame_numbers = frame_numbers
+                    yield timestamp, frame
+            if(interval > 0):
+                await asyncio.sleep(interval)
+            else:
+                # Let other tasks run between back to back polls
+                await asyncio.sleep(0)
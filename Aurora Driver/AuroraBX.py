@@ -0,0 +1,146 @@
+import struct
+from collections import namedtuple
+
+from AuroraCRC16 import crc16, CRCMismatchError
+
+# Binary (BX) reply layout, all fields little endian
+# <Start Sequence><Reply Length><Header CRC><Number of Handles>
+# <Handle 1><Handle 1 Status><Reply Option 0001 Data>
+# ...
+# <Handle n><Handle n Status><Reply Option 0001 Data>
+# <System Status><CRC16>
+BX_START_SEQUENCE = 0xA5C4
+BX_START_BYTES = b'\xc4\xa5'
+BX_HEADER = struct.Struct('<HHH')       # start sequence, reply length, header CRC
+BX_HEADER_SIZE = BX_HEADER.size         # 6 bytes
+BX_HANDLE = struct.Struct('<BB')        # port handle, handle status
+BX_TRANSFORM = struct.Struct('<8fII')   # Q0, Qx, Qy, Qz, Tx, Ty, Tz, indicator value, port status, frame number
+BX_MISSING = struct.Struct('<II')       # port status, frame number
+BX_UINT16 = struct.Struct('<H')         # system status, CRC16
+
+HANDLE_VALID = 0x01
+HANDLE_MISSING = 0x02
+HANDLE_DISABLED = 0x04
+
+handle_status_dict = {
+    HANDLE_VALID: "Valid",
+    HANDLE_MISSING: "Missing",
+    HANDLE_DISABLED: "Disabled"
+}
+
+bx_reply_options = {
+    "0001": "Transformation data (default)",
+    "0800": "Out-of-volume transformations, must be OR'd with 0001",
+    "0801": "Transformation data including out-of-volume transformations"
+}
+
+# Port handles are reported as a single byte in BX, keep the 2 character format used everywhere else
+port_handle_names = [f"{i:02X}" for i in range(0x100)]
+
+NAN = float("nan")
+
+# One entry per port handle in a BX/TX reply.
+# Missing handles carry NaN transformations, disabled handles also carry a zero port status and frame number.
+HandleTransform = namedtuple("HandleTransform", [
+    "port_handle", "handle_status",
+    "q0", "qx", "qy", "qz",
+    "tx", "ty", "tz",
+    "error", "port_status", "frame_number"
+])
+
+TrackingFrame = namedtuple("TrackingFrame", ["handles", "system_status"])
+
+
+def bx_reply_length(header):
+    """
+    Returns the total number of bytes of a BX reply from its 6 byte header, including header and trailing CRC16
+    """
+    start_sequence, reply_length, _ = BX_HEADER.unpack_from(header, 0)
+    if(start_sequence != BX_START_SEQUENCE):
+        raise ValueError(f"Not a BX reply, start sequence {start_sequence:04X}")
+    return BX_HEADER_SIZE + reply_length + BX_UINT16.size
+
+
+def read_bx_reply(ser):
+    """
+    Reads one reply to a BX command from a serial port.
+    Binary replies are read by length from their header instead of up to a <CR>, because the data can contain 0x0D.
+    Text replies (ERROR<Error Code><CRC16><CR>) are read up to the <CR>.
+    """
+    header = ser.read(BX_HEADER_SIZE)
+    if(len(header) < BX_HEADER_SIZE):
+        raise TimeoutError(f"BX reply timed out after {len(header)} bytes")
+    if(header[:2] != BX_START_BYTES):
+        if(header.endswith(b'\r')):
+            return header
+        return header + ser.read_until(b'\r')
+    remaining = bx_reply_length(header) - BX_HEADER_SIZE
+    body = ser.read(remaining)
+    if(len(body) < remaining):
+        raise TimeoutError(f"BX reply timed out after {BX_HEADER_SIZE + len(body)} of {BX_HEADER_SIZE + remaining} bytes")
+    return header + body
+
+
+def bx_reply_decode(reply, check_crc=True):
+    """
+    Decodes a complete binary BX reply (reply option 0001, optionally OR'd with 0800)
+    Reply structure:
+        <Start Sequence A5C4><Reply Length><Header CRC> - 2 bytes each
+        <Number of Handles> - 1 byte
+        <Handle n><Handle n Status> - 1 byte each, followed by depending on the status:
+            01 Valid    -> <Q0><Qx><Qy><Qz><Tx><Ty><Tz><Indicator Value> (4 byte floats) <Port Status><Frame Number> (4 byte unsigned)
+            02 Missing  -> <Port Status><Frame Number>
+            04 Disabled -> nothing
+        <System Status><CRC16> - 2 bytes each
+    Accepts bytes, bytearray or memoryview, no copies are made of the reply.
+    Returns a TrackingFrame of HandleTransform tuples and the system status.
+    """
+    view = memoryview(reply)
+    start_sequence, reply_length, header_crc = BX_HEADER.unpack_from(view, 0)
+    if(start_sequence != BX_START_SEQUENCE):
+        raise ValueError(f"Not a BX reply, start sequence {start_sequence:04X}")
+    body_end = BX_HEADER_SIZE + reply_length
+    if(len(view) < body_end + BX_UINT16.size):
+        raise ValueError(f"Truncated BX reply, expected {body_end + BX_UINT16.size} bytes, got {len(view)}")
+    if(check_crc):
+        if(crc16(view[:4]) != header_crc):
+            raise CRCMismatchError("BX header CRC mismatch")
+        if(crc16(view[BX_HEADER_SIZE:body_end]) != BX_UINT16.unpack_from(view, body_end)[0]):
+            raise CRCMismatchError("BX body CRC mismatch")
+
+    num_handles = view[BX_HEADER_SIZE]
+    offset = BX_HEADER_SIZE + 1
+    handles = []
+    for _ in range(num_handles):
+        port_handle, handle_status = BX_HANDLE.unpack_from(view, offset)
+        offset += BX_HANDLE.size
+        name = port_handle_names[port_handle]
+        if(handle_status == HANDLE_VALID):
+            handles.append(HandleTransform(name, handle_status, *BX_TRANSFORM.unpack_from(view, offset)))
+            offset += BX_TRANSFORM.size
+        elif(handle_status == HANDLE_MISSING):
+            port_status, frame_number = BX_MISSING.unpack_from(view, offset)
+            handles.append(HandleTransform(name, handle_status, NAN, NAN, NAN, NAN, NAN, NAN, NAN, NAN, port_status, frame_number))
+            offset += BX_MISSING.size
+        else:
+            handles.append(HandleTransform(name, handle_status, NAN, NAN, NAN, NAN, NAN, NAN, NAN, NAN, 0, 0))
+    system_status = BX_UINT16.unpack_from(view, offset)[0]
+    return TrackingFrame(handles, system_status)
+
+
+def bx_reply_encode(handles, system_status=0):
+    """
+    Builds a binary BX reply from HandleTransform tuples, the inverse of bx_reply_decode
+    """
+    body = bytearray()
+    body.append(len(handles))
+    for handle in handles:
+        port_handle = int(handle.port_handle, 16)
+        body += BX_HANDLE.pack(port_handle, handle.handle_status)
+        if(handle.handle_status == HANDLE_VALID):
+            body += BX_TRANSFORM.pack(*handle[2:])
+        elif(handle.handle_status == HANDLE_MISSING):
+            body += BX_MISSING.pack(handle.port_status, handle.frame_number)
+    body += BX_UINT16.pack(system_status)
+    header = struct.pack('<HH', BX_START_SEQUENCE, len(body))
+    return header + BX_UINT16.pack(crc16(header)) + bytes(body) + BX_UINT16.pack(crc16(body))
@@ -0,0 +1,186 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# CRC16 used by the Aurora API: polynomial X^16 + X^15 + X^2 + 1 (0xA001 reflected), initial value 0.
+# Same algorithm as Helper/CalcCRC16.cpp, computed one byte at a time from a precomputed table.
+CRC16_POLY = 0xA001
+
+
+class CRCMismatchError(ValueError):
+    """
+    Raised by the reply parsers when a reply fails its CRC16 check
+    """
+
+
+def make_crc16_table(poly=CRC16_POLY):
+    """
+    Returns the 256 entry lookup table for a reflected 16-bit polynomial
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if (crc & 0x0001) else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+crc16_table = make_crc16_table()
+
+
+def crc16(data, crc=0, table=crc16_table):
+    """
+    CRC16 of bytes, bytearray, memoryview or an ASCII str.
+    crc: Running value to continue from, 0 for a new reply or command
+    Example:
+        crc16(b"OKAY") -> 0xA896
+    """
+    if(isinstance(data, str)):
+        data = data.encode('ascii')
+    elif(isinstance(data, memoryview) and data.format != 'B'):
+        data = data.cast('B')
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def crc16_hex(data, crc=0):
+    """
+    CRC16 formatted the way the system sends it, 4 upper case hexadecimal characters
+    Example:
+        crc16_hex("RESET") -> "BE6F"
+    """
+    return f"{crc16(data, crc):04X}"
+
+
+def check_reply(reply):
+    """
+    Checks the CRC16 of one complete reply, text or binary.
+    Text replies: <Data><CRC16><CR>, the CRC16 is 4 hexadecimal characters covering <Data>. The <CR> is optional.
+    Binary replies (BX): both the header CRC and the body CRC are checked.
+    Returns True if the CRC16 values match.
+    """
+    if(isinstance(reply, str)):
+        reply = reply.encode('ascii', errors='replace')
+    view = memoryview(reply)
+    if(len(view) >= 2 and view[0] == 0xC4 and view[1] == 0xA5):
+        return _check_bx_reply(view)
+    end = len(view)
+    if(end and view[end - 1] == 0x0D):
+        end -= 1
+    if(end < 4):
+        return False
+    try:
+        expected = int(bytes(view[end - 4:end]), 16)
+    except ValueError:
+        return False
+    return crc16(view[:end - 4]) == expected
+
+
+def _check_bx_reply(view):
+    if(len(view) < 8):
+        return False
+    body_end = 6 + (view[2] | (view[3] << 8))
+    if(len(view) < body_end + 2):
+        return False
+    if(crc16(view[:4]) != (view[4] | (view[5] << 8))):
+        return False
+    return crc16(view[6:body_end]) == (view[body_end] | (view[body_end + 1] << 8))
+
+
+def crc16_batch(frames, crc=0):
+    """
+    Vectorized CRC16 over many frames at once (requires numpy).
+    frames: 2D uint8 array with one frame per row, or a list of bytes-like frames (grouped by length internally)
+    Returns a uint16 array with one CRC16 per frame, in input order.
+    """
+    if(np is None):
+        raise ImportError("crc16_batch requires numpy")
+    if(isinstance(frames, np.ndarray)):
+        return _crc16_rows(frames, crc)
+    result = np.empty(len(frames), dtype=np.uint16)
+    for length, (indices, rows) in _group_by_length(frames).items():
+        result[indices] = _crc16_rows(rows, crc)
+    return result
+
+
+def check_reply_batch(replies):
+    """
+    Vectorized check_reply for many replies at once (requires numpy), e.g. when re-verifying a recorded session.
+    Replies of the same kind and length are checked together with one table lookup per byte column.
+    Returns a bool array with one entry per reply, in input order.
+    """
+    if(np is None):
+        raise ImportError("check_reply_batch requires numpy")
+    result = np.zeros(len(replies), dtype=bool)
+    text_replies = []
+    bx_replies = []
+    for i, reply in enumerate(replies):
+        if(isinstance(reply, str)):
+            reply = reply.encode('ascii', errors='replace')
+        if(len(reply) >= 2 and reply[0] == 0xC4 and reply[1] == 0xA5):
+            bx_replies.append((i, reply))
+        else:
+            if(reply[-1:] == b'\r'):
+                reply = reply[:-1]
+            text_replies.append((i, reply))
+
+    for length, (indices, rows) in _group_by_length([r for _, r in text_replies]).items():
+        if(length < 4):
+            continue
+        indices = np.array([text_replies[j][0] for j in indices])
+        expected = _parse_hex_columns(rows[:, length - 4:])
+        result[indices] = _crc16_rows(rows[:, :length - 4]) == expected
+
+    for length, (indices, rows) in _group_by_length([r for _, r in bx_replies]).items():
+        if(length < 8):
+            continue
+        indices = np.array([bx_replies[j][0] for j in indices])
+        body_end = 6 + (rows[:, 2].astype(np.int64) | (rows[:, 3].astype(np.int64) << 8))
+        # Rows of the same total length can only share a layout if the header reports that length
+        valid = body_end + 2 == length
+        header_ok = _crc16_rows(rows[:, :4]) == (rows[:, 4].astype(np.uint16) | (rows[:, 5].astype(np.uint16) << 8))
+        body_ok = _crc16_rows(rows[:, 6:length - 2]) == (rows[:, length - 2].astype(np.uint16) | (rows[:, length - 1].astype(np.uint16) << 8))
+        result[indices] = valid & header_ok & body_ok
+    return result
+
+
+def _crc16_rows(rows, crc=0):
+    table = _numpy_table()
+    rows = np.asarray(rows, dtype=np.uint8)
+    crcs = np.full(rows.shape[0], crc, dtype=np.uint16)
+    for column in range(rows.shape[1]):
+        crcs = (crcs >> 8) ^ table[(crcs ^ rows[:, column]) & 0xFF]
+    return crcs
+
+
+def _group_by_length(frames):
+    groups = {}
+    for i, frame in enumerate(frames):
+        groups.setdefault(len(frame), []).append(i)
+    grouped = {}
+    for length, indices in groups.items():
+        rows = np.frombuffer(b''.join(bytes(frames[i]) for i in indices), dtype=np.uint8).reshape(len(indices), length)
+        grouped[length] = (np.array(indices), rows)
+    return grouped
+
+
+def _parse_hex_columns(columns):
+    # ASCII hexadecimal digits -> values, invalid characters give a value that can never match a CRC16
+    digits = columns.astype(np.int32)
+    values = np.where(digits >= ord('A'), (digits & 0xDF) - ord('A') + 10, digits - ord('0'))
+    invalid = (values < 0) | (values > 15)
+    crcs = (values[:, 0] << 12) | (values[:, 1] << 8) | (values[:, 2] << 4) | values[:, 3]
+    crcs[invalid.any(axis=1)] = -1
+    return crcs
+
+
+_table_array = None
+
+def _numpy_table():
+    global _table_array
+    if(_table_array is None):
+        _table_array = np.array(crc16_table, dtype=np.uint16)
+    return _table_array
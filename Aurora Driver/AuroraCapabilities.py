@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+from AuroraCRC16 import check_reply
+from AuroraLogging import get_logger
+from AuroraToolCache import DEFAULT_CACHE_DIRECTORY
+
+log = get_logger("profile")
+
+# SFLIST 00 supported features summary, bits 0-1, 3-15, 17-18 and 20-31 are reserved
+FEATURE_MULTIPLE_VOLUMES = 1 << 2
+FEATURE_MAGNETIC_PORTS = 1 << 16
+FEATURE_FIELD_GENERATOR = 1 << 19
+
+# SFLIST 03 shape types
+volume_shape_dict = {
+    "9": "Cube volume",
+    "A": "Dome volume"
+}
+
+# One characterized measurement volume of SFLIST 03: shape type ("9" cube, "A" dome), the 10 shape parameters in mm and
+# the metal resistant field (0 no information, 1 metal resistant, 2 not metal resistant)
+Volume = namedtuple("Volume", ["shape", "parameters", "metal_resistant"])
+
+# Everything the startup probing learns about a system. identity is the VER 4 reply (firmware type and revision, NDI
+# serial number, characterization and freeze dates), the one query that checks a stored profile on connect.
+DeviceProfile = namedtuple("DeviceProfile", [
+    "serial_number",      # NDI serial number, the key of the stored profile
+    "identity",           # VER 4
+    "api_revision",       # APIREV, e.g. "D.001.006"
+    "firmware_revision",  # VER 5 combined firmware revision, e.g. "009"
+    "field_generator",    # VER 7
+    "siu",                # VER 8
+    "features",           # SFLIST 00 bit field, int
+    "volumes",            # SFLIST 03, [Volume, ...]
+    "num_ports",          # SFLIST 10, int
+    "timeouts"            # GET Info.Timeout.*, {command: seconds}
+])
+
+PROFILE_FORMAT = 1  # stored profiles of another format are probed again
+
+# Probing queries, sent back to back in this order
+_probe_commands = ["VER 4\r", "APIREV \r", "VER 5\r", "VER 7\r", "VER 8\r", "SFLIST 00\r", "SFLIST 03\r", "SFLIST 10\r",
+                   "GET Info.Timeout.*\r"]
+
+
+def reply_data(reply):
+    """
+    Text reply without <CRC16><CR>, None for ERROR replies and replies that fail their CRC16 check
+    """
+    if(reply.startswith("ERROR") or not check_reply(reply)):
+        return None
+    return reply.rstrip("\r")[:-4]
+
+
+def serial_number_of(identity):
+    """
+    NDI serial number, the second line of a VER 0 or VER 4 reply
+    """
+    lines = identity.split("\n")
+    return lines[1].strip() if(len(lines) > 1) else None
+
+
+def parse_volumes(data):
+    """
+    [Volume, ...] of an SFLIST 03 reply: <Number of Volumes> then per volume <Shape Type><10 x 7 char parameters>
+    <Reserved><Metal Resistant><LF>
+    """
+    count = int(data[0], 16)
+    volumes = []
+    for line in data[1:].split("\n")[:count]:
+        line = line.strip()
+        parameters = tuple(int(line[1 + 7 * i:8 + 7 * i]) / 100 for i in range(10))
+        volumes.append(Volume(line[0], parameters, int(line[72], 16) if(len(line) > 72) else 0))
+    return volumes
+
+
+def parse_user_parameters(data):
+    """
+    {name: value} of a GET reply, one <name>=<value> per line
+    """
+    parameters = {}
+    for line in data.split("\n"):
+        name, separator, value = line.partition("=")
+        if(separator):
+            parameters[name.strip()] = value.strip()
+    return parameters
+
+
+def probe_profile(ndi_obj, identity=None):
+    """
+    Builds a DeviceProfile with SFLIST, VER 4/5/7/8, APIREV and GET Info.Timeout.*, all sent back to back with
+    send_commands. The system must be in Setup mode, INIT is sent first if it is not initialized.
+    Queries that return an ERROR are left None.
+    """
+    if(not ndi_obj.get_init_flag()):
+        ndi_obj.init()
+    commands = _probe_commands if(identity is None) else _probe_commands[1:]
+    replies = [reply_data(reply) for reply in ndi_obj.send_commands(commands)]
+    if(identity is not None):
+        replies.insert(0, identity)
+    identity, api_revision, firmware_revision, field_generator, siu, features, volumes, num_ports, timeouts = replies
+    if(identity is None):
+        raise ValueError("VER 4 failed, the system cannot be identified")
+    timeouts = parse_user_parameters(timeouts) if(timeouts is not None) else {}
+    return DeviceProfile(
+        serial_number_of(identity),
+        identity,
+        api_revision,
+        firmware_revision.strip() if(firmware_revision is not None) else None,
+        field_generator,
+        siu,
+        int(features, 16) if(features is not None) else None,
+        parse_volumes(volumes) if(volumes is not None) else None,
+        int(num_ports, 16) if(num_ports is not None) else None,
+        {name.rsplit(".", 1)[-1]: int(value) for name, value in timeouts.items() if(value.isdigit())}
+    )
+
+
+class ProfileStore:
+    """
+    DeviceProfile per NDI serial number, stored as <directory>/<serial number>.json
+    """
+    def __init__(self, directory=None):
+        self.directory = directory if(directory is not None) else os.path.join(DEFAULT_CACHE_DIRECTORY, "profiles")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, serial_number):
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9._-]", "_", serial_number) + ".json")
+
+    def load(self, serial_number):
+        """
+        Stored DeviceProfile of a serial number, None if there is none or it cannot be read
+        """
+        path = self._path(serial_number)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+            if(stored.pop("format", None) != PROFILE_FORMAT):
+                return None
+            profile = DeviceProfile(**stored)
+        except (OSError, ValueError, TypeError):
+            return None
+        volumes = None if(profile.volumes is None) else [Volume(shape, tuple(parameters), metal_resistant)
+                                                         for shape, parameters, metal_resistant in profile.volumes]
+        return profile._replace(volumes=volumes)
+
+    def save(self, profile):
+        path = self._path(profile.serial_number)
+        stored = dict(profile._asdict(), format=PROFILE_FORMAT)
+        with self._lock:
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(stored, f, indent=1)
+            os.replace(temporary, path)
+
+
+def load_device_profile(ndi_obj, store=None, refresh=False):
+    """
+    Sets the capability profile of the connected system on ndi_obj and returns it.
+    One VER 4 query identifies the system. If the store holds a profile for its serial number with the same VER 4 reply
+    (same firmware, characterization and freeze dates) it is used as is, otherwise, or with refresh, the system is
+    probed (probe_profile) and the new profile stored.
+    Usage:
+        profile = load_device_profile(ndi_obj, ProfileStore())
+        ndi_obj.negotiate_fastest_link()    # no APIREV and VER 5 queries with a profile
+        ndi_obj.get("Info.Timeout.PINIT")   # answered from the profile
+    """
+    store = store if(store is not None) else ProfileStore()
+    identity = reply_data(ndi_obj.send_command("VER 4\r"))
+    if(identity is None):
+        raise ValueError("VER 4 failed, the system cannot be identified")
+    serial_number = serial_number_of(identity)
+    profile = None if(refresh or serial_number is None) else store.load(serial_number)
+    if(profile is not None and profile.identity == identity):
+        log.info("Using the stored profile of %s", serial_number)
+    else:
+        log.info("Probing %s, %s", serial_number, "refresh requested" if(refresh) else "no matching stored profile")
+        profile = probe_profile(ndi_obj, identity)
+        if(profile.serial_number is not None):
+            store.save(profile)
+    ndi_obj.set_profile(profile)
+    return profile
@@ -0,0 +1,182 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Frame numbers in BX/TX replies are 32 bit counters, incremented by 8 per frame at the 40 Hz frame rate
+FRAME_NUMBER_MODULUS = 1 << 32
+FRAME_NUMBER_STEP = 8
+
+# One synchronized frame: device frame number, host receive time, estimated host time of the acquisition and the
+# transport latency in between (all in seconds of time.monotonic())
+ClockSample = namedtuple("ClockSample", ["frame_number", "host_time", "acquisition_time", "latency"])
+
+
+def frame_number_of(frame):
+    """
+    Device frame number of a TrackingFrame, the largest one of its handles (disabled handles report 0), None if there is
+    none
+    """
+    frame_number = max((handle.frame_number for handle in frame.handles), default=0)
+    return frame_number if(frame_number > 0) else None
+
+
+class FrameClock:
+    """
+    Online mapping from device frame numbers to host time:
+        acquisition_time = offset + period * frame_number
+    The receive times scatter above the acquisition times by a transport latency that is never negative and grows under
+    load, so the line is fitted to the lower envelope of a sliding window of frames: the period (and with it the drift of
+    the system clock against the host clock) is the least squares slope through the least delayed frame of each block of
+    the window, and the offset puts the line under the least delayed frame of the window, shifted back by fixed_latency
+    (the minimum transport time, e.g. the serial transmission time of one reply, if known). The period is the time per
+    frame number count, frame_rate frames of frame_number_step counts each per second nominally.
+    Usage:
+        clock = FrameClock()
+        ndi_obj.set_clock(clock)
+        ...
+        clock.acquisition_time(frame.handles[0].frame_number)
+    """
+    def __init__(self, frame_rate=40.0, window=400, fixed_latency=0.0, min_samples=20, blocks=10,
+                 frame_number_step=FRAME_NUMBER_STEP):
+        if(window < 2):
+            raise ValueError("window must be at least 2")
+        self.frame_rate = frame_rate
+        self.frame_number_step = frame_number_step
+        self.window = window
+        self.fixed_latency = fixed_latency
+        self.min_samples = min_samples
+        self.blocks = blocks
+        self._x = np.zeros(window)  # frame numbers relative to the first frame
+        self._y = np.zeros(window)  # host receive times relative to the first frame
+        self.resets = 0
+        self._clear()
+
+    def reset(self):
+        """
+        Forgets every sample, e.g. after the system was reinitialized and its frame numbers restarted
+        """
+        self.resets += 1
+        self._clear()
+
+    def _clear(self):
+        self._count = 0
+        self._x0 = None
+        self._y0 = 0.0
+        self._last = None  # last frame number added, unwrapped
+        self.period = 1.0 / (self.frame_rate * self.frame_number_step)
+        self.offset = 0.0  # relative to the first frame, see acquisition_time
+        self.samples = 0
+
+    def _unwrap(self, frame_number):
+        """
+        Frame number continued past 32 bit wrap arounds, taking the one closest to the last frame
+        """
+        last = self._last
+        if(last is None):
+            return frame_number
+        unwrapped = last - last % FRAME_NUMBER_MODULUS + frame_number
+        if(unwrapped < last - FRAME_NUMBER_MODULUS // 2):
+            unwrapped += FRAME_NUMBER_MODULUS
+        return unwrapped
+
+    def update(self, frame_number, host_time):
+        """
+        Adds a frame received at host_time (time.monotonic()), returns its ClockSample
+        A repeated frame number (polling faster than the frame rate) is not added again.
+        """
+        unwrapped = self._unwrap(frame_number)
+        if(self._last is not None and unwrapped <= self._last):
+            if(unwrapped == self._last):
+                acquisition_time = self.acquisition_time(frame_number)
+                return ClockSample(frame_number, host_time, acquisition_time, host_time - acquisition_time)
+            # Frame numbers restarted
+            self.reset()
+            unwrapped = frame_number
+        if(self._x0 is None):
+            self._x0 = unwrapped
+            self._y0 = host_time
+        self._last = unwrapped
+        index = self._count % self.window
+        self._x[index] = unwrapped - self._x0
+        self._y[index] = host_time - self._y0
+        self._count += 1
+        self.samples += 1
+        self._fit()
+        acquisition_time = self._y0 + self.offset + self.period * (unwrapped - self._x0)
+        return ClockSample(frame_number, host_time, acquisition_time, host_time - acquisition_time)
+
+    def update_frame(self, frame, host_time):
+        """
+        update() for a TrackingFrame, None if the frame has no frame number
+        """
+        frame_number = frame_number_of(frame)
+        if(frame_number is None):
+            return None
+        return self.update(frame_number, host_time)
+
+    def _fit(self):
+        n = min(self._count, self.window)
+        x, y = self._x[:n], self._y[:n]
+        if(n >= self.min_samples):
+            # Fit the slope through the least delayed frame of each block of the window, the latency floor drifts far
+            # less under load than the mean latency does
+            blocks = min(self.blocks, n // 2)
+            if(n == self.window):
+                start = self._count % self.window
+                x = np.concatenate((x[start:], x[:start]))
+                y = np.concatenate((y[start:], y[:start]))
+            size = n // blocks
+            residuals = (y[:blocks * size] - self.period * x[:blocks * size]).reshape(blocks, size)
+            picks = np.argmin(residuals, axis=1) + np.arange(blocks) * size
+            bx, by = x[picks], y[picks]
+            # Centered sums, the frame numbers keep growing and raw sums of squares would lose precision
+            dx = bx - bx.mean()
+            denominator = np.dot(dx, dx)
+            if(denominator > 0):
+                self.period = float(np.dot(dx, by - by.mean()) / denominator)
+        self.offset = float(np.min(y - self.period * x)) - self.fixed_latency
+
+    def acquisition_time(self, frame_number):
+        """
+        Estimated host time (time.monotonic()) at which the system acquired a frame
+        """
+        if(self._x0 is None):
+            return float("nan")
+        x = self._unwrap(frame_number) - self._x0
+        return self._y0 + self.offset + self.period * x
+
+    def acquisition_times(self, frame_numbers):
+        """
+        acquisition_time() of an array of frame numbers from the current window, e.g. AuroraTrackingSession rows
+        """
+        if(self._x0 is None):
+            return np.full(np.shape(frame_numbers), np.nan)
+        last = self._last
+        unwrapped = np.asarray(frame_numbers, dtype=np.float64) + (last - last % FRAME_NUMBER_MODULUS)
+        unwrapped = np.where(unwrapped < last - FRAME_NUMBER_MODULUS // 2, unwrapped + FRAME_NUMBER_MODULUS, unwrapped)
+        x = unwrapped - self._x0
+        return self._y0 + self.offset + self.period * x
+
+    def get_drift_ppm(self):
+        """
+        Rate of the system clock against the host clock in parts per million, positive when its frames come slower than
+        the nominal frame rate
+        """
+        return (self.period * self.frame_rate * self.frame_number_step - 1.0) * 1e6
+
+    def get_latency_stats(self):
+        """
+        Transport latency (receive time - estimated acquisition time) of the frames in the window, in seconds
+        """
+        n = min(self._count, self.window)
+        if(n == 0):
+            return None
+        latencies = np.sort(self._y[:n] - self.period * self._x[:n] - self.offset)
+        return {
+            "count": n,
+            "min": float(latencies[0]),
+            "p50": float(latencies[int(0.50 * (n - 1))]),
+            "p99": float(latencies[int(round(0.99 * (n - 1)))]),
+            "max": float(latencies[-1]),
+            "mean": float(latencies.mean())
+        }
@@ -1,10 +1,37 @@
 import serial
 from serial.tools import list_ports
 import binascii
+import logging
 import platform
+import threading
+import time
+from collections import namedtuple
 
-from AuroraErrorCodes import error_codes_dict
-from AuroraPortStatus import port_status_dict
+from AuroraErrorCodes import log_reply
+from AuroraPortStatus import decode_port_status, describe_port_status
+from AuroraCRC16 import crc16, crc16_table, make_crc16_table, CRC16_POLY, check_reply, CRCMismatchError
+from AuroraBX import BX_START_BYTES, bx_reply_decode, bx_reply_options
+from AuroraTX import tx_reply_decode, tx_reply_options
+from AuroraStream import TrackingStream
+from AuroraScheduler import CommandScheduler, TEXT_REPLY, BX_REPLY, write_and_read
+from AuroraFraming import SerialReader, encode_command
+from AuroraCapabilities import parse_user_parameters
+from AuroraToolCache import CHUNK_SIZE, DEFINITION_SIZE, SROM_SIZE, chunks, definition_digest
+from AuroraLogging import get_logger, enable_console_logging
+
+log = get_logger("driver")
+phsr_log = get_logger("phsr")
+
+# One row of the table returned by NDI_Aurora.bring_up_tools
+PortHandleInfo = namedtuple("PortHandleInfo", [
+    "port_handle",            # e.g. "0A"
+    "port_status",            # port handle status bits from PHSR, int
+    "occupied",
+    "initialized",
+    "enabled",
+    "tool_tracking_priority", # "S", "D", "B" or None when not enabled
+    "error"                   # last ERROR reply for this port handle, None if all commands succeeded
+])
 
 class NDI_Aurora:
     # Section 1
@@ -28,6 +55,27 @@ class NDI_Aurora:
             self.set_debug_mode(debug_mode)
         self.init_flag = False # uninitialized
         self.port_handles = None
+        self.stream = None
+        self.recorder = None
+        self.clock = None
+        self.metrics = None
+        self.trace = None
+        self.last_reply_time = None # time.monotonic() when the last BX/TX reply was received
+        self.replaying = hasattr(self.ser, "reply_host_time") # AuroraRecording.ReplaySerial, frames keep their recorded times
+        self.reader = SerialReader(self.ser) # buffered reply framing, shared with the scheduler
+        self.command_crc = False # send commands in format 1 with a CRC16, see set_command_crc
+        # Session configuration, replayed by AuroraRecovery.SessionRecovery after a reset
+        self.link_settings = ("0", 9600, "0") # COMM baud rate code, baud rate, hardware handshaking of the working link
+        self.tool_config = None # (tool tracking priority, {port handle: priority}, {port handle: tool definition}) of the last bring_up_tools
+        self.tracking_option = None # reply option of the last successful TSTART, None when not tracking
+        self.recovery = None
+        self.profile = None # AuroraCapabilities.DeviceProfile of the connected system, see load_device_profile
+        self.tool_cache = None
+        self.tool_definitions = {} # {port handle: digest of the PVWR tool definition the port handle holds}
+        self._definitions_pending = set() # port handles with an uploaded tool definition not initialized yet
+        self.selected_srom = {} # {port handle: SROM device ID selected with PSEL}
+        self.scheduler = None
+        self.io_lock = threading.RLock() # one command/reply exchange at a time when no scheduler is running
 
     def get_CRC16(self):
         return self.crc16
@@ -37,13 +85,89 @@ class NDI_Aurora:
     def get_debug_mode(self):
         return self.debug_mode
     def set_debug_mode(self, debug_mode):
+        """
+        debug_mode True logs commands, replies and decoded status to the console (AuroraLogging.enable_console_logging)
+        """
         self.debug_mode = debug_mode
+        if(debug_mode):
+            enable_console_logging(logging.DEBUG)
 
     def set_init_flag(self, flag_status: bool):
         self.init_flag = flag_status # False for uninitialized, True for initialized
     def get_init_flag(self):
         return self.init_flag
     
+    def set_recorder(self, recorder):
+        """
+        Records every binary BX reply with its host receive time, e.g. AuroraRecording.BXRecorder. None stops recording.
+        """
+        self.recorder = recorder
+    def get_recorder(self):
+        return self.recorder
+
+    def set_clock(self, clock):
+        """
+        Feeds the frame number and host receive time of every BX/TX frame to clock, e.g. AuroraClock.FrameClock. None stops it.
+        """
+        self.clock = clock
+    def get_clock(self):
+        return self.clock
+
+    def set_metrics(self, metrics):
+        """
+        Records commands, replies, parsing and streaming in metrics, e.g. AuroraMetrics.Metrics. None turns it off.
+        """
+        self.metrics = metrics
+        if(self.scheduler is not None):
+            self.scheduler.metrics = metrics
+    def get_metrics(self):
+        return self.metrics
+
+    def set_wire_trace(self, trace):
+        """
+        Keeps the recent raw serial traffic in trace, e.g. AuroraLogging.WireTrace, dumped to the log on timeouts and CRC
+        failures. None turns it off.
+        """
+        self.trace = trace
+        if(self.scheduler is not None):
+            self.scheduler.trace = trace
+    def get_wire_trace(self):
+        return self.trace
+
+    def set_command_crc(self, command_crc):
+        """
+        True sends every command as <Command>:<Parameters><CRC16><CR> (format 1), the system then rejects commands
+        corrupted on the wire with ERROR04. The encoded bytes of repeated commands (BX, TX) are cached.
+        """
+        self.command_crc = command_crc
+    def get_command_crc(self):
+        return self.command_crc
+
+    def set_recovery(self, recovery):
+        """
+        Reconnects and resumes tracking when the link dies while streaming, e.g. AuroraRecovery.SessionRecovery. None
+        turns it off.
+        """
+        self.recovery = recovery
+    def get_recovery(self):
+        return self.recovery
+
+    def set_profile(self, profile):
+        """
+        AuroraCapabilities.DeviceProfile of the connected system, answers APIREV, VER 5 and Info.Timeout queries
+        """
+        self.profile = profile
+    def get_profile(self):
+        return self.profile
+
+    def set_tool_cache(self, cache):
+        """
+        AuroraToolCache.ToolDefinitionCache for tool definition files and SROM device images, None disables caching
+        """
+        self.tool_cache = cache
+    def get_tool_cache(self):
+        return self.tool_cache
+
     def set_port_handles(self, port_handles):
         self.port_handles = port_handles
     def get_port_handles(self):
@@ -58,47 +182,129 @@ class NDI_Aurora:
     def send_command(self, command):
         """
         Sends commands through serial connection
+        Safe to call from several threads, with a running scheduler the exchange happens on its I/O thread.
         """
         # example -> self.ser.write(b"BEEP 1\r")
-        self.ser.write(bytes(command, 'utf-8'))
-        reply = self.ser.read_until(b'\r')
-        if(self.get_debug_mode()):
-            self.reply_decoder(reply.decode(), command)
-        return reply.decode()
+        reply = self.exchange(command, TEXT_REPLY).decode()
+        if(log.isEnabledFor(logging.INFO)):
+            self.reply_decoder(reply, command)
+        return reply
+
+    def send_commands(self, commands):
+        """
+        Sends several commands back to back, no other command can run in between
+        Returns the list of replies in the same order
+        """
+        if(self.scheduler_active()):
+            encoded = [encode_command(command, self.command_crc) for command in commands]
+            replies = [future.result() for future in self.scheduler.submit_batch(encoded)]
+        else:
+            with self.io_lock:
+                replies = [write_and_read(self.reader, encode_command(command, self.command_crc), TEXT_REPLY, self.metrics,
+                                          self.trace) for command in commands]
+        replies = [reply.decode() for reply in replies]
+        if(log.isEnabledFor(logging.INFO)):
+            for reply, command in zip(replies, commands):
+                self.reply_decoder(reply, command)
+        return replies
+
+    def exchange(self, command, kind=TEXT_REPLY, timeout=None):
+        """
+        Writes one command and returns its raw reply bytes, through the scheduler when it is running
+        timeout: optional read timeout for this reply only, used when it is shorter than the port's
+        """
+        if(isinstance(command, str)):
+            command = encode_command(command, self.command_crc)
+        if(self.scheduler_active()):
+            return self.scheduler.submit(command, kind, timeout).result()
+        with self.io_lock:
+            return write_and_read(self.reader, command, kind, self.metrics, self.trace, timeout)
+
+    def decode_frame(self, decode, reply, command_type):
+        """
+        Runs a frame parser (bx_reply_decode, tx_reply_decode), timing it and counting CRC and decode failures when
+        metrics are attached, and dumping the wire trace when it fails
+        """
+        metrics = self.metrics
+        if(metrics is None and self.trace is None):
+            return decode(reply)
+        start = time.perf_counter()
+        try:
+            frame = decode(reply)
+        except ValueError as e:
+            if(metrics is not None):
+                metrics.count("crc_failures" if(isinstance(e, CRCMismatchError)) else "decode_errors")
+            if(self.trace is not None):
+                self.trace.error(f"{command_type} reply: {e}")
+            raise
+        if(metrics is not None):
+            metrics.observe("parse_seconds", command_type, time.perf_counter() - start)
+        return frame
+
+    def receive_time(self):
+        """
+        Host receive time of the reply just read, time.monotonic() or, when replaying a recording, its recorded time
+        """
+        if(self.replaying):
+            host_time = self.ser.reply_host_time
+            if(host_time is not None and host_time == host_time):
+                # NaN when the recording has no time for the reply
+                return host_time
+        return time.monotonic()
+
+    def run_io(self, function):
+        """
+        Runs function(ser) with exclusive access to the serial port, e.g. to change the host baud rate
+        """
+        if(self.scheduler_active()):
+            return self.scheduler.submit_call(function).result()
+        with self.io_lock:
+            return function(self.ser)
+
+    def start_scheduler(self):
+        """
+        Starts an AuroraScheduler.CommandScheduler I/O thread that owns the serial port.
+        All commands are then queued to it, so any number of threads can share this object.
+        """
+        if(not self.scheduler_active()):
+            self.scheduler = CommandScheduler(self.ser, reader=self.reader)
+            self.scheduler.metrics = self.metrics
+            self.scheduler.trace = self.trace
+            self.scheduler.start()
+        return self.scheduler
+
+    def stop_scheduler(self, timeout=2.0):
+        """
+        Stops the I/O thread, returns False if it is still finishing a long item (e.g. a serial break) after timeout
+        seconds, the scheduler is kept until it has stopped
+        """
+        if(self.scheduler is not None):
+            if(not self.scheduler.stop(timeout)):
+                log.warning("I/O thread still busy after %s s", timeout)
+                return False
+            self.scheduler = None
+        return True
+
+    def scheduler_active(self):
+        return self.scheduler is not None and self.scheduler.is_running()
 
     def close(self):
         """
         Closes connection to the device
         """
+        if(not self.stop_scheduler()):
+            # Never close the port under a running I/O thread
+            self.stop_scheduler(timeout=None)
         self.ser.close()
-        print(f"Closed serial connection to '{self.serial_port}'")
+        log.info("Closed serial connection to '%s'", self.serial_port)
 
     def reply_decoder(self, reply, command):
         """
         Interprets replies including error codes
         """
-        stripped_command = command.strip('\r')
-        if("ERROR" in reply):
-            error_codes = reply.split("ERROR")[-1]
-            # Error codes always come in length 2, so split them into strings of len 2
-            error_list = []
-            temp = ""
-            for i in range(len(error_codes)):
-                if(i % 2 == 1):
-                    temp += error_codes[i]
-                    error_list.append(temp)
-                else:
-                    temp = error_codes[i]
-            print(f"Command: {stripped_command} - Error: {reply}")
-            for err in error_list:
-                if(err in error_codes_dict):
-                    print(f"* Code: {err} - {error_codes_dict[err]}")
-                else:
-                    print(f"* Code: {err} - Unknown error")
-        else:
-            print(f"Command: {stripped_command} - Reply: {reply}")
+        log_reply(log, reply, command)
 
-    def phsr_reply_decode(self, reply):
+    def phsr_reply_decode(self, reply, option="00"):
         """
         Interprets PHSR status reply
         Reply structure:
@@ -120,55 +326,32 @@ class NDI_Aurora:
         Example reply (4):
             010A001C1B5 -> In this case, one tool is connected to the system and it has been assigned port handle 0A. This port handle is not initialized or enabled.
             <01><0A 001><C1B5>
+        Only option 00 (all port handles) replaces the stored port handles.
+        Port handles are initialized and enabled by bring_up_tools, not here.
         """
-        # Number of Port Handles
-        num_port_handles = int(reply[:2], 16)
-        reply = reply[2:]
-        # Port Handles and their Status
-        port_handles = []
-        for _ in range(num_port_handles):
-            port_handle = reply[:2]
-            port_status = reply[2:5]
-            port_handles.append((port_handle, port_status))
-            reply = reply[5:]
-        # CRC16
-        crc16 = reply[:4]
-        if(self.get_debug_mode):
-            # Printing for debug
-            print("\t*** PHSR reply decode ***")
-            print(f"\t- Number of Port Handles: {num_port_handles}")
+        num_port_handles, port_handles, crc16 = HelperClass.phsr_reply_parse(reply)
+        if(phsr_log.isEnabledFor(logging.DEBUG)):
+            phsr_log.debug("\t*** PHSR reply decode ***")
+            phsr_log.debug("\t- Number of Port Handles: %d", num_port_handles)
             for port_handle, port_status in port_handles:
-                print(f"\t- Port Handle: {port_handle} -> Port Handle Status: {port_status} -> {port_status_dict[port_status]}")
-                port_initialized, port_enabled = self.interpret_status(port_status)
-                if(not port_initialized):
-                    self.pinit(port_handle)
-                if(not port_enabled):
-                    self.pena(port_handle)
-            print(f"\t- CRC16: {crc16}")
-            print("\t*** **************** ***")
+                phsr_log.debug("\t- Port Handle: %s -> Port Handle Status: %s -> %s", port_handle, port_status,
+                               describe_port_status(port_status))
+                self.interpret_status(port_status)
+            phsr_log.debug("\t- CRC16: %s", crc16)
         # Setting CRC16 and port handles
-        self.set_CRC16 = crc16
-        self.set_port_handles = port_handles
+        self.set_CRC16(int(crc16, 16))
+        if(option == "00"):
+            self.set_port_handles(port_handles)
         return num_port_handles, port_handles, crc16
     
     def interpret_status(self, port_status_hex):
-        # Convert the hex string to an integer
-        port_status_int = int(port_status_hex, 16)
-
-        # Create a dictionary to store the status of each bit field
-        status_dict = {
-            'Occupied': bool(port_status_int & (1 << 0)),
-            'GPIO line 1 closed': bool(port_status_int & (1 << 1)),
-            'GPIO line 2 closed': bool(port_status_int & (1 << 2)),
-            'GPIO line 3 closed': bool(port_status_int & (1 << 3)),
-            'Initialized': bool(port_status_int & (1 << 4)),
-            'Enabled': bool(port_status_int & (1 << 5)),
-        }
-
-        # Print the status of each bit field
-        for field, status in status_dict.items():
-            print(f"\t\t- {field}: {status}")
-        return status_dict['Initialized'], status_dict['Enabled']
+        """
+        Returns (initialized, enabled) of a port handle status, see AuroraPortStatus.decode_port_status for every flag
+        """
+        flags = decode_port_status(port_status_hex)
+        if(phsr_log.isEnabledFor(logging.DEBUG)):
+            phsr_log.debug("\t\t- %s", ", ".join(flags.descriptions()) or "Not occupied")
+        return flags.initialized, flags.enabled
 
 
     # Section 2
@@ -179,33 +362,57 @@ class NDI_Aurora:
         """
         api_rev = f"APIREV \r"
         reply = self.send_command(api_rev)
-        print(f"API revision: {reply}")
+        log.info("API revision: %s", reply)
+        return reply
 
     def beep(self, num_beeps=1):
         """
         Generates a beep
         """
         if(num_beeps < 1 or num_beeps > 9):
-            print(f"Keep number of beeps within 1-9")
+            log.warning("Keep number of beeps within 1-9")
             num_beeps = 9
         beep = f"BEEP {num_beeps}\r"
         reply = self.send_command(beep)
         # print(f"Beep = {reply}")
 
-    def bx(self, option=0):
+    def bx(self, reply_option="0001", timeout=None):
         """
         Returns the latest tool transformations and system status in binary format
-        """
-        # Not implemented correctly yet?
-        reply_options = [0x0001, 0x0800]
-        # self.send_command(f"BX {reply_options[option]}\r")
-        bx = f"BX \r"
-        reply = self.send_command(bx)
+        Prerequisite command:
+            TSTART
+        Syntax:
+            BX<SPACE><Reply Option><CR>
+        Example command and reply:
+            BX 0801 -> A5C4005723130201013F3AF3CA... (binary, see AuroraBX.bx_reply_decode)
+        Returns a TrackingFrame, or None if the system replied with an error
+        timeout: optional shorter read timeout for this poll, e.g. SessionRecovery.read_timeout while streaming
+        """
+        if(not reply_option in bx_reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, bx_reply_options)
+            log.warning("Switching to default option '0001'")
+            reply_option = "0001"
+        bx = f"BX {reply_option}\r"
+        reply = self.exchange(bx, BX_REPLY, timeout)
+        receive_time = self.receive_time()
+        self.last_reply_time = receive_time
+        if(reply[:2] != BX_START_BYTES):
+            # Text reply, e.g. ERROR0C when not in tracking mode
+            if(log.isEnabledFor(logging.INFO)):
+                self.reply_decoder(reply.decode(errors='replace'), bx)
+            return None
+        if(self.recorder is not None):
+            self.recorder.write(reply, receive_time)
+        frame = self.decode_frame(bx_reply_decode, reply, "BX")
+        if(self.clock is not None):
+            self.clock.update_frame(frame, receive_time)
+        return frame
 
-        # checksum = HelperClass.crc16('BX')
-        # checksum_str = str(checksum)
-        # command_str = f"BX{checksum_str}\r"
-        # self.send_command(command_str)
+    def read_bx_reply(self):
+        """
+        Reads one reply to a BX command, binary replies by the length in their header, see AuroraFraming.SerialReader
+        """
+        return bytes(self.reader.read_reply(raise_on_timeout=True))
 
     def comm(self, baud_rate="0", data_bits="0", parity="0", stop_bits="0", hardware_handshaking="0"):
         """
@@ -221,7 +428,7 @@ class NDI_Aurora:
             "1": "14400",
             "2": "19200",
             "3": "38400",
-            "4": "57000",
+            "4": "57600",
             "5": "115200",
             "6": "921600", #  921600 baud is only available via USB and with combined firmware revision 009 (API Revision D.001.006) or later. A USB port is available on Aurora V2 systems
             "A": "230400"  # Baud rate parameter "A" is available with combined firmware revision 009 (API Revision D.001.006) or later.
@@ -251,12 +458,78 @@ class NDI_Aurora:
         valid_command = True
         for param, options, name in zip(user_parameters, comm_options, parameter_names):
             if(not param in options):
-                print(f"Failure - {name}: {param}")
-                print(f"Select an option from {list(options.keys())}")
+                log.warning("Failure - %s: %s", name, param)
+                log.warning("Select an option from %s", list(options.keys()))
                 valid_command = False
         if(valid_command):
             comm = f"COMM {baud_rate}{data_bits}{parity}{stop_bits}{hardware_handshaking}\r"
             reply = self.send_command(comm)
+            return reply
+
+    def negotiate_fastest_link(self, max_baud_rate=921600, hardware_handshaking=False, probe_timeout=0.5):
+        """
+        Moves the system and the host serial port to the fastest baud rate both support.
+        The firmware is queried with APIREV and VER 5 (taken from the device profile when one is set), 230400 and 921600
+        baud need combined firmware revision 009 (API revision D.001.006) or later. Rates are tried from the fastest down, each one is checked with ECHO.
+        If a rate fails the system is brought back with a serial break (9600 baud) and the next rate is tried.
+        19200 baud is skipped, it does not work with the NDI Aurora SCU USB serial driver.
+        Returns the baud rate in use afterwards.
+        """
+        previous_timeout = self.ser.timeout
+        self.run_io(lambda ser: setattr(ser, "timeout", probe_timeout))
+        try:
+            if(self.profile is not None and self.profile.api_revision and self.profile.firmware_revision):
+                api_revision, firmware = self.profile.api_revision, self.profile.firmware_revision
+            else:
+                api_revision = self.api_rev().strip()[:-4]
+                firmware = self.send_command("VER 5\r").strip()[:-4]
+            fast_rates_supported = HelperClass.firmware_supports_fast_baud_rates(api_revision, firmware)
+            candidates = [(code, rate) for code, rate in HelperClass.baud_rate_options.items()
+                          if rate <= max_baud_rate and rate != 19200 and (fast_rates_supported or rate <= 115200)]
+            candidates.sort(key=lambda option: option[1], reverse=True)
+            handshaking = "1" if(hardware_handshaking) else "0"
+            for code, rate in candidates:
+                if(rate == self.ser.baudrate and self.echo_check()):
+                    return rate
+                if(self.change_link_baud_rate(code, rate, handshaking)):
+                    return rate
+                log.warning("Link check failed at %d baud, falling back", rate)
+                if(not self.echo_check()):
+                    self.serial_break()
+            return self.ser.baudrate
+        finally:
+            self.run_io(lambda ser: setattr(ser, "timeout", previous_timeout))
+
+    def change_link_baud_rate(self, baud_rate_code, baud_rate, hardware_handshaking="0"):
+        """
+        Sends COMM, then switches the host port to the same settings and checks the link with ECHO
+        Returns True if the link works at the new baud rate
+        """
+        reply = self.comm(baud_rate=baud_rate_code, hardware_handshaking=hardware_handshaking)
+        if(reply is None or not reply.startswith("OKAY")):
+            return False
+        # The system needs ~100 ms after its OKAY reply before the host changes its own settings
+        time.sleep(0.1)
+        def switch_host_port(ser):
+            ser.baudrate = baud_rate
+            ser.rtscts = hardware_handshaking == "1"
+            ser.reset_input_buffer()
+            self.reader.reset()
+        self.run_io(switch_host_port)
+        if(not self.echo_check()):
+            return False
+        self.link_settings = (baud_rate_code, baud_rate, hardware_handshaking)
+        return True
+
+    def echo_check(self, payload="LinkCheck"):
+        """
+        Returns True if ECHO returns exactly the payload with a valid CRC16
+        """
+        try:
+            reply = self.send_command(f"ECHO {payload}\r")
+        except (UnicodeDecodeError, OSError):
+            return False
+        return reply.endswith("\r") and reply[:-5] == payload and check_reply(reply)
 
     def dstart(self):
         """
@@ -290,10 +563,24 @@ class NDI_Aurora:
             GET<SPACE><User Parameter Name><CR>
         Example command and reply:
             GET Info.Timeout.PINIT -> Info.Timeout.PINIT=5<LF>96A7
-        """ 
-        # Currently just using "GET *" to return all parameters
-        get = f"GET *\r"
-        reply = self.send_command(get)
+        Returns {parameter name: value}, "GET *" (all parameters) without user_params. Info.Timeout parameters are
+        answered from the device profile when one is set, other parameters are sent back to back.
+        """
+        if(not user_params):
+            user_params = ("*",)
+        parameters = {}
+        queries = []
+        timeouts = self.profile.timeouts if(self.profile is not None) else {}
+        for name in user_params:
+            command = name.rsplit(".", 1)[-1]
+            if(name.startswith("Info.Timeout.") and command in timeouts):
+                parameters[name] = str(timeouts[command])
+            else:
+                queries.append(name)
+        for reply in self.send_commands([f"GET {name}\r" for name in queries]):
+            if(not reply.startswith("ERROR")):
+                parameters.update(parse_user_parameters(reply.rstrip("\r")[:-4]))
+        return parameters
 
     def init(self):
         """
@@ -305,6 +592,9 @@ class NDI_Aurora:
         """
         init = f"INIT \r"
         reply = self.send_command(init)
+        self.set_init_flag(reply.startswith("OKAY"))
+        self.tracking_option = None
+        return reply
 
     def led(self, port_handle="0A", led_number="1", led_state="S"):
         """
@@ -325,8 +615,8 @@ class NDI_Aurora:
         valid_command = True
         for param, options, name in zip(user_parameters, led_options, parameter_names):
             if(not param in options):
-                print(f"Failure - {name}: {param}")
-                print(f"Select an option from {options}")
+                log.warning("Failure - %s: %s", name, param)
+                log.warning("Select an option from %s", options)
                 valid_command = False
         if(valid_command):
             led = f"LED {port_handle}{led_number}{led_state}"
@@ -354,17 +644,26 @@ class NDI_Aurora:
             "B": "Button box: a button box can have switches and LEDs, but no sensors. No transformations are returned for a button box tool, but switch status is returned"
         }
         if(not tool_tracking_priority in tool_tracking_priorities):
-            print(f"Invalid option ({tool_tracking_priority}). Select one from {tool_tracking_priorities}.")
-            print("Switching to dyanamic option 'D'")
+            log.warning("Invalid option (%s). Select one from %s.", tool_tracking_priority, tool_tracking_priorities)
+            log.warning("Switching to dynamic option 'D'")
             tool_tracking_priority = "D"
         command_str = f"PENA {port_handle}{tool_tracking_priority}\r"
         reply = self.send_command(command_str)
+        return reply
 
-    def phf(self):
+    def phf(self, port_handle):
         """
         Releases system resources from an unused port handle
+        Syntax:
+            PHF<SPACE><Port Handle><CR>
+        Example command and reply:
+            PHF 0A -> OKAYA896
         """
-        pass
+        command_str = f"PHF {port_handle}\r"
+        reply = self.send_command(command_str)
+        if(reply.startswith("OKAY")):
+            self._forget_tool_definitions([port_handle])
+        return reply
 
     def phinf(self):
         """
@@ -389,7 +688,7 @@ class NDI_Aurora:
         # Currently just using "PHSR" to return all port handles and set them too
         # Check if initialized, if not, initialize it
         if(not self.get_init_flag()):
-            print(f"Initializing via PHSR")
+            log.info("Initializing via PHSR")
             self.init()
         options = {
             "00": "Reports all allocated port handles (default)",
@@ -399,14 +698,95 @@ class NDI_Aurora:
             "04": "Reports enabled port handles"
             }
         if(not option in options):
-            print(f"Invalid option ({option}). Select one from {options}.")
-            print(f"Switching to default option '{option[0]}'")
-            option = options[0]
+            log.warning("Invalid option (%s). Select one from %s.", option, options)
+            log.warning("Switching to default option '00'")
+            option = "00"
         phsr = f"PHSR {option}\r"
         reply = self.send_command(phsr)
-        if(self.get_debug_mode()):
-            print(f"\t> PHSR: {option} - {options[option]}")
-            reply_decode = self.phsr_reply_decode(reply)
+        if(reply.startswith("ERROR")):
+            return None
+        phsr_log.debug("\t> PHSR: %s - %s", option, options[option])
+        return self.phsr_reply_decode(reply, option)
+
+    def bring_up_tools(self, tool_tracking_priority="D", priorities=None, max_attempts=3, definitions=None):
+        """
+        Frees, initializes and enables the port handles of all connected tools, following the port handle flow chart:
+            PHSR 01 -> PHF, PHSR 02 -> PINIT, repeated until neither reports a port handle, then PHSR 03 -> PENA
+        The commands of each step are sent back to back (send_commands). Port handles whose command fails are retried on
+        their own, up to max_attempts times, the others are not sent again.
+        priorities: optional {port handle: tool tracking priority} overriding tool_tracking_priority
+        definitions: optional {port handle: tool definition} uploaded with PVWR before PINIT, see load_tool_definitions.
+            A port handle whose upload fails is not initialized.
+        Returns {port handle: PortHandleInfo} for every port handle reported by PHSR 00 afterwards
+        """
+        if(priorities is None):
+            priorities = {}
+        definitions = {port_handle: self._tool_definition_bytes(definition)
+                       for port_handle, definition in (definitions or {}).items()}
+        if(not self.get_init_flag()):
+            self.init()
+        errors = {}
+        attempted = set()
+        while(True):
+            # A split port reports its second port handle only after the first one is initialized, so check again
+            to_free = [port_handle for port_handle in self.phsr_port_handles("01") if not ("PHF", port_handle) in attempted]
+            free_errors = self.send_with_retries(to_free, lambda port_handle: f"PHF {port_handle}\r", max_attempts)
+            errors.update(free_errors)
+            self._forget_tool_definitions(port_handle for port_handle in to_free if not port_handle in free_errors)
+            to_init = [port_handle for port_handle in self.phsr_port_handles("02") if not ("PINIT", port_handle) in attempted]
+            upload_errors = self.load_tool_definitions({port_handle: definitions[port_handle] for port_handle in to_init
+                                                        if port_handle in definitions})
+            errors.update(upload_errors)
+            pinit_errors = self.send_with_retries([port_handle for port_handle in to_init if not port_handle in upload_errors],
+                                                  lambda port_handle: f"PINIT {port_handle}\r", max_attempts)
+            errors.update(pinit_errors)
+            self._port_handles_initialized(port_handle for port_handle in to_init
+                                           if not port_handle in upload_errors and not port_handle in pinit_errors)
+            if(not to_free and not to_init):
+                break
+            attempted.update(("PHF", port_handle) for port_handle in to_free)
+            attempted.update(("PINIT", port_handle) for port_handle in to_init)
+        to_enable = self.phsr_port_handles("03")
+        def pena_command(port_handle):
+            return f"PENA {port_handle}{priorities.get(port_handle, tool_tracking_priority)}\r"
+        errors.update(self.send_with_retries(to_enable, pena_command, max_attempts))
+
+        decoded = self.phsr("00")
+        port_handles = [] if(decoded is None) else decoded[1]
+        table = {}
+        for port_handle, port_status in port_handles:
+            status = int(port_status, 16)
+            flags = decode_port_status(status)
+            priority = priorities.get(port_handle, tool_tracking_priority) if(flags.enabled) else None
+            table[port_handle] = PortHandleInfo(port_handle, status, flags.occupied, flags.initialized, flags.enabled,
+                                                priority, errors.get(port_handle))
+        self.tool_config = (tool_tracking_priority, {port_handle: info.tool_tracking_priority
+                                                     for port_handle, info in table.items() if(info.enabled)}, definitions)
+        return table
+
+    def phsr_port_handles(self, option):
+        """
+        Port handles reported by PHSR with the given option, empty on error
+        """
+        decoded = self.phsr(option)
+        if(decoded is None):
+            return []
+        return [port_handle for port_handle, _ in decoded[1]]
+
+    def send_with_retries(self, port_handles, make_command, max_attempts=3):
+        """
+        Sends make_command(port_handle) for every port handle back to back, then resends only the failed ones
+        Returns {port handle: last ERROR reply} for port handles that still fail after max_attempts
+        """
+        errors = {}
+        pending = list(port_handles)
+        for _ in range(max_attempts):
+            if(not pending):
+                break
+            replies = self.send_commands([make_command(port_handle) for port_handle in pending])
+            errors = {port_handle: reply.strip() for port_handle, reply in zip(pending, replies) if not reply.startswith("OKAY")}
+            pending = [port_handle for port_handle in pending if port_handle in errors]
+        return errors
 
     def pinit(self, port_handle):
         """
@@ -420,8 +800,11 @@ class NDI_Aurora:
         """
         command_str = f"PINIT {port_handle}\r"
         reply = self.send_command(command_str)
+        if(reply.startswith("OKAY")):
+            self._port_handles_initialized([port_handle])
+        return reply
 
-    def pprd(self):
+    def pprd(self, port_handle, address=0):
         """
         Reads data from the SROM device in a tool
         Prerequisite command:
@@ -430,16 +813,32 @@ class NDI_Aurora:
             PPRD<SPACE><Port Handle><SROM Device Address><CR>
         Example command and reply:
             PPRD 0A0000 -> 010041010000000200000000053CDD3302000000020000000000000000000000000000000000000000000000000000000000000008000000780B6D3D9E0F73BE7DE9
+        Returns the 64 bytes at address (a multiple of 64, 0000 to 07C0), None on error. Raises CRCMismatchError for a
+        corrupted reply, the data may end up in the tool cache.
         """
-        pass
+        reply = self.send_command(f"PPRD {port_handle}{address:04X}\r")
+        return HelperClass.pprd_reply_parse(reply)
 
-    def ppwr(self):
+    def ppwr(self, port_handle, address, data):
         """
         Writes data to the SROM device in a tool
-        """
-        pass
+        Prerequisite command:
+            PSEL
+        Syntax:
+            PPWR<SPACE><Port Handle><SROM Device Address><SROM Device Data><CR>
+        Example command and reply:
+            PPWR 0A0000<128 hexadecimal characters> -> OKAYA896
+        Writes one 64 byte chunk at address (a multiple of 64), shorter data is padded with 0xFF. SROM devices are
+        write-once, use write_srom for whole tool definitions.
+        """
+        chunk = bytes(data).ljust(CHUNK_SIZE, b"\xff")
+        reply = self.send_command(f"PPWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+        selected = self.selected_srom.get(port_handle)
+        if(selected is not None and reply.startswith("OKAY")):
+            self._update_srom_image(selected, [(address, chunk)])
+        return reply
 
-    def psel(self):
+    def psel(self, port_handle, device_id):
         """
         Selects a tool SROM device as the target for reading or writing with PPRD or PPWR
         Prerequisite command:
@@ -449,7 +848,11 @@ class NDI_Aurora:
         Example command and reply:
             PSEL 0A0B3876530000005B -> OKAYA896
         """
-        pass
+        command_str = f"PSEL {port_handle}{device_id}\r"
+        reply = self.send_command(command_str)
+        if(reply.startswith("OKAY")):
+            self.selected_srom[port_handle] = device_id
+        return reply
 
     def psout(self):
         """
@@ -457,7 +860,7 @@ class NDI_Aurora:
         """
         pass
 
-    def psrch(self):
+    def psrch(self, port_handle):
         """
         Returns a list of valid SROM device IDs for a tool
         Syntax:
@@ -465,8 +868,77 @@ class NDI_Aurora:
         Example command and reply:
             PPSRCH 0A -> 10B3876530000005B7FFF, In this case, there is one SROM device, with ID 0B3876530000005B.
                 1-0B3876530000005B7FFF
+        Returns the device IDs, None on error
         """
-        pass
+        reply = self.send_command(f"PSRCH {port_handle}\r")
+        return HelperClass.psrch_reply_parse(reply)
+
+    def read_srom(self, port_handle, device_id=None, size=SROM_SIZE):
+        """
+        Reads the SROM device of a tool, returns (device ID, data), data is None if the device cannot be read
+        device_id: the device to read, the first one PSRCH reports when None
+        The PPRD commands of all 64 byte chunks are sent back to back. With a tool cache every device is read only once,
+        later reads of the same device ID come from the cache without PSEL and PPRD.
+        """
+        if(device_id is None):
+            device_ids = self.psrch(port_handle)
+            if(not device_ids):
+                return None, None
+            device_id = device_ids[0]
+        cache = self.tool_cache
+        if(cache is not None):
+            data = cache.get_srom(device_id)
+            if(data is not None and len(data) >= size):
+                return device_id, data[:size]
+        if(not self.psel(port_handle, device_id).startswith("OKAY")):
+            return device_id, None
+        replies = self.send_commands([f"PPRD {port_handle}{address:04X}\r" for address in range(0, size, CHUNK_SIZE)])
+        data = bytearray()
+        for reply in replies:
+            chunk = HelperClass.pprd_reply_parse(reply)
+            if(chunk is None):
+                return device_id, None
+            data += chunk
+        data = bytes(data)
+        if(cache is not None and size == SROM_SIZE):
+            cache.put_srom(device_id, data)
+        return device_id, data
+
+    def write_srom(self, port_handle, data, device_id=None, address=0):
+        """
+        Permanently writes data (e.g. a tool definition file) to the SROM device of a tool starting at address, padded
+        with 0xFF to whole 64 byte chunks. Chunks the cached image of the device already holds are not written again.
+        Returns {address: ERROR reply} of the chunks that failed, None if the device cannot be selected
+        """
+        if(device_id is None):
+            device_ids = self.psrch(port_handle)
+            if(not device_ids):
+                return None
+            device_id = device_ids[0]
+        if(not self.psel(port_handle, device_id).startswith("OKAY")):
+            return None
+        cache = self.tool_cache
+        image = None if(cache is None) else cache.get_srom(device_id)
+        to_write = [(address + offset, chunk) for offset, chunk in chunks(data, fill=b"\xff")
+                    if(image is None or image[address + offset:address + offset + CHUNK_SIZE] != chunk)]
+        replies = self.send_commands([f"PPWR {port_handle}{chunk_address:04X}{chunk.hex().upper()}\r"
+                                      for chunk_address, chunk in to_write])
+        errors = {chunk_address: reply.strip() for (chunk_address, _), reply in zip(to_write, replies)
+                  if not reply.startswith("OKAY")}
+        self._update_srom_image(device_id, [(chunk_address, chunk) for chunk_address, chunk in to_write
+                                            if not chunk_address in errors])
+        return errors
+
+    def _update_srom_image(self, device_id, written):
+        # Keeps the cached image of an SROM device in step with PPWR writes
+        cache = self.tool_cache
+        image = None if(cache is None) else cache.get_srom(device_id)
+        if(image is None or not written):
+            return
+        image = bytearray(image)
+        for address, chunk in written:
+            image[address:address + CHUNK_SIZE] = chunk
+        cache.put_srom(device_id, image)
 
     def purd(self):
         """
@@ -480,46 +952,223 @@ class NDI_Aurora:
         """
         pass
 
-    def pvwr(self):
+    def pvwr(self, port_handle, address, data):
         """
         Override a tool definition file in a tool, and can be used to test a tool definiton file before permanently recording the tool definition file onto the SROM device
         Syntax:
             PVWR<SPACE><Port Handle><Start Address><Tool Definition Data><CR>
         Example command and reply:
             PVWR 0B00004E444900551C000001000000000000010100000001A419335A000000030000000300000000000040000000000000000000000000000000000000000000000000 -> OKAYA896
+        Writes one 64 byte chunk at address (a multiple of 64, 0000 to 03C0), shorter data is padded with zeros. Use
+        load_tool_definition to upload a whole tool definition file.
         """
-        pass
+        chunk = bytes(data).ljust(CHUNK_SIZE, b"\x00")
+        reply = self.send_command(f"PVWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+        self._forget_tool_definitions([port_handle])
+        return reply
 
-    def reset(self):
+    def load_tool_definition(self, port_handle, definition):
         """
-        Resets the system
+        Uploads one tool definition with PVWR, returns its digest, None if the upload failed
         """
-        # crc16 = HelperClass.crc16('RESET')
-        # command_str = f"RESET{str(crc16)}\r"
-        # reply = self.send_command(command_str)
+        if(self.load_tool_definitions({port_handle: definition})):
+            return None
+        return self.tool_definitions[port_handle]
 
-        crc16 = HelperClass.calc_crc16('RESET', self)
-        command_str = f"RESET{str(self.get_CRC16())}\r"
-        reply = self.send_command(command_str)
-        # self.ser.write(command_str.encode())
+    def load_tool_definitions(self, definitions):
+        """
+        Uploads tool definitions with PVWR, definitions is {port handle: definition}, a definition is the path of a .rom
+        file, its bytes or the digest of a definition in the tool cache.
+        Each definition is split into 64 byte chunks, the most one PVWR command carries, and the chunks of all port
+        handles are sent back to back. A port handle that already holds the same definition (by digest) is skipped, it
+        only has to be uploaded again after PHF, a second PINIT, RESET or a serial break. Run it before PINIT.
+        Returns {port handle: ERROR reply} for the port handles whose upload failed
+        """
+        uploads = {}
+        for port_handle, definition in definitions.items():
+            data = self._tool_definition_bytes(definition)
+            digest = definition_digest(data)
+            if(self.tool_definitions.get(port_handle) != digest):
+                uploads[port_handle] = (data, digest)
+        commands = []
+        owners = []
+        for port_handle, (data, _) in uploads.items():
+            for address, chunk in chunks(data):
+                commands.append(f"PVWR {port_handle}{address:04X}{chunk.hex().upper()}\r")
+                owners.append(port_handle)
+        replies = self.send_commands(commands) if(commands) else []
+        errors = {}
+        for port_handle, reply in zip(owners, replies):
+            if(not reply.startswith("OKAY")):
+                errors.setdefault(port_handle, reply.strip())
+        self._forget_tool_definitions(errors)
+        for port_handle, (_, digest) in uploads.items():
+            if(not port_handle in errors):
+                self.tool_definitions[port_handle] = digest
+                self._definitions_pending.add(port_handle)
+        if(uploads):
+            log.info("Uploaded %d tool definition(s) in %d PVWR commands, %d failed", len(uploads), len(commands), len(errors))
+        return errors
+
+    def _tool_definition_bytes(self, definition):
+        # Path of a .rom file, its bytes or the digest of a cached definition
+        cache = self.tool_cache
+        if(isinstance(definition, (bytes, bytearray, memoryview))):
+            data = bytes(definition)
+        elif(cache is not None and cache.get(definition) is not None):
+            return cache.get(definition)
+        else:
+            with open(definition, "rb") as f:
+                data = f.read()
+        if(not data or len(data) > DEFINITION_SIZE):
+            raise ValueError(f"Tool definition of {len(data)} bytes, 1 to {DEFINITION_SIZE} fit")
+        if(cache is not None):
+            cache.add(data)
+        return data
 
-    def serial_break(self):
+    def _port_handles_initialized(self, port_handles):
+        # PINIT uses an uploaded tool definition once, initializing the port handle again drops it
+        for port_handle in port_handles:
+            if(port_handle in self._definitions_pending):
+                self._definitions_pending.discard(port_handle)
+            else:
+                self.tool_definitions.pop(port_handle, None)
+
+    def _forget_tool_definitions(self, port_handles):
+        for port_handle in port_handles:
+            self.tool_definitions.pop(port_handle, None)
+            self._definitions_pending.discard(port_handle)
+
+    def reset(self, reset_option="0"):
         """
         Resets the system
-        """
-        pass
+        Syntax:
+            RESET<SPACE><Reset Option><CR>
+        Reset options:
+            0: soft reset, reply OKAY<CRC16><CR>
+            1: hard reset (Aurora V2 and V3 only), reply RESET<CRC16><CR>
+        The reply of a successful reset is sent at 9600 baud 8N1 without handshaking, the system waits 100 ms before the
+        reset so the host port is switched to these settings right after the command is written.
+        """
+        if(not reset_option in ("0", "1")):
+            log.warning("Invalid option (%s). Select one from ['0', '1'].", reset_option)
+            return None
+        def send_reset(ser):
+            self.reader.write(encode_command(f"RESET {reset_option}\r", self.command_crc))
+            ser.baudrate = 9600
+            ser.rtscts = False
+            self.reader.reset()
+            return bytes(self.reader.read_reply())
+        reply = self.run_io(send_reset).decode(errors='replace')
+        self._reset_session()
+        if(log.isEnabledFor(logging.INFO)):
+            self.reply_decoder(reply, f"RESET {reset_option}")
+        return reply
 
-    def sflist(self):
+    def _reset_session(self):
+        # After a reset or serial break the system is uninitialized, at 9600 baud and out of tracking mode
+        self.set_init_flag(False)
+        self.link_settings = ("0", 9600, "0")
+        self.tracking_option = None
+        self._forget_tool_definitions(list(self.tool_definitions))
+        self.selected_srom = {}
+
+    def serial_break(self, duration=0.25, reply_timeout=3.0):
+        """
+        Resets the system with a serial break. The system returns to 9600 baud, 8 data bits, no parity, 1 stop bit and no
+        hardware handshaking, the host port is switched back to the same settings.
+        reply_timeout: seconds to wait for the reply after the break, if the port has a shorter read timeout
+        Reply:
+            RESET<CRC16><CR>
+        """
+        def send_break(ser):
+            ser.baudrate = 9600
+            ser.rtscts = False
+            ser.reset_input_buffer()
+            self.reader.reset()
+            previous_timeout = ser.timeout
+            if(previous_timeout is not None):
+                ser.timeout = max(previous_timeout, duration + reply_timeout)
+            try:
+                ser.send_break(duration)
+                return bytes(self.reader.read_reply())
+            finally:
+                ser.timeout = previous_timeout
+        reply = self.run_io(send_break).decode(errors='replace')
+        self._reset_session()
+        return reply
+
+    def sflist(self, reply_option="00"):
         """
         Returns information about the supported features of the system
-        """
-        pass
+        Syntax:
+            SFLIST<SPACE><Reply Option><CR>
+        Reply options:
+            00: summary of supported features, 8 hexadecimal characters (bit field)
+            03: number of volumes and volume shapes
+            10: number of ports (deprecated, GET Features.Hardware.Max Tool Ports)
+        Example command and reply:
+            SFLIST 00 -> 00090004<CRC16>
+        See AuroraCapabilities for the decoded values.
+        """
+        reply_options = ["00", "03", "10"]
+        if(not reply_option in reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, reply_options)
+            return None
+        reply = self.send_command(f"SFLIST {reply_option}\r")
+        log.info("SFLIST %s: %s", reply_option, reply)
+        return reply
 
-    def tstart(self):
+    def tstart(self, reply_option="00"):
         """
         Starts tracking mode
+        Prerequisite command:
+            INIT
+        Syntax:
+            TSTART<SPACE><Reply Option><CR>
+        Example command and reply:
+            TSTART -> OKAYA896
         """
-        pass
+        reply_options = {
+            "00": "Default",
+            "40": "Faster acquisition mode (66 Hz), precision uncertainty increases by a factor of 2",
+            "80": "Resets the frame counter to zero",
+            "C0": "Faster acquisition mode and resets the frame counter to zero"
+        }
+        if(not reply_option in reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, reply_options)
+            log.warning("Switching to default option '00'")
+            reply_option = "00"
+        tstart = f"TSTART {reply_option}\r"
+        reply = self.send_command(tstart)
+        if(reply.startswith("OKAY")):
+            self.tracking_option = reply_option
+        return reply
+
+    def start_streaming(self, capacity=1024, mode="BX", reply_option="0001", tstart_option="00", frame_filter=None, sinks=None):
+        """
+        Starts tracking mode and a background reader thread that fills a ring buffer with decoded frames
+        Returns the AuroraStream.TrackingStream, read frames with stream.latest() or stream.read(since)
+        frame_filter: optional AuroraFilters filter (KalmanFilter, OneEuroFilter, MovingMedianFilter) applied to every frame
+        sinks: optional callables sink(frame, timestamp) called for every frame, e.g. AuroraSharedMemory.SharedMemoryPublisher
+        """
+        if(self.stream is not None and self.stream.is_running()):
+            return self.stream
+        self.stream = TrackingStream(self, capacity, mode, reply_option, tstart_option, frame_filter=frame_filter, sinks=sinks)
+        self.stream.start()
+        return self.stream
+
+    def stop_streaming(self, timeout=2.0):
+        """
+        Stops the background reader thread and tracking mode, returns False if the thread is still busy after timeout
+        seconds, the stream is kept until it has stopped
+        """
+        if(self.stream is not None):
+            if(not self.stream.stop(timeout=timeout)):
+                log.warning("Stream thread still busy after %s s", timeout)
+                return False
+            self.stream = None
+        return True
 
     def tstop(self):
         """
@@ -532,7 +1181,9 @@ class NDI_Aurora:
         """
         tstop = f"TSTOP \r"
         reply = self.send_command(tstop)
-        print(f"TSTOP. Tracking stopped")
+        self.tracking_option = None
+        log.info("TSTOP. Tracking stopped")
+        return reply
 
 
     def ttcfg(self):
@@ -552,11 +1203,34 @@ class NDI_Aurora:
         """
         pass
 
-    def tx(self):
+    def tx(self, reply_option="0001", timeout=None):
         """
         Returns the latest tool transformations and system status in text format
-        """
-        pass
+        Prerequisite command:
+            TSTART
+        Syntax:
+            TX<SPACE><Reply Option><CR>
+        Example command and reply:
+            TX 0001 -> 010A+03298+00786-08402+04231-001603+005330-179831+0205600000031000000E9<LF>0000BC7B
+        Returns a TrackingFrame (see AuroraTX.tx_reply_decode), or None if the system replied with an error
+        timeout: optional shorter read timeout for this poll, see bx
+        """
+        if(not reply_option in tx_reply_options):
+            log.warning("Invalid option (%s). Select one from %s.", reply_option, tx_reply_options)
+            log.warning("Switching to default option '0001'")
+            reply_option = "0001"
+        tx = f"TX {reply_option}\r"
+        reply = self.exchange(tx, TEXT_REPLY, timeout)
+        receive_time = self.receive_time()
+        self.last_reply_time = receive_time
+        if(reply.startswith(b"ERROR")):
+            if(log.isEnabledFor(logging.INFO)):
+                self.reply_decoder(reply.decode(errors='replace'), tx)
+            return None
+        frame = self.decode_frame(tx_reply_decode, reply, "TX")
+        if(self.clock is not None):
+            self.clock.update_frame(frame, receive_time)
+        return frame
     
     def ver(self, reply_option=0):
         """
@@ -564,12 +1238,12 @@ class NDI_Aurora:
         """
         reply_options = [0, 4, 5, 7, 8]
         if(reply_option in reply_options):
-            print("---")
             ver = f"VER {reply_option}\r"
-            self.send_command(ver)
-            print("---")
+            reply = self.send_command(ver)
+            log.info("VER %d: %s", reply_option, reply)
+            return reply
         else:
-            print(f"*** Error 'ver' does not have reply option '{reply_option}' as a valid option.\n*** Select one from {reply_options}")
+            log.warning("*** Error 'ver' does not have reply option '%s' as a valid option.\n*** Select one from %s", reply_option, reply_options)
 
     def vsel(self):
         """
@@ -580,44 +1254,86 @@ class NDI_Aurora:
 class HelperClass:
     # Hex numbers 0A-FF, in 2 character format, upper case
     port_handle_options = [hex(i)[2:].zfill(2).upper() for i in range(0x0A, 0x100)]
+    # COMM baud rate parameter -> bits per second
+    baud_rate_options = {"0": 9600, "1": 14400, "2": 19200, "3": 38400, "4": 57600, "5": 115200, "6": 921600, "A": 230400}
+
+    def firmware_supports_fast_baud_rates(api_revision: str, combined_firmware_revision: str):
+        """
+        230400 and 921600 baud are available with combined firmware revision 009 (API revision D.001.006) or later
+        api_revision: APIREV reply without CRC16, e.g. "D.001.006"
+        combined_firmware_revision: VER 5 reply without CRC16, e.g. "009"
+        """
+        try:
+            if(int(combined_firmware_revision.strip()) >= 9):
+                return True
+        except ValueError:
+            pass
+        parts = api_revision.strip().split(".")
+        if(len(parts) == 3 and parts[0] == "D"):
+            try:
+                return (int(parts[1]), int(parts[2])) >= (1, 6)
+            except ValueError:
+                return False
+        return False
 
     def crc16(data: str, ndi_obj: NDI_Aurora, poly=0xA001):
         """
-        16-bit Cyclical Redundancy Check
+        16-bit Cyclical Redundancy Check, continued from the running CRC16 of ndi_obj
+        Prefer AuroraCRC16.crc16, which does not change the state of the NDI_Aurora object
         """
-        crc = ndi_obj.get_CRC16()
-        for b in bytearray(data, 'ascii'):
-            crc ^= b
-            for _ in range(8):
-                crc = (crc >> 1) ^ poly if (crc & 0x0001) else crc >> 1
-            # print(f"b = {b} | crc = {crc}")
+        table = crc16_table if(poly == CRC16_POLY) else make_crc16_table(poly)
+        crc = crc16(data, ndi_obj.get_CRC16(), table)
         ndi_obj.set_CRC16(crc)
         return crc
     
     def calc_crc16(data_str: str, ndi_obj: NDI_Aurora):
         """
         Refer to Helper/CalcCRC16.cpp to double check that the CRC values are matching.
+        Helper/crc16_cross_check.py compares it against AuroraCRC16.
 
         data_str: Data value to add to running CRC16.
         crc16   : Running value always updated to double check that messages are matching.
 
         This routine calculates a running CRC16 using the polynomial: X^16 + X^15 + X^2 + 1.
         """
-        oddparity = [0, 1, 1, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0, 1, 1, 0]
-        crc16 = ndi_obj.get_CRC16()
-        for ch in data_str:
-            data = ord(ch)
-            data = (data ^ (crc16 & 0xff)) & 0xff
-            crc16 >>= 8
-            if(oddparity[data & 0x0f] ^ oddparity[data >> 4]):
-                crc16 ^= 0xc001
-            data <<= 6
-            crc16 ^= data
-            data <<= 1
-            crc16 ^= data
-        
-        ndi_obj.set_CRC16(crc16)
-        return crc16
+        crc = crc16(data_str, ndi_obj.get_CRC16())
+        ndi_obj.set_CRC16(crc)
+        return crc
+
+    def phsr_reply_parse(reply: str):
+        """
+        Splits a PHSR reply into the number of port handles, (port handle, port handle status) tuples and the CRC16
+        See NDI_Aurora.phsr_reply_decode for the reply structure
+        """
+        # Number of Port Handles
+        num_port_handles = int(reply[:2], 16)
+        # Port Handles and their Status, 5 characters each
+        port_handles = []
+        for i in range(2, 2 + 5 * num_port_handles, 5):
+            port_handles.append((reply[i:i + 2], reply[i + 2:i + 5]))
+        # CRC16
+        end = 2 + 5 * num_port_handles
+        crc16 = reply[end:end + 4]
+        return num_port_handles, port_handles, crc16
+
+    def pprd_reply_parse(reply: str):
+        """
+        The 64 bytes of a PPRD reply, None for an ERROR reply. Raises CRCMismatchError for a corrupted reply.
+        """
+        if(reply.startswith("ERROR")):
+            return None
+        if(not check_reply(reply)):
+            raise CRCMismatchError("PPRD reply CRC16 mismatch")
+        return bytes.fromhex(reply[:2 * CHUNK_SIZE])
+
+    def psrch_reply_parse(reply: str):
+        """
+        SROM device IDs of a PSRCH reply, <Number of Devices><16 character ID>..., None for an ERROR reply
+        """
+        if(reply.startswith("ERROR")):
+            return None
+        count = int(reply[0], 16)
+        return [reply[1 + 16 * i:17 + 16 * i] for i in range(count)]
 
     def get_os():
         """
@@ -631,7 +1347,7 @@ class HelperClass:
             os_type = "Mac"
         elif(os == "Linux"):
             os_type = "Linux"
-        print(f"Operating System = {os_type}")
+        log.info("Operating System = %s", os_type)
         port = HelperClass.find_com_port()
         return os_type
     
@@ -642,8 +1358,8 @@ class HelperClass:
         try:
             ports = list_ports.comports()
             for port, desc, hwid in sorted(ports):
-                print(f"{port} | {desc} | [{hwid}]")
+                log.info("%s | %s | [%s]", port, desc, hwid)
             return ports
         except Exception as e:
-            print(f"Error: {e}")
+            log.error("Error: %s", e)
         
\ No newline at end of file
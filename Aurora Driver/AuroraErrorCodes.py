@@ -268,4 +268,29 @@ error_codes_dict = {
     "FD": "Reserved.",
     "FE": "Reserved.",
     "FF": "Reserved."
-}
\ No newline at end of file
+}
+
+def error_codes_of(reply):
+    """
+    Error codes of an ERROR<Error Code><CRC16><CR> reply, e.g. "ERROR133A42" -> ["13"], empty for other replies
+    """
+    if(not "ERROR" in reply):
+        return []
+    codes = reply.split("ERROR")[-1].rstrip("\r")
+    if(len(codes) >= 6):
+        # Strip the CRC16
+        codes = codes[:-4]
+    return [codes[i:i + 2] for i in range(0, len(codes) - 1, 2)]
+
+
+def log_reply(logger, reply, command):
+    """
+    Logs a reply to command, ERROR replies at INFO level with the meaning of every error code, others at DEBUG level
+    """
+    stripped_command = command.strip('\r')
+    if("ERROR" in reply):
+        logger.info("Command: %s - Error: %s", stripped_command, reply)
+        for err in error_codes_of(reply):
+            logger.info("* Code: %s - %s", err, error_codes_dict.get(err, "Unknown error"))
+    else:
+        logger.debug("Command: %s - Reply: %s", stripped_command, reply)
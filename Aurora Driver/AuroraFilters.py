@@ -0,0 +1,302 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from AuroraBX import HANDLE_VALID
+
+# Filtered channels of a handle: Tx, Ty, Tz (mm), Q0, Qx, Qy, Qz
+CHANNELS = 7
+POSITION = slice(0, 3)
+ORIENTATION = slice(3, 7)
+FRAME_RATE = 40.0 # Hz, used for the first sample and when host times are missing
+
+
+class PoseFilter:
+    """
+    Base class of the pose filters. Filters consume decoded frames (TrackingFrame from bx/tx, or the (host time, frame)
+    lists returned by TrackingStream.read) and return the same frames with smoothed position and orientation.
+    Missing and disabled handles are passed through unchanged and do not update the filter state.
+    State is kept in arrays preallocated for max_handles port handles, each port handle gets a slot when first seen.
+    Quaternions are kept in one hemisphere (q and -q are the same orientation) and renormalized after filtering.
+    Subclasses implement _filter(slots, host_times, values, valid).
+    """
+    def __init__(self, max_handles=16):
+        self.max_handles = max_handles
+        self.slots = {}
+        self.last_time = np.full(max_handles, np.nan)
+        self.last_quaternion = np.full((max_handles, 4), np.nan)
+
+    def _slot(self, port_handle):
+        slot = self.slots.get(port_handle)
+        if(slot is None):
+            if(len(self.slots) == self.max_handles):
+                raise ValueError(f"More than {self.max_handles} port handles, increase max_handles")
+            slot = self.slots[port_handle] = len(self.slots)
+            self._reset_slots(np.array([slot]))
+        return slot
+
+    def reset(self, port_handle=None):
+        """
+        Forgets the state of one port handle, or of all of them
+        """
+        if(port_handle is None):
+            slots = np.arange(self.max_handles)
+        elif(port_handle in self.slots):
+            slots = np.array([self.slots[port_handle]])
+        else:
+            return
+        self._reset_slots(slots)
+
+    def _reset_slots(self, slots):
+        self.last_time[slots] = np.nan
+        self.last_quaternion[slots] = np.nan
+
+    def filter_batch(self, port_handles, host_times, values, valid=None):
+        """
+        Filters N samples of M port handles in one pass
+        port_handles: the M port handles, host_times: (N,) seconds, values: (N, M, 7) Tx, Ty, Tz, Q0, Qx, Qy, Qz
+        valid: (N, M) bool, defaults to the samples without NaN
+        Returns the filtered (N, M, 7) values, invalid samples are returned unchanged
+        """
+        slots = np.array([self._slot(port_handle) for port_handle in port_handles], dtype=np.intp)
+        host_times = np.asarray(host_times, dtype=np.float64)
+        values = np.array(values, dtype=np.float64)
+        if(valid is None):
+            valid = ~np.isnan(values).any(axis=2)
+        values[:, :, ORIENTATION] = self._align_quaternions(slots, values[:, :, ORIENTATION], valid)
+        filtered = self._filter(slots, host_times, values, valid)
+        quaternions = filtered[:, :, ORIENTATION]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            quaternions /= np.linalg.norm(quaternions, axis=2, keepdims=True)
+        filtered[~valid] = values[~valid]
+        return filtered
+
+    def _align_quaternions(self, slots, quaternions, valid):
+        """
+        Flips quaternions to the hemisphere of the previous valid sample of the same handle, vectorized over time:
+        the sign of each sample relative to its predecessor, accumulated with a cumulative product
+        """
+        n = len(quaternions)
+        if(n == 0):
+            return quaternions
+        # Index of the previous valid sample of each handle, -1 for the one stored in the filter state
+        index = np.where(valid, np.arange(n)[:, None], -1)
+        last_valid = np.maximum.accumulate(index, axis=0)
+        previous_index = np.vstack([np.full((1, len(slots)), -1), last_valid[:-1]])
+        previous = np.where((previous_index >= 0)[:, :, None],
+                            np.take_along_axis(quaternions, np.maximum(previous_index, 0)[:, :, None], axis=0),
+                            self.last_quaternion[slots][None, :, :])
+        dot = np.einsum("nmk,nmk->nm", quaternions, previous)
+        signs = np.where(valid & (dot < 0), -1.0, 1.0)
+        aligned = quaternions * np.cumprod(signs, axis=0)[:, :, None]
+        has_valid = valid.any(axis=0)
+        last = np.take_along_axis(aligned, np.maximum(last_valid[-1], 0)[None, :, None], axis=0)[0]
+        self.last_quaternion[slots[has_valid]] = last[has_valid]
+        return aligned
+
+    def _time_steps(self, slots, time, mask):
+        """
+        Seconds since the previous valid sample of each masked slot, 1/FRAME_RATE for the first one
+        """
+        dt = time - self.last_time[slots[mask]]
+        dt = np.where(np.isfinite(dt) & (dt > 0), dt, 1.0 / FRAME_RATE)
+        self.last_time[slots[mask]] = time
+        return dt
+
+    def _filter(self, slots, host_times, values, valid):
+        raise NotImplementedError
+
+    def filter_frames(self, frames):
+        """
+        Filters a list of (host time, TrackingFrame), e.g. from TrackingStream.read, returns the filtered list
+        """
+        if(not frames):
+            return []
+        port_handles = []
+        columns = {}
+        for _, frame in frames:
+            for handle in frame.handles:
+                if(not handle.port_handle in columns):
+                    columns[handle.port_handle] = len(port_handles)
+                    port_handles.append(handle.port_handle)
+        values = np.full((len(frames), len(port_handles), CHANNELS), np.nan)
+        valid = np.zeros((len(frames), len(port_handles)), dtype=bool)
+        host_times = np.empty(len(frames))
+        for i, (host_time, frame) in enumerate(frames):
+            host_times[i] = host_time
+            for handle in frame.handles:
+                if(handle.handle_status == HANDLE_VALID):
+                    column = columns[handle.port_handle]
+                    values[i, column] = (handle.tx, handle.ty, handle.tz, handle.q0, handle.qx, handle.qy, handle.qz)
+                    valid[i, column] = True
+        filtered = self.filter_batch(port_handles, host_times, values, valid).tolist()
+        result = []
+        for i, (host_time, frame) in enumerate(frames):
+            handles = []
+            for handle in frame.handles:
+                column = columns[handle.port_handle]
+                if(valid[i, column]):
+                    tx, ty, tz, q0, qx, qy, qz = filtered[i][column]
+                    handle = handle._replace(q0=q0, qx=qx, qy=qy, qz=qz, tx=tx, ty=ty, tz=tz)
+                handles.append(handle)
+            result.append((host_time, frame._replace(handles=handles)))
+        return result
+
+    def filter_frame(self, frame, host_time):
+        """
+        Filters one TrackingFrame, e.g. inside TrackingStream (frame_filter) or after each bx() call
+        """
+        return self.filter_frames([(host_time, frame)])[0][1]
+
+    def filter_rows(self, port_handle, rows):
+        """
+        Filters the rows of one port handle of an AuroraTrackingSession.TrackingSession, returns a filtered copy
+        """
+        values = np.concatenate((rows["position"], rows["quaternion"]), axis=1)[:, None, :]
+        valid = (rows["handle_status"] == HANDLE_VALID)[:, None]
+        filtered = self.filter_batch([port_handle], rows["host_time"], values, valid)[:, 0]
+        result = rows.copy()
+        result["position"] = filtered[:, POSITION]
+        result["quaternion"] = filtered[:, ORIENTATION]
+        return result
+
+
+class KalmanFilter(PoseFilter):
+    """
+    Constant velocity Kalman filter, one independent [value, velocity] state per channel.
+    process_noise: white acceleration spectral density, (position mm^2/s^3, orientation 1/s^3)
+    measurement_noise: measurement variance, (position mm^2, orientation)
+    """
+    def __init__(self, max_handles=16, process_noise=(2000.0, 0.05), measurement_noise=(0.25, 1e-6)):
+        self.process_noise = np.array([process_noise[0]] * 3 + [process_noise[1]] * 4)
+        self.measurement_noise = np.array([measurement_noise[0]] * 3 + [measurement_noise[1]] * 4)
+        self.x = np.zeros((max_handles, CHANNELS))      # value
+        self.v = np.zeros((max_handles, CHANNELS))      # velocity
+        self.p = np.zeros((max_handles, CHANNELS, 3))   # covariance P00, P01, P11
+        self.initialized = np.zeros(max_handles, dtype=bool)
+        super().__init__(max_handles)
+
+    def _reset_slots(self, slots):
+        super()._reset_slots(slots)
+        self.initialized[slots] = False
+
+    def _filter(self, slots, host_times, values, valid):
+        filtered = values.copy()
+        q = self.process_noise
+        r = self.measurement_noise
+        for n in range(len(host_times)):
+            mask = valid[n]
+            if(not mask.any()):
+                continue
+            s = slots[mask]
+            z = values[n, mask]
+            dt = self._time_steps(slots, host_times[n], mask)[:, None]
+            new = ~self.initialized[s]
+            # Predict
+            x = self.x[s] + dt * self.v[s]
+            v = self.v[s]
+            p00, p01, p11 = self.p[s, :, 0], self.p[s, :, 1], self.p[s, :, 2]
+            p00 = p00 + dt * (2 * p01 + dt * p11) + q * dt ** 3 / 3
+            p01 = p01 + dt * p11 + q * dt ** 2 / 2
+            p11 = p11 + q * dt
+            # Update with the measured value
+            innovation = z - x
+            gain0 = p00 / (p00 + r)
+            gain1 = p01 / (p00 + r)
+            x = x + gain0 * innovation
+            v = v + gain1 * innovation
+            p00, p01, p11 = (1 - gain0) * p00, (1 - gain0) * p01, p11 - gain1 * p01
+            # First sample of a handle: start at the measurement with no velocity
+            x[new] = z[new]
+            v[new] = 0
+            p00[new] = r
+            p01[new] = 0
+            p11[new] = 2 * r * FRAME_RATE ** 2 # variance of a velocity from two measurements one frame apart
+            self.x[s], self.v[s] = x, v
+            self.p[s, :, 0], self.p[s, :, 1], self.p[s, :, 2] = p00, p01, p11
+            self.initialized[s] = True
+            filtered[n, mask] = x
+        return filtered
+
+
+def smoothing_factor(cutoff, dt):
+    """
+    Exponential smoothing factor of a first order low pass filter with the given cutoff (Hz) for a time step dt (s)
+    """
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter(PoseFilter):
+    """
+    One Euro filter (Casiez et al. 2012): a low pass filter whose cutoff frequency rises with the speed, so it smooths
+    jitter at rest while keeping latency low during fast motion.
+    min_cutoff: cutoff at rest in Hz, (position, orientation)
+    beta: cutoff increase per unit of speed, (position per mm/s, orientation per 1/s)
+    derivative_cutoff: cutoff of the speed estimate in Hz
+    """
+    def __init__(self, max_handles=16, min_cutoff=(1.0, 1.0), beta=(0.01, 0.5), derivative_cutoff=1.0):
+        self.min_cutoff = np.array([min_cutoff[0]] * 3 + [min_cutoff[1]] * 4)
+        self.beta = np.array([beta[0]] * 3 + [beta[1]] * 4)
+        self.derivative_cutoff = derivative_cutoff
+        self.x = np.zeros((max_handles, CHANNELS))
+        self.dx = np.zeros((max_handles, CHANNELS))
+        self.initialized = np.zeros(max_handles, dtype=bool)
+        super().__init__(max_handles)
+
+    def _reset_slots(self, slots):
+        super()._reset_slots(slots)
+        self.initialized[slots] = False
+
+    def _filter(self, slots, host_times, values, valid):
+        filtered = values.copy()
+        for n in range(len(host_times)):
+            mask = valid[n]
+            if(not mask.any()):
+                continue
+            s = slots[mask]
+            z = values[n, mask]
+            dt = self._time_steps(slots, host_times[n], mask)[:, None]
+            new = ~self.initialized[s]
+            x_previous = np.where(new[:, None], z, self.x[s])
+            dx = (z - x_previous) / dt
+            dx = self.dx[s] + smoothing_factor(self.derivative_cutoff, dt) * (dx - self.dx[s])
+            dx[new] = 0
+            cutoff = self.min_cutoff + self.beta * np.abs(dx)
+            x = x_previous + smoothing_factor(cutoff, dt) * (z - x_previous)
+            self.x[s], self.dx[s] = x, dx
+            self.initialized[s] = True
+            filtered[n, mask] = x
+        return filtered
+
+
+class MovingMedianFilter(PoseFilter):
+    """
+    Median of the last 'window' valid samples of each channel, removes outliers (e.g. single frame distortion spikes).
+    A batch is filtered without a per sample loop: the stored history and the new samples are joined and the medians of
+    all windows are taken at once.
+    """
+    def __init__(self, max_handles=16, window=5):
+        if(window < 1):
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.history = np.full((max_handles, window - 1, CHANNELS), np.nan) # last window - 1 samples, oldest first
+        super().__init__(max_handles)
+
+    def _reset_slots(self, slots):
+        super()._reset_slots(slots)
+        self.history[slots] = np.nan
+
+    def _filter(self, slots, host_times, values, valid):
+        filtered = values.copy()
+        window = self.window
+        for column, slot in enumerate(slots):
+            samples = values[valid[:, column], column]
+            if(len(samples) == 0):
+                continue
+            series = np.concatenate((self.history[slot], samples), axis=0)
+            windows = sliding_window_view(series, window, axis=0)  # (len(samples), 7, window)
+            with np.errstate(all="ignore"):
+                medians = np.nanmedian(windows, axis=2)
+            filtered[valid[:, column], column] = medians
+            self.history[slot] = series[len(series) - (window - 1):]
+        return filtered
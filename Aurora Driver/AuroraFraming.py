@@ -0,0 +1,214 @@
+import time
+from functools import lru_cache
+
+from AuroraBX import BX_HEADER, BX_HEADER_SIZE, BX_START_SEQUENCE, BX_UINT16
+from AuroraCRC16 import crc16_hex
+from AuroraLogging import get_logger
+
+log = get_logger("wire")
+
+# First byte of a binary reply on the wire (A5C4 little endian), text replies are ASCII and never start with it
+BX_FIRST_BYTE = BX_START_SEQUENCE & 0xFF
+BX_SECOND_BYTE = BX_START_SEQUENCE >> 8
+
+# After a read timeout the port is drained until it stays quiet this long (seconds) before the next command is written
+RESYNC_QUIET_TIME = 0.05
+RESYNC_POLL_INTERVAL = 0.002
+
+
+class ReplyFramer:
+    """
+    Incremental framer for the byte stream coming from the system. Bytes are appended to one reusable bytearray, complete
+    replies are handed out as memoryview slices of it:
+        text replies   : up to and including the <CR>
+        binary replies : start sequence A5C4, total length from the 6 byte header (the data can contain 0x0D)
+    A memoryview returned by next_reply() is only valid until the next call to writable() or feed(), copy it with bytes()
+    to keep it.
+    """
+    def __init__(self, capacity=4096):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # first byte of the pending reply
+        self._end = 0    # end of the received bytes
+
+    def __len__(self):
+        """
+        Bytes received but not handed out yet
+        """
+        return self._end - self._start
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def needed(self):
+        """
+        Smallest number of bytes that can complete the pending reply: the rest of a binary reply once its header is in,
+        1 for text replies (their length is only known at the <CR>)
+        """
+        available = self._end - self._start
+        if(available == 0 or not self._is_binary()):
+            return 1
+        if(available < BX_HEADER_SIZE):
+            return BX_HEADER_SIZE - available
+        return max(self._binary_length() - available, 1)
+
+    def _is_binary(self):
+        start = self._start
+        return self._buffer[start] == BX_FIRST_BYTE and (self._end - start < 2 or self._buffer[start + 1] == BX_SECOND_BYTE)
+
+    def _binary_length(self):
+        _, reply_length, _ = BX_HEADER.unpack_from(self._buffer, self._start)
+        return BX_HEADER_SIZE + reply_length + BX_UINT16.size
+
+    def writable(self, size):
+        """
+        memoryview of size free bytes at the end of the buffer, fill it (e.g. ser.readinto) and call commit()
+        """
+        if(self._end + size > len(self._buffer)):
+            pending = self._end - self._start
+            if(pending + size > len(self._buffer)):
+                # Grow into a new bytearray, memoryviews handed out earlier keep the old one alive
+                buffer = bytearray(max(2 * len(self._buffer), pending + size))
+                buffer[:pending] = self._view[self._start:self._end]
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            else:
+                self._buffer[:pending] = self._view[self._start:self._end]
+            self._start, self._end = 0, pending
+        return self._view[self._end:self._end + size]
+
+    def commit(self, count):
+        self._end += count
+
+    def feed(self, data):
+        """
+        Appends received bytes
+        """
+        self.writable(len(data))[:] = data
+        self._end += len(data)
+
+    def next_reply(self):
+        """
+        memoryview of the next complete reply, None until one is complete
+        """
+        start, end = self._start, self._end
+        if(start == end):
+            return None
+        if(self._is_binary()):
+            if(end - start < BX_HEADER_SIZE):
+                return None
+            stop = start + self._binary_length()
+            if(stop > end):
+                return None
+        else:
+            index = self._buffer.find(b'\r', start, end)
+            if(index < 0):
+                return None
+            stop = index + 1
+        if(stop == end):
+            self._start = self._end = 0
+        else:
+            self._start = stop
+        return self._view[start:stop]
+
+    def take_pending(self):
+        """
+        bytes of an incomplete reply, e.g. after a read timeout, and clears the buffer
+        """
+        pending = bytes(self._view[self._start:self._end])
+        self.clear()
+        return pending
+
+
+class SerialReader:
+    """
+    Reads replies from a pyserial port (or VirtualAurora, ReplaySerial) through a ReplyFramer.
+    Each read asks for everything the port already holds (in_waiting), but at least the bytes the pending reply still
+    needs, with one readinto() into the framer's buffer, instead of pyserial's read_until() that reads one byte per call.
+    Binary replies are read to their end in one call as soon as their header is in.
+    A read that times out leaves the reader out of sync: the rest of that reply may still arrive and would be taken for
+    the reply to the next command, so the next write() first discards everything until the port is quiet (resync).
+    """
+    def __init__(self, ser, capacity=4096):
+        self.ser = ser
+        self.framer = ReplyFramer(capacity)
+        self.reads = 0  # readinto calls, for benchmarks
+        self.out_of_sync = False # a read timed out, the rest of that reply may still arrive
+        self.bytes_discarded = 0
+
+    def write(self, data):
+        if(self.out_of_sync):
+            self.resync()
+        return self.ser.write(data)
+
+    def reset(self):
+        """
+        Drops buffered bytes, call it together with ser.reset_input_buffer()
+        """
+        self.framer.clear()
+        self.out_of_sync = False
+
+    def resync(self, quiet_time=RESYNC_QUIET_TIME):
+        """
+        Discards buffered bytes and everything the port receives until it is quiet for quiet_time seconds, returns the
+        number of bytes discarded
+        """
+        ser = self.ser
+        discarded = len(self.framer)
+        self.framer.clear()
+        quiet_since = time.monotonic()
+        while(True):
+            waiting = ser.in_waiting
+            if(waiting):
+                discarded += len(ser.read(waiting))
+                quiet_since = time.monotonic()
+            elif(time.monotonic() - quiet_since >= quiet_time):
+                break
+            else:
+                time.sleep(RESYNC_POLL_INTERVAL)
+        self.out_of_sync = False
+        self.bytes_discarded += discarded
+        if(discarded):
+            log.info("Discarded %d bytes of a timed out reply", discarded)
+        return discarded
+
+    def read_reply(self, raise_on_timeout=False):
+        """
+        memoryview of the next complete reply, valid until the next read
+        On a read timeout the bytes received so far are returned (text replies are then missing their <CR>), or
+        TimeoutError is raised with raise_on_timeout.
+        """
+        framer = self.framer
+        ser = self.ser
+        while(True):
+            reply = framer.next_reply()
+            if(reply is not None):
+                return reply
+            size = max(framer.needed(), ser.in_waiting)
+            count = ser.readinto(framer.writable(size)) or 0
+            framer.commit(count)
+            self.reads += 1
+            if(count < size):
+                reply = framer.next_reply()
+                if(reply is not None):
+                    return reply
+                received = len(framer)
+                pending = framer.take_pending()
+                self.out_of_sync = True
+                if(raise_on_timeout):
+                    raise TimeoutError(f"Reply timed out after {received} bytes")
+                return memoryview(pending)
+
+
+@lru_cache(maxsize=256)
+def encode_command(command, crc=False):
+    """
+    Wire bytes of a command, cached so commands that repeat (BX, TX, PHSR ...) are encoded once
+    With crc the command is sent in format 1, <Command>:<Parameters><CRC16><CR>, and the system checks it:
+        encode_command("BX 0001\\r", crc=True) -> b"BX:0001" + CRC16 + b"\\r"
+    """
+    if(not crc):
+        return command.encode()
+    name, _, parameters = command.rstrip("\r").partition(" ")
+    text = f"{name}:{parameters}"
+    return f"{text}{crc16_hex(text)}\r".encode()
@@ -0,0 +1,110 @@
+import logging
+import time
+from collections import deque
+
+# Loggers, one per subsystem, all below "aurora":
+#   aurora.driver     commands, replies and ERROR codes of NDI_Aurora
+#   aurora.phsr       port handle status decoding
+#   aurora.wire       raw wire traffic dumps (WireTrace)
+#   aurora.stream     TrackingStream
+#   aurora.server     network streaming server clients
+#   aurora.async      AsyncNDI_Aurora
+#   aurora.multi      MultiTracker
+#   aurora.recovery   SessionRecovery reconnects
+#   aurora.profile    device capability profiles (AuroraCapabilities)
+# Messages use %-style arguments, so nothing is formatted unless a handler takes the record. Validation messages are
+# warnings and reach stderr even without logging configuration; everything else is silent until logging is configured,
+# e.g. with enable_console_logging() or NDI_Aurora(debug_mode=True).
+ROOT_LOGGER = "aurora"
+
+_console_handler = None
+
+
+def get_logger(subsystem):
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+def enable_console_logging(level=logging.DEBUG, format="%(message)s"):
+    """
+    Logs the aurora loggers to stderr at level, replaces the print based debug output
+    """
+    global _console_handler
+    logger = logging.getLogger(ROOT_LOGGER)
+    if(_console_handler is None):
+        _console_handler = logging.StreamHandler()
+        _console_handler.setFormatter(logging.Formatter(format))
+        logger.addHandler(_console_handler)
+    logger.setLevel(level)
+    return _console_handler
+
+
+def disable_console_logging():
+    global _console_handler
+    logger = logging.getLogger(ROOT_LOGGER)
+    if(_console_handler is not None):
+        logger.removeHandler(_console_handler)
+        _console_handler = None
+    logger.setLevel(logging.NOTSET)
+
+
+class WireTrace:
+    """
+    Ring buffer of the most recent raw serial traffic: (time.monotonic(), direction, bytes) with direction "TX" (host to
+    system) or "RX" (system to host). Recording only appends a tuple, formatting happens in dump().
+    With dump_on_error the trace is logged to aurora.wire when a reply times out or fails its CRC check.
+    Usage:
+        trace = WireTrace(capacity=256)
+        ndi_obj.set_wire_trace(trace)
+        ...
+        print(trace.format())
+    """
+    def __init__(self, capacity=256, dump_on_error=True):
+        self.capacity = capacity
+        self.dump_on_error = dump_on_error
+        self._entries = deque(maxlen=capacity)
+        self.logger = get_logger("wire")
+
+    def record(self, direction, data, timestamp=None):
+        self._entries.append((time.monotonic() if(timestamp is None) else timestamp, direction, bytes(data)))
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entries(self):
+        """
+        Copy of the recorded (timestamp, direction, bytes), oldest first
+        """
+        return list(self._entries)
+
+    def format(self, max_bytes=96):
+        """
+        Trace as text, one line per entry, timestamps relative to the newest entry
+        """
+        entries = self.entries()
+        if(not entries):
+            return ""
+        newest = entries[-1][0]
+        lines = []
+        for timestamp, direction, data in entries:
+            shown = data[:max_bytes]
+            if(all(32 <= b < 127 or b in (10, 13) for b in shown)):
+                text = repr(shown.decode("ascii"))
+            else:
+                text = shown.hex(" ").upper()
+            more = f" ... (+{len(data) - max_bytes} bytes)" if(len(data) > max_bytes) else ""
+            lines.append(f"{(timestamp - newest) * 1e3:+10.3f} ms {direction} {len(data):5d} B  {text}{more}")
+        return "\n".join(lines)
+
+    def dump(self, reason, level=logging.ERROR):
+        """
+        Logs the trace to aurora.wire with the reason, e.g. after a CRC failure
+        """
+        if(self.logger.isEnabledFor(level)):
+            self.logger.log(level, "Wire trace (%s), last %d exchanges:\n%s", reason, len(self._entries), self.format())
+
+    def error(self, reason):
+        if(self.dump_on_error):
+            self.dump(reason)
@@ -0,0 +1,227 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Histogram bucket upper bounds in seconds. Replies take from about 1 ms (short reply at 921600 bps) to about 1 s
+# (INIT, long replies at 9600 bps).
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Counters and their Prometheus help text
+counters_dict = {
+    "commands": "Commands sent",
+    "bytes_sent": "Bytes written to the serial port",
+    "bytes_received": "Reply bytes read from the serial port",
+    "error_replies": "ERROR replies",
+    "timeouts": "Replies that timed out",
+    "crc_failures": "Replies that failed their CRC16 check",
+    "decode_errors": "Replies that could not be decoded for another reason",
+    "frames": "Tracking frames stored by the streaming loop",
+    "duplicate_frames": "Polls that returned the frame of the previous poll",
+    "missed_frames": "Frames the system produced but the streaming loop never polled (frame number gaps)",
+    "dropped_frames": "Frames overwritten in the stream buffer before a consumer read them, counted per consumer",
+    "link_recoveries": "Dead links recovered by reconnecting or resetting the system",
+    "link_recovery_failures": "Dead links that could not be recovered"
+}
+
+# Histograms, labelled by command type (BX, TX, PHSR, ...)
+histograms_dict = {
+    "command_latency_seconds": "Round trip time from writing a command to reading its complete reply",
+    "parse_seconds": "Time to decode one reply"
+}
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, observe() is one bisect and a few additions
+    """
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimated quantile, linear within the bucket that contains it
+        """
+        if(self.count == 0):
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if(cumulative + count >= rank and count > 0):
+                lower = self.bounds[i - 1] if(i > 0) else 0.0
+                upper = self.bounds[i] if(i < len(self.bounds)) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if(self.count) else None,
+            "p50": self.quantile(0.50),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*self.bounds, float("inf")], self.counts))
+        }
+
+
+class Metrics:
+    """
+    Counters, latency histograms per command type and the achieved frame rate of one NDI_Aurora.
+    Instrumentation is off unless a Metrics object is attached, ndi_obj.set_metrics(Metrics()), and then costs about a
+    microsecond per command.
+    Usage:
+        metrics = Metrics()
+        ndi_obj.set_metrics(metrics)
+        ...
+        metrics.snapshot()         # dict
+        metrics.to_prometheus()    # Prometheus text exposition format
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS, frame_window=200):
+        self.buckets = buckets
+        self.frame_window = frame_window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = dict.fromkeys(counters_dict, 0)
+            self.histograms = {name: {} for name in histograms_dict}
+            self.started = time.monotonic()
+            self._frame_times = deque(maxlen=self.frame_window)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name, label, seconds):
+        with self._lock:
+            histogram = self.histograms[name].get(label)
+            if(histogram is None):
+                histogram = self.histograms[name][label] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def command(self, command_type, bytes_sent, bytes_received, seconds):
+        """
+        Records one command/reply exchange
+        """
+        with self._lock:
+            counters = self.counters
+            counters["commands"] += 1
+            counters["bytes_sent"] += bytes_sent
+            counters["bytes_received"] += bytes_received
+            histogram = self.histograms["command_latency_seconds"].get(command_type)
+            if(histogram is None):
+                histogram = self.histograms["command_latency_seconds"][command_type] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def frame(self, timestamp):
+        """
+        Records one frame stored by the streaming loop at host time timestamp
+        """
+        with self._lock:
+            self.counters["frames"] += 1
+            self._frame_times.append(timestamp)
+
+    def get_frame_rate(self):
+        """
+        Frames per second over the last frame_window frames, None before two frames were recorded
+        """
+        times = self._frame_times
+        if(len(times) < 2):
+            return None
+        span = times[-1] - times[0]
+        return (len(times) - 1) / span if(span > 0) else None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_seconds": time.monotonic() - self.started,
+                "counters": dict(self.counters),
+                "frame_rate": self.get_frame_rate(),
+                "histograms": {name: {label: histogram.snapshot() for label, histogram in labels.items()}
+                               for name, labels in self.histograms.items()}
+            }
+
+    def to_prometheus(self, prefix="aurora"):
+        """
+        Metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        with self._lock:
+            for name, help_text in counters_dict.items():
+                lines.append(f"# HELP {prefix}_{name}_total {help_text}")
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {self.counters[name]}")
+            frame_rate = self.get_frame_rate()
+            lines.append(f"# HELP {prefix}_frame_rate Achieved tracking frames per second")
+            lines.append(f"# TYPE {prefix}_frame_rate gauge")
+            lines.append(f"{prefix}_frame_rate {frame_rate if(frame_rate is not None) else 'NaN'}")
+            for name, help_text in histograms_dict.items():
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for label, histogram in sorted(self.histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip([*histogram.bounds, "+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{prefix}_{name}_bucket{{command="{label}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{prefix}_{name}_sum{{command="{label}"}} {histogram.sum}')
+                    lines.append(f'{prefix}_{name}_count{{command="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def command_type(command):
+    """
+    Histogram label of a command, its name without parameters, e.g. "PHSR 02\\r" -> "PHSR"
+    """
+    if(isinstance(command, (bytes, bytearray))):
+        command = command.decode(errors="replace")
+    return command.split(" ", 1)[0].split(":", 1)[0].strip()
+
+
+def record_exchange(metrics, command, reply, seconds):
+    """
+    Records one command/reply exchange, including ERROR replies and text replies cut short by a read timeout
+    """
+    metrics.command(command_type(command), len(command), len(reply), seconds)
+    if(reply.startswith(b"ERROR")):
+        metrics.count("error_replies")
+    elif(not reply.endswith(b"\r") and reply[:2] != b"\xc4\xa5"):
+        metrics.count("timeouts")
+
+
+def serve_metrics(metrics, host="127.0.0.1", port=9464):
+    """
+    Serves metrics.to_prometheus() at http://host:port/metrics from a daemon thread, returns the HTTP server
+    (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if(self.path.split("?")[0] not in ("/", "/metrics")):
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="AuroraMetricsHTTP", daemon=True).start()
+    return server
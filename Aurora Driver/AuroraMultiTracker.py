@@ -0,0 +1,185 @@
+import heapq
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from AuroraClock import FrameClock, frame_number_of
+from AuroraStream import FrameRingBuffer
+from AuroraLogging import get_logger
+
+log = get_logger("multi")
+
+# One frame of the merged stream: the device it came from, its host receive time (time.monotonic()), the estimated host
+# time of its acquisition (None without clocks) and the TrackingFrame
+DeviceFrame = namedtuple("DeviceFrame", ["device_id", "timestamp", "acquisition_time", "frame"])
+
+
+class MultiTracker:
+    """
+    Drives several Aurora Systems (one NDI_Aurora each) at the same time and merges their tracking streams into one
+    stream ordered by host receive time, every frame tagged with its device ID.
+    Each device polls on its own TrackingStream thread, serial reads release the GIL, so every device runs at its full
+    frame rate instead of sharing one polling loop. Bring-up and the other setup steps run in parallel on a thread pool.
+    All timestamps are time.monotonic() of this host; with clocks=True every device also gets an AuroraClock.FrameClock
+    that maps its frame numbers onto the same host time base.
+    A frame is merged once every running device has delivered a frame at least as new, or after max_delay seconds if a
+    device falls silent, so the merged stream lags the newest frame by up to one frame period.
+    Usage:
+        tracker = MultiTracker.open({"room_a": "/dev/ttyUSB0", "room_b": "/dev/ttyUSB1"})
+        tracker.bring_up()
+        tracker.start()
+        frames, since, dropped = tracker.read(since)    # [(timestamp, DeviceFrame), ...]
+        tracker.close()
+    """
+    def __init__(self, devices, capacity=4096, max_delay=0.05, clocks=True):
+        self.devices = dict(devices) # {device ID: NDI_Aurora}
+        self.capacity = capacity
+        self.max_delay = max_delay
+        self.buffer = FrameRingBuffer(capacity)
+        self.streams = {}
+        self.clocks = {}
+        if(clocks):
+            for device_id, ndi_obj in self.devices.items():
+                if(ndi_obj.get_clock() is None):
+                    ndi_obj.set_clock(FrameClock())
+                self.clocks[device_id] = ndi_obj.get_clock()
+        self._lock = threading.Lock()
+        self._pending = []     # heap of (timestamp, order, DeviceFrame) not merged yet
+        self._last_times = {}  # newest receive time per streaming device
+        self._order = 0
+        self.frames_merged = 0
+
+    @classmethod
+    def open(cls, serial_ports, baudrate=9600, **kwargs):
+        """
+        Opens one NDI_Aurora per serial port, serial_ports is {device ID: port} or a list of ports (used as IDs)
+        """
+        from AuroraDriver import NDI_Aurora
+        if(not isinstance(serial_ports, dict)):
+            serial_ports = {port: port for port in serial_ports}
+        return cls({device_id: NDI_Aurora(serial_port=port, baudrate=baudrate) for device_id, port in serial_ports.items()},
+                   **kwargs)
+
+    def run_all(self, function):
+        """
+        Runs function(ndi_obj) for every device in parallel, returns {device ID: result}
+        Waits for every device, then raises the first exception if any device failed.
+        """
+        return self._run_parallel({device_id: (lambda ndi_obj=ndi_obj: function(ndi_obj))
+                                   for device_id, ndi_obj in self.devices.items()})
+
+    def _run_parallel(self, calls):
+        with ThreadPoolExecutor(max_workers=max(len(calls), 1), thread_name_prefix="AuroraMulti") as pool:
+            futures = {device_id: pool.submit(call) for device_id, call in calls.items()}
+        failed = {device_id: future.exception() for device_id, future in futures.items() if(future.exception() is not None)}
+        for device_id, e in failed.items():
+            log.warning("Device %s failed: %r", device_id, e)
+        if(failed):
+            raise next(iter(failed.values()))
+        return {device_id: future.result() for device_id, future in futures.items()}
+
+    def bring_up(self, tool_tracking_priority="D", priorities=None, negotiate_baud_rate=None, definitions=None):
+        """
+        Initializes every device and enables its tools in parallel, returns {device ID: NDI_Aurora.bring_up_tools() table}
+        priorities: optional {device ID: {port handle: priority}}, see NDI_Aurora.bring_up_tools
+        negotiate_baud_rate: optional maximum baud rate for NDI_Aurora.negotiate_fastest_link, run first
+        definitions: optional {device ID: {port handle: tool definition}} uploaded with PVWR, see NDI_Aurora.bring_up_tools
+        """
+        priorities = priorities or {}
+        definitions = definitions or {}
+        def bring_up_device(device_id, ndi_obj):
+            if(negotiate_baud_rate):
+                ndi_obj.negotiate_fastest_link(negotiate_baud_rate)
+            ndi_obj.init()
+            return ndi_obj.bring_up_tools(tool_tracking_priority, priorities.get(device_id),
+                                          definitions=definitions.get(device_id))
+        return self._run_parallel({device_id: (lambda device_id=device_id, ndi_obj=ndi_obj: bring_up_device(device_id, ndi_obj))
+                                   for device_id, ndi_obj in self.devices.items()})
+
+    def start(self, mode="BX", reply_option="0001", tstart_option="00", capacity=1024, frame_filters=None):
+        """
+        Starts tracking mode and a TrackingStream on every device in parallel
+        frame_filters: optional {device ID: filter}, see NDI_Aurora.start_streaming
+        """
+        frame_filters = frame_filters or {}
+        with self._lock:
+            self._last_times = dict.fromkeys(self.devices, float("-inf"))
+        def start_device(device_id, ndi_obj):
+            sink = lambda frame, timestamp: self._merge(device_id, frame, timestamp)
+            return ndi_obj.start_streaming(capacity, mode, reply_option, tstart_option, frame_filters.get(device_id), sinks=[sink])
+        self.streams = self._run_parallel({device_id: (lambda device_id=device_id, ndi_obj=ndi_obj: start_device(device_id, ndi_obj))
+                                           for device_id, ndi_obj in self.devices.items()})
+        return self.streams
+
+    def stop(self):
+        """
+        Stops every stream and tracking mode in parallel, then merges the frames still held back
+        """
+        self.run_all(lambda ndi_obj: ndi_obj.stop_streaming())
+        with self._lock:
+            self._last_times = {}
+            self._release(float("inf"))
+
+    def close(self):
+        self.stop()
+        self.run_all(lambda ndi_obj: ndi_obj.close())
+
+    def _merge(self, device_id, frame, timestamp):
+        # Sink of every device stream, runs on that device's reader thread
+        clock = self.clocks.get(device_id)
+        acquisition_time = None
+        if(clock is not None):
+            frame_number = frame_number_of(frame)
+            if(frame_number is not None):
+                acquisition_time = clock.acquisition_time(frame_number)
+        with self._lock:
+            heapq.heappush(self._pending, (timestamp, self._order, DeviceFrame(device_id, timestamp, acquisition_time, frame)))
+            self._order += 1
+            last_times = self._last_times
+            if(timestamp > last_times.get(device_id, float("-inf"))):
+                last_times[device_id] = timestamp
+            # Device streams deliver in receive order, nothing older than the slowest device's newest frame can follow
+            self._release(max(min(last_times.values(), default=timestamp), timestamp - self.max_delay))
+
+    def _release(self, watermark):
+        pending = self._pending
+        while(pending and pending[0][0] <= watermark):
+            timestamp, _, device_frame = heapq.heappop(pending)
+            self.buffer.append(device_frame, timestamp)
+            self.frames_merged += 1
+
+    def latest(self):
+        """
+        (timestamp, DeviceFrame) of the newest merged frame, None before the first one
+        """
+        return self.buffer.latest()
+
+    def read(self, since=0, max_frames=None):
+        """
+        Merged frames written at or after sequence number since, see AuroraStream.FrameRingBuffer.read
+        """
+        return self.buffer.read(since, max_frames)
+
+    def latest_by_device(self):
+        """
+        {device ID: (timestamp, TrackingFrame)} of the newest frame of every streaming device
+        """
+        return {device_id: stream.latest() for device_id, stream in self.streams.items() if(stream.latest() is not None)}
+
+    def get_stats(self):
+        stats = {
+            "frames_merged": self.frames_merged,
+            "pending": len(self._pending),
+            "devices": {}
+        }
+        for device_id, stream in self.streams.items():
+            device_stats = {
+                "polls": stream.polls,
+                "errors": stream.errors,
+                "frames": stream.buffer.get_write_count()
+            }
+            clock = self.clocks.get(device_id)
+            if(clock is not None and clock.samples):
+                device_stats["drift_ppm"] = clock.get_drift_ppm()
+            stats["devices"][device_id] = device_stats
+        return stats
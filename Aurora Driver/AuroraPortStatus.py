@@ -1,9 +1,193 @@
-# 3 hex chars, 12 bit
-port_status_dict = {
-    "01F": "Port handle is initialized but not enabled.",
-    "001": "Port handle is not initialized or enabled"
-}
+from collections import namedtuple
+from itertools import product
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Port handle status
+# PHSR reports 3 hex chars (12 bit, bits 6-11 reserved), BX/TX report 32 bits (8 hex chars in TX) with the fault bits.
+PORT_OCCUPIED = 1 << 0
+PORT_GPIO_1 = 1 << 1
+PORT_GPIO_2 = 1 << 2
+PORT_GPIO_3 = 1 << 3
+PORT_INITIALIZED = 1 << 4
+PORT_ENABLED = 1 << 5
+PORT_OUT_OF_VOLUME = 1 << 6
+PORT_PARTIALLY_OUT_OF_VOLUME = 1 << 7
+PORT_BROKEN_SENSOR = 1 << 8
+PORT_SHORTED_SENSOR = 1 << 10
+PORT_SIGNAL_TOO_LARGE = 1 << 11
+PORT_PROCESSING_EXCEPTION = 1 << 12
+# Bits that mean the transformation of the handle is not trustworthy
+PORT_FAULT_MASK = (PORT_OUT_OF_VOLUME | PORT_PARTIALLY_OUT_OF_VOLUME | PORT_BROKEN_SENSOR | PORT_SHORTED_SENSOR |
+                   PORT_SIGNAL_TOO_LARGE | PORT_PROCESSING_EXCEPTION)
+PORT_STATUS_BITS = 13  # bits 13-31 are reserved
 
-# TODO - interpret 12 bits
+# bit -> (field name, description), bits 9 and 13-31 are reserved
 bit_status_dict = {
-}
\ No newline at end of file
+    0: ("occupied", "Occupied"),
+    1: ("gpio_1", "GPIO line 1 closed"),
+    2: ("gpio_2", "GPIO line 2 closed"),
+    3: ("gpio_3", "GPIO line 3 closed"),
+    4: ("initialized", "Initialized"),
+    5: ("enabled", "Enabled"),
+    6: ("out_of_volume", "Out of volume"),
+    7: ("partially_out_of_volume", "Partially out of volume"),
+    8: ("broken_sensor", "Broken sensor"),
+    10: ("shorted_sensor", "Shorted sensor"),
+    11: ("signal_too_large", "Signal too large"),
+    12: ("processing_exception", "Processing exception")
+}
+
+# System status, the 16 bit field at the end of BX/TX replies
+SYSTEM_HARDWARE_CHANGE = 1 << 5
+SYSTEM_PORT_OCCUPIED = 1 << 6
+SYSTEM_PORT_UNOCCUPIED = 1 << 7
+SYSTEM_DIAGNOSTIC_PENDING = 1 << 8
+SYSTEM_CONFIGURATION_CHANGE = 1 << 10
+SYSTEM_STATUS_SHIFT = 5  # bits 0-4 are reserved, the table below is indexed by bits 5-10
+SYSTEM_STATUS_BITS = 6
+
+# bit -> (field name, description), bits 0-4, 9 and 11-15 are reserved
+system_status_dict = {
+    5: ("hardware_change", "Hardware change, the Field Generator is disconnected"),
+    6: ("port_occupied", "Some port handle has become occupied"),
+    7: ("port_unoccupied", "Some port handle has become unoccupied"),
+    8: ("diagnostic_pending", "Diagnostic pending, read Info.Status.New Alerts with GET"),
+    10: ("configuration_change", "Configuration change, an SIU was added or removed (cleared by PHSR or INIT)")
+}
+
+
+class PortStatusFlags(namedtuple("PortStatusFlags", [name for name, _ in bit_status_dict.values()])):
+    """
+    Decoded port handle status, one bool per bit of bit_status_dict. Instances are shared from a precomputed table,
+    see decode_port_status.
+    """
+    __slots__ = ()
+
+    @property
+    def fault(self):
+        """
+        Out of volume, partially out of volume or a sensor fault
+        """
+        return (self.out_of_volume or self.partially_out_of_volume or self.broken_sensor or self.shorted_sensor or
+                self.signal_too_large or self.processing_exception)
+
+    def descriptions(self):
+        return [description for (_, description), value in zip(bit_status_dict.values(), self) if(value)]
+
+
+class SystemStatusFlags(namedtuple("SystemStatusFlags", [name for name, _ in system_status_dict.values()])):
+    """
+    Decoded system status, one bool per bit of system_status_dict, see decode_system_status
+    """
+    __slots__ = ()
+
+    def descriptions(self):
+        return [description for (_, description), value in zip(system_status_dict.values(), self) if(value)]
+
+
+def _flags_table(flags_class, bits_dict, width, shift=0):
+    # product() counts with its first element as the most significant bit
+    pick = itemgetter(*(width - 1 - (bit - shift) for bit in bits_dict))
+    return tuple(map(flags_class._make, map(pick, product((False, True), repeat=width))))
+
+
+# Every combination of the defined bits, indexed by the masked status value
+port_status_table = _flags_table(PortStatusFlags, bit_status_dict, PORT_STATUS_BITS)
+system_status_table = _flags_table(SystemStatusFlags, system_status_dict, SYSTEM_STATUS_BITS, SYSTEM_STATUS_SHIFT)
+
+
+def decode_port_status(status):
+    """
+    PortStatusFlags of a port handle status, int or hex string (PHSR "01F", TX "00000031"). Reserved bits are ignored.
+    """
+    if(isinstance(status, (str, bytes))):
+        status = int(status, 16)
+    return port_status_table[status & ((1 << PORT_STATUS_BITS) - 1)]
+
+
+def decode_system_status(status):
+    """
+    SystemStatusFlags of a BX/TX system status, int or hex string. Reserved bits are ignored.
+    """
+    if(isinstance(status, (str, bytes))):
+        status = int(status, 16)
+    return system_status_table[(status >> SYSTEM_STATUS_SHIFT) & ((1 << SYSTEM_STATUS_BITS) - 1)]
+
+
+def describe_port_status(status):
+    """
+    One line description of a port handle status, e.g. "Port handle is initialized but not enabled."
+    """
+    flags = decode_port_status(status)
+    if(not flags.occupied):
+        text = "Port handle is not occupied."
+    elif(flags.enabled):
+        text = "Port handle is initialized and enabled."
+    elif(flags.initialized):
+        text = "Port handle is initialized but not enabled."
+    else:
+        text = "Port handle is not initialized or enabled."
+    others = [description for description in flags.descriptions() if(description not in ("Occupied", "Initialized", "Enabled"))]
+    if(others):
+        text += " " + ", ".join(others) + "."
+    return text
+
+
+# PHSR status (3 hex chars) -> description, every combination of the bits PHSR defines (0-5)
+port_status_dict = {f"{value:03X}": describe_port_status(value) for value in range(1 << 6)}
+
+# Whole streams of statuses, e.g. the port_status column of a TrackingSession or of TX rows, are decoded with one mask
+# and shift per flag:
+#   flags = port_status_array(rows["port_status"])
+#   flags["out_of_volume"]    -> bool array
+# For a single condition one mask is enough: port_status_faults(rows["port_status"], PORT_OUT_OF_VOLUME)
+port_status_dtype = None if(np is None) else np.dtype([(name, "?") for name, _ in bit_status_dict.values()])
+system_status_dtype = None if(np is None) else np.dtype([(name, "?") for name, _ in system_status_dict.values()])
+
+
+def _flags_array(statuses, bits_dict, dtype):
+    statuses = np.asarray(statuses, dtype=np.uint32)
+    flags = np.empty(statuses.shape, dtype=dtype)
+    for bit, (name, _) in bits_dict.items():
+        flags[name] = (statuses >> bit) & 1
+    return flags
+
+
+def port_status_array(statuses):
+    """
+    Structured bool array (port_status_dtype) with the decoded flags of an array of port handle statuses
+    """
+    if(np is None):
+        raise ImportError("port_status_array requires numpy")
+    return _flags_array(statuses, bit_status_dict, port_status_dtype)
+
+
+def system_status_array(statuses):
+    """
+    Structured bool array (system_status_dtype) with the decoded flags of an array of system statuses
+    """
+    if(np is None):
+        raise ImportError("system_status_array requires numpy")
+    return _flags_array(statuses, system_status_dict, system_status_dtype)
+
+
+def port_status_faults(statuses, mask=PORT_FAULT_MASK):
+    """
+    Bool array, True where any bit of mask is set, e.g. mask=PORT_OUT_OF_VOLUME
+    """
+    if(np is None):
+        raise ImportError("port_status_faults requires numpy")
+    return (np.asarray(statuses, dtype=np.uint32) & mask) != 0
+
+
+def frame_faults(frame, mask=PORT_FAULT_MASK):
+    """
+    {port handle: PortStatusFlags} of the handles of a TrackingFrame with any bit of mask set, empty for a clean frame
+    """
+    return {handle.port_handle: port_status_table[handle.port_status & ((1 << PORT_STATUS_BITS) - 1)]
+            for handle in frame.handles if(handle.port_status & mask)}
@@ -0,0 +1,277 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from AuroraBX import BX_START_BYTES, BX_HEADER_SIZE, bx_reply_length, bx_reply_decode
+from AuroraCRC16 import crc16_hex, check_reply_batch
+
+# Recording layout
+#   <name>.bxrec : file header, then the BX replies exactly as received, back to back
+#   <name>.bxidx : file header, then one index entry per reply
+DATA_MAGIC = b"AURBXREC"
+INDEX_MAGIC = b"AURBXIDX"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct('<8sHHI')  # magic, version, reserved, reserved
+FILE_HEADER_SIZE = FILE_HEADER.size    # 16 bytes
+
+index_dtype = np.dtype([
+    ("offset", "<u8"),     # byte offset of the reply in the data file
+    ("length", "<u4"),     # reply length in bytes
+    ("reserved", "<u4"),
+    ("host_time", "<f8")   # host receive time, seconds (time.monotonic)
+])
+INDEX_ENTRY = struct.Struct('<QIId')
+
+
+def recording_paths(path):
+    """
+    Returns the (data, index) file paths of a recording, path may be given with or without extension
+    """
+    base, ext = os.path.splitext(path)
+    if(not ext in [".bxrec", ".bxidx"]):
+        base = path
+    return base + ".bxrec", base + ".bxidx"
+
+
+class BXRecorder:
+    """
+    Appends raw BX replies and their host receive times to a recording.
+    Attach it with NDI_Aurora.set_recorder(recorder) to record every BX reply, including the ones read by a TrackingStream.
+    Existing recordings are appended to.
+    """
+    def __init__(self, path):
+        self.data_path, self.index_path = recording_paths(path)
+        self._data = open(self.data_path, "ab")
+        self._index = open(self.index_path, "ab")
+        if(self._data.tell() == 0):
+            self._data.write(FILE_HEADER.pack(DATA_MAGIC, FORMAT_VERSION, 0, 0))
+        if(self._index.tell() == 0):
+            self._index.write(FILE_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, 0, 0))
+        self._offset = self._data.tell()
+        self._lock = threading.Lock()
+        self.frames_written = 0
+
+    def write(self, reply, host_time):
+        """
+        Appends one complete BX reply (bytes, bytearray or memoryview)
+        """
+        with self._lock:
+            self._data.write(reply)
+            self._index.write(INDEX_ENTRY.pack(self._offset, len(reply), 0, host_time))
+            self._offset += len(reply)
+            self.frames_written += 1
+
+    def flush(self):
+        with self._lock:
+            self._data.flush()
+            self._index.flush()
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BXRecording:
+    """
+    Read access to a recording. The data file is memory-mapped, frames are returned as memoryview slices of the mapping
+    and decoded only when asked for.
+    If the index is missing or shorter than the data (e.g. after a crash), it is rebuilt from the reply headers.
+    """
+    def __init__(self, path):
+        self.data_path, self.index_path = recording_paths(path)
+        self._file = open(self.data_path, "rb")
+        magic, version, _, _ = FILE_HEADER.unpack(self._file.read(FILE_HEADER_SIZE))
+        if(magic != DATA_MAGIC):
+            raise ValueError(f"{self.data_path} is not a BX recording")
+        if(version != FORMAT_VERSION):
+            raise ValueError(f"Unsupported recording version {version}")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self._mmap)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        index = None
+        if(os.path.exists(self.index_path) and os.path.getsize(self.index_path) >= FILE_HEADER_SIZE):
+            count = (os.path.getsize(self.index_path) - FILE_HEADER_SIZE) // index_dtype.itemsize
+            if(count > 0):
+                index = np.memmap(self.index_path, dtype=index_dtype, mode="r", offset=FILE_HEADER_SIZE, shape=(count,))
+            else:
+                index = np.zeros(0, dtype=index_dtype)
+        end = FILE_HEADER_SIZE if(index is None or len(index) == 0) else int(index["offset"][-1]) + int(index["length"][-1])
+        if(index is None or end != len(self.data)):
+            index = self.rebuild_index(index)
+        return index
+
+    def rebuild_index(self, index=None):
+        """
+        Scans the data file for replies after the last indexed one. Host times of unindexed replies are unknown (NaN).
+        A truncated reply at the end of the file is ignored.
+        """
+        entries = [] if(index is None) else [tuple(entry) for entry in index]
+        offset = FILE_HEADER_SIZE if(not entries) else entries[-1][0] + entries[-1][1]
+        while(offset + BX_HEADER_SIZE <= len(self.data)):
+            if(self.data[offset:offset + 2] != BX_START_BYTES):
+                break
+            length = bx_reply_length(self.data[offset:offset + BX_HEADER_SIZE])
+            if(offset + length > len(self.data)):
+                break
+            entries.append((offset, length, 0, float("nan")))
+            offset += length
+        return np.array(entries, dtype=index_dtype)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """
+        Raw reply i as a memoryview into the mapped file (no copy)
+        """
+        entry = self.index[i]
+        offset = int(entry["offset"])
+        return self.data[offset:offset + int(entry["length"])]
+
+    def host_times(self):
+        return self.index["host_time"]
+
+    def frame(self, i, check_crc=True):
+        return bx_reply_decode(self[i], check_crc)
+
+    def find_time(self, host_time):
+        """
+        Index of the first reply received at or after host_time
+        """
+        return int(np.searchsorted(self.index["host_time"], host_time, side="left"))
+
+    def iter_frames(self, start=0, stop=None, check_crc=True):
+        """
+        Yields (host_time, TrackingFrame) for replies start to stop, as fast as they can be decoded
+        """
+        stop = len(self) if(stop is None) else min(stop, len(self))
+        offsets = self.index["offset"]
+        lengths = self.index["length"]
+        times = self.index["host_time"]
+        data = self.data
+        for i in range(start, stop):
+            offset = int(offsets[i])
+            yield float(times[i]), bx_reply_decode(data[offset:offset + int(lengths[i])], check_crc)
+
+    def verify(self, batch_size=65536):
+        """
+        Checks the CRC16 values of every reply in batches, returns the indices of corrupted replies
+        """
+        bad = []
+        for start in range(0, len(self), batch_size):
+            replies = [self[i] for i in range(start, min(start + batch_size, len(self)))]
+            ok = check_reply_batch(replies)
+            bad.extend(int(i) + start for i in np.flatnonzero(~ok))
+        return bad
+
+    def close(self):
+        self.data.release()
+        if(isinstance(self.index, np.memmap)):
+            self.index._mmap.close()
+        self.index = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplaySerial:
+    """
+    Serial port stand-in that answers BX commands with the replies of a recording, so recorded sessions go through the
+    same NDI_Aurora decoding path (bx(), TrackingStream, ...) as live data.
+    speed: None replays as fast as possible, 1.0 in real time, 2.0 twice as fast, ...
+    Other commands are answered with OKAY. Once the recording is exhausted 'finished' is set and reads time out: they
+    wait 'timeout' seconds like pyserial and return nothing, TrackingStream stops at the first one.
+    reply_host_time is the recorded host receive time of the last BX reply, NDI_Aurora stamps replayed frames with it
+    instead of the replay time, so clocks and filters see the original timing.
+    """
+    def __init__(self, recording, speed=None, start=0, stop=None):
+        self.recording = recording if(isinstance(recording, BXRecording)) else BXRecording(recording)
+        self.speed = speed
+        self.position = start
+        self.stop = len(self.recording) if(stop is None) else min(stop, len(self.recording))
+        self.finished = self.position >= self.stop
+        self.reply_host_time = None
+        self.port = self.recording.data_path
+        self.baudrate = 9600
+        self.timeout = None
+        self.is_open = True
+        self._pending = bytearray()
+        self._replay_start = None
+        self._first_time = None
+
+    def write(self, data):
+        for command in bytes(data).split(b'\r')[:-1]:
+            if(command.upper().startswith(b"BX")):
+                self._pending += self._next_reply()
+            else:
+                text = "OKAY"
+                self._pending += f"{text}{crc16_hex(text)}\r".encode()
+        return len(data)
+
+    def _next_reply(self):
+        if(self.position >= self.stop):
+            self.finished = True
+            return b""
+        reply = self.recording[self.position]
+        host_time = float(self.recording.index["host_time"][self.position])
+        self.reply_host_time = host_time
+        if(self.speed is not None):
+            if(self._replay_start is None or host_time != host_time):
+                self._replay_start = time.monotonic()
+                self._first_time = host_time
+            else:
+                delay = (host_time - self._first_time) / self.speed - (time.monotonic() - self._replay_start)
+                if(delay > 0):
+                    time.sleep(delay)
+        self.position += 1
+        return reply
+
+    @property
+    def in_waiting(self):
+        return len(self._pending)
+
+    def read(self, size=1):
+        if(not self._pending and self.timeout):
+            time.sleep(self.timeout)
+        out = bytes(self._pending[:size])
+        del self._pending[:size]
+        return out
+
+    def read_until(self, expected=b'\n', size=None):
+        index = self._pending.find(expected)
+        end = len(self._pending) if(index < 0) else index + len(expected)
+        if(size is not None):
+            end = min(end, size)
+        return self.read(end)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._pending.clear()
+
+    def send_break(self, duration=0.25):
+        pass
+
+    def close(self):
+        self.is_open = False
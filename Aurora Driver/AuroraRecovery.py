@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from AuroraClock import FRAME_NUMBER_STEP, frame_number_of
+from AuroraCRC16 import CRCMismatchError
+from AuroraLogging import get_logger
+
+log = get_logger("recovery")
+
+# One recovery: what triggered it, how the link came back ("reopen": the port was reopened and the system was still
+# tracking, "replay": reopened but the tool configuration and tracking had to be restored, "break": serial break and full
+# replay), the tracking gap it covered and the frames missed in it (estimated from the gap when the frame counter
+# restarted)
+RecoveryReport = namedtuple("RecoveryReport", ["reason", "method", "gap_seconds", "missed_frames", "attempts", "success"])
+
+
+class SessionRecovery:
+    """
+    Detects a dead link while streaming and brings the session back without the application noticing:
+        1. reopen the serial port at the last working baud rate and check the link with ECHO, if the system still tracks
+           streaming simply continues
+        2. otherwise reset it with a serial break, restore the baud rate (COMM), INIT, upload the same tool definitions
+           (PVWR) and enable the same port handles with the same priorities (bring_up_tools), then restart tracking with
+           the same TSTART option
+    The link is considered dead after max_timeouts consecutive timeouts, max_error_replies consecutive ERROR replies to
+    BX/TX (e.g. the system reset itself and left tracking mode), max_crc_errors CRC failures within crc_window seconds, or
+    any other serial port error (cable unplugged). The stream's BX/TX polls wait at most read_timeout seconds for a reply,
+    so detection takes about max_timeouts * read_timeout. Setup commands (INIT, PINIT, TSTART ...) keep the port's own
+    timeout.
+    Usage:
+        recovery = SessionRecovery(ndi_obj, on_recovered=print)
+        ndi_obj.set_recovery(recovery)
+        ndi_obj.start_streaming()
+        ...
+        recovery.reports    # RecoveryReport of every recovery
+    """
+    def __init__(self, ndi_obj, max_timeouts=3, max_error_replies=3, max_crc_errors=5, crc_window=1.0, read_timeout=0.5,
+                 max_attempts=3, retry_delay=0.5, frame_rate=40.0, on_recovered=None):
+        self.ndi_obj = ndi_obj
+        self.max_timeouts = max_timeouts
+        self.max_error_replies = max_error_replies
+        self.max_crc_errors = max_crc_errors
+        self.crc_window = crc_window
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.frame_rate = frame_rate
+        self.on_recovered = on_recovered # optional callable(RecoveryReport)
+        self.reports = []
+        self._lock = threading.Lock()
+        self._timeouts = 0
+        self._error_replies = 0
+        self._crc_times = deque(maxlen=max_crc_errors)
+        self.last_good_time = None
+        self.last_frame_number = None
+        self.read_timeout = read_timeout # read timeout of the stream's polls in seconds, None keeps the port's
+
+    def success(self, frame, timestamp):
+        """
+        Called for every frame received
+        """
+        self._timeouts = 0
+        self._error_replies = 0
+        self.last_good_time = timestamp
+        frame_number = frame_number_of(frame)
+        if(frame_number is not None):
+            self.last_frame_number = frame_number
+
+    def failure(self, error=None):
+        """
+        Called for every failed poll, error is the exception or None for an ERROR reply. Returns True when the link is
+        considered dead.
+        """
+        if(error is None):
+            self._error_replies += 1
+            return self._error_replies >= self.max_error_replies
+        if(isinstance(error, TimeoutError)):
+            self._timeouts += 1
+            return self._timeouts >= self.max_timeouts
+        if(isinstance(error, CRCMismatchError)):
+            now = time.monotonic()
+            self._crc_times.append(now)
+            return len(self._crc_times) >= self.max_crc_errors and now - self._crc_times[0] <= self.crc_window
+        if(isinstance(error, ValueError)):
+            return False
+        return isinstance(error, OSError)
+
+    def recover(self, reason="manual", mode="BX", reply_option="0001"):
+        """
+        Reconnects and resumes tracking, returns a RecoveryReport. Called from the streaming thread, or by hand.
+        """
+        with self._lock:
+            ndi_obj = self.ndi_obj
+            poll = ndi_obj.bx if(mode == "BX") else ndi_obj.tx
+            start = time.monotonic()
+            last_good_time = self.last_good_time if(self.last_good_time is not None) else start
+            log.warning("Link lost (%s), recovering", reason)
+            method = None
+            frame = None
+            attempt = 0
+            while(attempt < self.max_attempts and frame is None):
+                attempt += 1
+                try:
+                    if(self.reopen()):
+                        method = "reopen"
+                        frame = self._poll(poll, reply_option)
+                        if(frame is None and self.replay()):
+                            method = "replay"
+                            frame = self._poll(poll, reply_option)
+                    if(frame is None):
+                        method = "break"
+                        if(self.reset_and_replay()):
+                            frame = self._poll(poll, reply_option)
+                except (OSError, ValueError, AttributeError) as e:
+                    # AttributeError: a port object without some of the pyserial calls
+                    log.warning("Recovery attempt %d failed: %r", attempt, e)
+                if(frame is None):
+                    time.sleep(self.retry_delay)
+            report = self._report(reason, method, frame, last_good_time, attempt)
+            self.reports.append(report)
+            self._timeouts = 0
+            self._error_replies = 0
+            self._crc_times.clear()
+        if(report.success):
+            log.warning("Link recovered by %s after %.3f s, %s frames missed", report.method, report.gap_seconds,
+                        report.missed_frames)
+        else:
+            log.error("Link recovery failed after %d attempts", attempt)
+        metrics = ndi_obj.metrics
+        if(metrics is not None):
+            metrics.count("link_recoveries" if(report.success) else "link_recovery_failures")
+        if(self.on_recovered is not None):
+            self.on_recovered(report)
+        return report
+
+    def _poll(self, poll, reply_option):
+        try:
+            return poll(reply_option, self.read_timeout)
+        except (OSError, ValueError):
+            return None
+
+    def _report(self, reason, method, frame, last_good_time, attempts):
+        if(frame is None):
+            return RecoveryReport(reason, method, None, None, attempts, False)
+        receive_time = self.ndi_obj.last_reply_time or time.monotonic()
+        gap = receive_time - last_good_time
+        frame_number = frame_number_of(frame)
+        if(method == "reopen" and frame_number is not None and self.last_frame_number is not None and
+           frame_number >= self.last_frame_number):
+            missed = max((frame_number - self.last_frame_number) // FRAME_NUMBER_STEP - 1, 0)
+        else:
+            # The frame counter restarted, estimate from the gap
+            missed = max(int(round(gap * self.frame_rate)) - 1, 0)
+        self.success(frame, receive_time)
+        return RecoveryReport(reason, method, gap, missed, attempts, True)
+
+    def reopen(self):
+        """
+        Closes and reopens the serial port at the last working settings, returns True if the system answers ECHO.
+        Port objects without open() are not reopened, only checked.
+        """
+        ndi_obj = self.ndi_obj
+        if(not hasattr(ndi_obj.ser, "open")):
+            # Nothing to reopen (e.g. AuroraRecording.ReplaySerial), only check the link
+            return ndi_obj.echo_check()
+        _, baud_rate, hardware_handshaking = ndi_obj.link_settings
+        def reopen_port(ser):
+            ser.close()
+            ser.open()
+            ser.baudrate = baud_rate
+            ser.rtscts = hardware_handshaking == "1"
+            ser.reset_input_buffer()
+            ndi_obj.reader.reset()
+        ndi_obj.run_io(reopen_port)
+        return ndi_obj.echo_check()
+
+    def replay(self):
+        """
+        Restores the tool configuration and tracking mode on a system that answers at the current baud rate
+        """
+        ndi_obj = self.ndi_obj
+        tracking_option = ndi_obj.tracking_option or "00"
+        if(not ndi_obj.init().startswith("OKAY")):
+            return False
+        # The system may have reset itself without a serial break and lost the uploaded tool definitions
+        ndi_obj._forget_tool_definitions(list(ndi_obj.tool_definitions))
+        if(ndi_obj.tool_config is not None):
+            tool_tracking_priority, priorities, definitions = ndi_obj.tool_config
+            ndi_obj.bring_up_tools(tool_tracking_priority, priorities, definitions=definitions)
+        return ndi_obj.tstart(tracking_option).startswith("OKAY")
+
+    def reset_and_replay(self):
+        """
+        Serial break, then the last working baud rate, INIT, tools and tracking
+        """
+        ndi_obj = self.ndi_obj
+        baud_rate_code, baud_rate, hardware_handshaking = ndi_obj.link_settings
+        tracking_option = ndi_obj.tracking_option or "00"
+        reply = ndi_obj.serial_break()
+        if(not reply.startswith("RESET")):
+            return False
+        if(baud_rate != 9600 and not ndi_obj.change_link_baud_rate(baud_rate_code, baud_rate, hardware_handshaking)):
+            log.warning("Could not restore %d baud, continuing at 9600", baud_rate)
+        ndi_obj.tracking_option = tracking_option
+        return self.replay()
+
+    def get_stats(self):
+        recovered = [report for report in self.reports if(report.success)]
+        return {
+            "recoveries": len(recovered),
+            "failures": len(self.reports) - len(recovered),
+            "total_gap_seconds": sum(report.gap_seconds for report in recovered),
+            "max_gap_seconds": max((report.gap_seconds for report in recovered), default=None)
+        }
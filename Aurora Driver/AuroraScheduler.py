@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from AuroraBX import read_bx_reply
+from AuroraFraming import SerialReader, encode_command
+from AuroraMetrics import record_exchange
+
+# Kinds of work items
+TEXT_REPLY = "text"  # command with a <CR> terminated reply
+BX_REPLY = "bx"      # BX command, binary or text reply
+CALL = "call"        # function(ser), e.g. to change the host baud rate between commands
+
+
+def read_reply(ser, kind=TEXT_REPLY, timeout=None):
+    """
+    Reads one complete reply as bytes, through the framer of an AuroraFraming.SerialReader or directly from a serial port
+    timeout: optional read timeout in seconds for this reply only, used when it is shorter than the port's
+    """
+    if(timeout is not None):
+        port = ser.ser if(isinstance(ser, SerialReader)) else ser
+        previous = port.timeout
+        if(previous is None or timeout < previous):
+            port.timeout = timeout
+            try:
+                return read_reply(ser, kind)
+            finally:
+                port.timeout = previous
+    if(isinstance(ser, SerialReader)):
+        return bytes(ser.read_reply(raise_on_timeout=kind == BX_REPLY))
+    return read_bx_reply(ser) if(kind == BX_REPLY) else ser.read_until(b'\r')
+
+
+def write_and_read(ser, command, kind=TEXT_REPLY, metrics=None, trace=None, timeout=None):
+    """
+    Writes one command (str or bytes) and reads its complete reply
+    ser    : AuroraFraming.SerialReader (buffered) or a serial port
+    metrics: optional AuroraMetrics.Metrics that records the exchange
+    trace  : optional AuroraLogging.WireTrace that records the raw bytes
+    timeout: optional shorter read timeout for this reply, see read_reply
+    """
+    data = command if(isinstance(command, (bytes, bytearray))) else encode_command(command)
+    if(metrics is None and trace is None):
+        ser.write(data)
+        return read_reply(ser, kind, timeout)
+    start = time.perf_counter()
+    ser.write(data)
+    if(trace is not None):
+        trace.record("TX", data)
+    try:
+        reply = read_reply(ser, kind, timeout)
+    except TimeoutError as e:
+        if(metrics is not None):
+            metrics.count("timeouts")
+        if(trace is not None):
+            trace.error(str(e))
+        raise
+    if(metrics is not None):
+        record_exchange(metrics, command, reply, time.perf_counter() - start)
+    if(trace is not None):
+        trace.record("RX", reply)
+        if(kind == TEXT_REPLY and not reply.endswith(b'\r')):
+            trace.error(f"reply to {data[:16]!r} timed out after {len(reply)} bytes")
+    return reply
+
+
+class CommandScheduler:
+    """
+    Owns a serial port on a single I/O thread. Callers submit commands from any thread and get
+    concurrent.futures.Future objects back, replies are matched to commands in submission order.
+    The system must send its complete reply before it accepts the next command, so commands are not overlapped on the
+    wire. Instead the I/O thread writes each queued command as soon as the previous reply is read, without waiting for
+    the caller. A batch (submit_batch) is queued as one unit and runs back to back, commands from other threads cannot
+    interleave with it.
+    Usage:
+        scheduler = CommandScheduler(ser)
+        scheduler.start()
+        futures = scheduler.submit_batch(["PINIT 0A\r", "PENA 0AD\r"])
+        replies = [future.result() for future in futures]
+    """
+    def __init__(self, ser, name="AuroraIO", reader=None):
+        self.ser = ser
+        self.reader = reader if(reader is not None) else SerialReader(ser) # buffered replies, shared with NDI_Aurora
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event() # set by stop(), the stop sentinel is queued
+        self.commands_sent = 0
+        self.batches_run = 0
+        self.metrics = None # optional AuroraMetrics.Metrics
+        self.trace = None   # optional AuroraLogging.WireTrace
+
+    def start(self):
+        if(self.is_running()):
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Finishes the work already queued, then stops the I/O thread. Work submitted afterwards is refused.
+        Returns True once the thread has stopped. If timeout (seconds, None waits for good) expires while an item is
+        still running, e.g. a serial break waiting for its reply, the queued work is cancelled and False is returned:
+        the thread still owns the port, call stop() again before closing it.
+        """
+        if(self._thread is None):
+            return True
+        if(not self._stopping.is_set()):
+            self._stopping.set()
+            self._queue.put(None)
+        self._thread.join(timeout)
+        if(self._thread.is_alive()):
+            self._cancel_pending()
+            return False
+        self._thread = None
+        self._cancel_pending()
+        self._stopping.clear()
+        return True
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def on_io_thread(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, command, kind=TEXT_REPLY, timeout=None):
+        """
+        Queues one command (str or bytes), returns a Future of the raw reply bytes
+        timeout: optional shorter read timeout for its reply, see read_reply
+        """
+        return self.submit_batch([command], kind, timeout)[0]
+
+    def submit_batch(self, commands, kind=TEXT_REPLY, timeout=None):
+        """
+        Queues several commands to run back to back, returns one Future per command
+        """
+        items = [(kind, command, Future(), timeout) for command in commands]
+        self._put(items)
+        return [item[2] for item in items]
+
+    def submit_call(self, function):
+        """
+        Runs function(ser) on the I/O thread between commands, returns a Future of its result
+        """
+        items = [(CALL, function, Future(), None)]
+        self._put(items)
+        return items[0][2]
+
+    def _put(self, items):
+        if(self.on_io_thread()):
+            # Called from a function running on the I/O thread, queueing would deadlock
+            self._execute(items)
+        elif(not self.is_running()):
+            raise RuntimeError("CommandScheduler is not running, call start() first")
+        elif(self._stopping.is_set()):
+            raise RuntimeError("CommandScheduler is stopping")
+        else:
+            self._queue.put(items)
+
+    def _run(self):
+        while(True):
+            items = self._queue.get()
+            if(items is None):
+                break
+            self._execute(items)
+            self.batches_run += 1
+
+    def _execute(self, items):
+        ser = self.ser
+        for kind, payload, future, timeout in items:
+            if(not future.set_running_or_notify_cancel()):
+                continue
+            try:
+                if(kind == CALL):
+                    result = payload(ser)
+                else:
+                    self.commands_sent += 1
+                    result = write_and_read(self.reader, payload, kind, self.metrics, self.trace, timeout)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _cancel_pending(self):
+        # Cancels the queued work, the stop sentinel stays queued for a thread that is still running
+        stop_queued = False
+        while(True):
+            try:
+                items = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if(items is None):
+                stop_queued = True
+            else:
+                for item in items:
+                    item[2].cancel()
+        if(stop_queued and self._thread is not None):
+            self._queue.put(None)
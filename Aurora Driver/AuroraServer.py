@@ -0,0 +1,578 @@
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from AuroraBX import HandleTransform, TrackingFrame, HANDLE_VALID
+from AuroraLogging import get_logger
+
+log = get_logger("server")
+
+# Binary framing, little-endian. One packet carries one or more frames:
+#   packet header : magic "AURP", version, reserved, frame count, payload length in bytes
+#   frame header  : stream sequence number, host receive time (time.monotonic() of the server), system status, handles
+#   handle record : port handle, handle status, port status, frame number, Q0 Qx Qy Qz, Tx Ty Tz, error
+# Missing and disabled handles carry NaN transformations, like AuroraBX.bx_reply_decode.
+PACKET_MAGIC = b"AURP"
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct("<4sBBHI")
+FRAME_HEADER = struct.Struct("<QdHH")
+HANDLE_RECORD = struct.Struct("<2sBxII4f3ff")
+
+# OpenIGTLink version 1 header and QTDATA (quaternion tracking data) elements, big-endian
+IGTL_HEADER = struct.Struct(">H12s20sQQQ")
+IGTL_QTDATA_ELEMENT = struct.Struct(">20sBx3f4f")
+IGTL_TRACKER_6D = 2
+IGTL_PORT = 18944
+
+# Largest UDP payload, batches sent over UDP are capped to fit
+UDP_MAX_PAYLOAD = 65507
+
+
+def _crc64_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 56
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x42F0E1EBA9EA3693) if(crc & (1 << 63)) else (crc << 1)
+            crc &= 0xFFFFFFFFFFFFFFFF
+        table.append(crc)
+    return table
+
+
+CRC64_TABLE = _crc64_table()
+
+
+def crc64(data):
+    """
+    CRC-64/ECMA-182 used by OpenIGTLink message bodies
+    """
+    crc = 0
+    table = CRC64_TABLE
+    for byte in data:
+        crc = table[((crc >> 56) ^ byte) & 0xFF] ^ ((crc << 8) & 0xFFFFFFFFFFFFFFFF)
+    return crc
+
+
+def encode_frame(sequence, host_time, frame):
+    """
+    One frame in the binary framing, without the packet header
+    """
+    parts = [FRAME_HEADER.pack(sequence, host_time, frame.system_status, len(frame.handles))]
+    for handle in frame.handles:
+        parts.append(HANDLE_RECORD.pack(handle.port_handle.encode(), handle.handle_status, handle.port_status,
+                                        handle.frame_number, handle.q0, handle.qx, handle.qy, handle.qz,
+                                        handle.tx, handle.ty, handle.tz, handle.error))
+    return b"".join(parts)
+
+
+def encode_packet(encoded_frames):
+    """
+    Packet of frames already encoded with encode_frame
+    """
+    payload = b"".join(encoded_frames)
+    return PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, 0, len(encoded_frames), len(payload)) + payload
+
+
+def decode_packet(packet):
+    """
+    Decodes one packet, returns a list of (sequence, host_time, TrackingFrame)
+    """
+    view = memoryview(packet)
+    magic, version, _, frame_count, payload_length = PACKET_HEADER.unpack_from(view, 0)
+    if(magic != PACKET_MAGIC or version != PACKET_VERSION):
+        raise ValueError(f"Not an Aurora tracking packet: {bytes(view[:PACKET_HEADER.size])}")
+    if(len(view) != PACKET_HEADER.size + payload_length):
+        raise ValueError(f"Packet length {len(view)} does not match its header ({PACKET_HEADER.size + payload_length})")
+    offset = PACKET_HEADER.size
+    frames = []
+    for _ in range(frame_count):
+        sequence, host_time, system_status, num_handles = FRAME_HEADER.unpack_from(view, offset)
+        offset += FRAME_HEADER.size
+        handles = []
+        for _ in range(num_handles):
+            port_handle, handle_status, port_status, frame_number, *values = HANDLE_RECORD.unpack_from(view, offset)
+            offset += HANDLE_RECORD.size
+            handles.append(HandleTransform(port_handle.decode(), handle_status, *values, port_status, frame_number))
+        frames.append((sequence, host_time, TrackingFrame(handles, system_status)))
+    return frames
+
+
+def igtl_timestamp(wall_time):
+    """
+    OpenIGTLink timestamp: seconds in the upper 32 bits, fraction of a second in the lower 32 bits
+    """
+    seconds = int(wall_time)
+    return (seconds << 32) | int((wall_time - seconds) * 4294967296.0) & 0xFFFFFFFF
+
+
+def encode_igtl_qtdata(wall_time, frame, device_name="Aurora"):
+    """
+    OpenIGTLink QTDATA message with one element per valid handle, named by port handle
+    OpenIGTLink quaternions are ordered (x, y, z, w).
+    """
+    body = b"".join(IGTL_QTDATA_ELEMENT.pack(handle.port_handle.encode(), IGTL_TRACKER_6D, handle.tx, handle.ty,
+                                             handle.tz, handle.qx, handle.qy, handle.qz, handle.q0)
+                    for handle in frame.handles if(handle.handle_status == HANDLE_VALID))
+    header = IGTL_HEADER.pack(1, b"QTDATA", device_name.encode(), igtl_timestamp(wall_time), len(body), crc64(body))
+    return header + body
+
+
+def parse_options(line):
+    """
+    Client options sent as one text line, e.g. "rate=20 batch=4"
+    """
+    options = {}
+    for item in line.split():
+        key, _, value = item.partition("=")
+        if(key == "rate"):
+            options["rate"] = float(value) if(float(value) > 0) else None
+        elif(key == "batch"):
+            options["batch"] = max(1, int(value))
+    return options
+
+
+class StreamClient:
+    """
+    Server side state of one client: rate limit, batching and its unsent output
+    """
+    def __init__(self, kind, address, sock=None, rate=None, batch=1):
+        self.kind = kind        # "tcp", "udp" or "igtl"
+        self.address = address
+        self.sock = sock
+        self.rate = rate        # maximum frames per second, None for every frame
+        self.batch = batch      # frames per packet
+        self.next_due = 0.0
+        self.pending = []
+        self.behind = False     # output backed up, pending holds only the newest frame
+        self.output = bytearray()
+        self.input = bytearray()
+        self.last_seen = time.monotonic()
+        self.frames_sent = 0
+        self.packets_sent = 0
+        self.skipped = 0        # frames left out by the rate limit
+        self.dropped = 0        # frames dropped because the client could not keep up
+
+    def configure(self, **options):
+        """
+        Applies the options of parse_options, options that are not given keep their value
+        """
+        self.rate = options.get("rate", self.rate)
+        self.batch = options.get("batch", self.batch)
+        self.next_due = 0.0
+
+    def offer(self, host_time):
+        """
+        Applies the rate limit, returns True when the frame should be sent to this client
+        """
+        if(self.rate is None):
+            return True
+        if(host_time < self.next_due):
+            self.skipped += 1
+            return False
+        interval = 1.0 / self.rate
+        # Keep the cadence, unless the stream stalled for longer than an interval
+        self.next_due = self.next_due + interval if(host_time < self.next_due + interval) else host_time + interval
+        return True
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "address": self.address,
+            "rate": self.rate,
+            "batch": self.batch,
+            "frames_sent": self.frames_sent,
+            "packets_sent": self.packets_sent,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "backlog_bytes": len(self.output)
+        }
+
+
+class TrackingServer:
+    """
+    Streams the frames of one NDI_Aurora to many network clients from a single I/O thread.
+    Listeners:
+        port       : TCP, binary framing (encode_packet). Clients may send an option line "rate=20 batch=4\\n" at any time.
+        udp_port   : UDP, binary framing. A client registers by sending an option line (an empty one is fine) and must
+                     repeat it within udp_timeout seconds to stay registered.
+        igtl_port  : TCP, OpenIGTLink QTDATA messages for OpenIGTLink clients such as 3D Slicer
+    A client whose socket has more than max_backlog bytes unsent is not queued more data. Its pending frames are reduced to
+    the newest one, which is sent once the socket drains, so a slow consumer always resumes with the latest pose.
+    Usage:
+        server = TrackingServer(ndi_obj, host="0.0.0.0", port=8765, udp_port=8766)
+        server.start()
+    """
+    def __init__(self, ndi_obj, host="127.0.0.1", port=8765, udp_port=None, igtl_port=None, rate=None, batch=1,
+                 max_backlog=65536, udp_timeout=5.0, device_name="Aurora", stream=None):
+        self.ndi_obj = ndi_obj
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.igtl_port = igtl_port
+        self.rate = rate
+        self.batch = batch
+        self.max_backlog = max_backlog
+        self.udp_timeout = udp_timeout
+        self.device_name = device_name
+        self.stream = stream
+        self.clients = []
+        self.frames_streamed = 0
+        self.frames_missed = 0  # frames the server itself missed because the stream buffer wrapped
+        self._owns_stream = False
+        self._selector = None
+        self._listeners = []
+        self._udp_socket = None
+        self._wake_read = None
+        self._wake_write = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._since = 0
+        # host_time is time.monotonic(), OpenIGTLink timestamps are wall clock time
+        self._wall_offset = time.time() - time.monotonic()
+
+    def start(self):
+        """
+        Starts streaming on the NDI_Aurora (unless a running stream was given), opens the listeners and the I/O thread
+        """
+        if(self.is_running()):
+            return
+        if(self.stream is None):
+            self.stream = self.ndi_obj.start_streaming()
+            self._owns_stream = True
+        self._since = self.stream.buffer.get_write_count()
+        self._selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._wake_write.setblocking(False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ, "wake")
+        if(self.port is not None):
+            self.port = self._listen("tcp", self.port)
+        if(self.igtl_port is not None):
+            self.igtl_port = self._listen("igtl", self.igtl_port)
+        if(self.udp_port is not None):
+            self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp_socket.bind((self.host, self.udp_port))
+            self._udp_socket.setblocking(False)
+            self.udp_port = self._udp_socket.getsockname()[1]
+            self._selector.register(self._udp_socket, selectors.EVENT_READ, "udp")
+        self.stream.add_sink(self._wake)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AuroraServer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Disconnects every client, closes the listeners and stops the stream if the server started it
+        """
+        self._stop_event.set()
+        if(self._thread is not None):
+            self._wake(None, None)
+            self._thread.join(timeout)
+            self._thread = None
+        if(self.stream is not None):
+            self.stream.remove_sink(self._wake)
+            if(self._owns_stream):
+                self.ndi_obj.stop_streaming()
+                self.stream = None
+                self._owns_stream = False
+        for client in self.clients:
+            if(client.sock is not None):
+                client.sock.close()
+        self.clients = []
+        for sock in self._listeners + [self._udp_socket, self._wake_read, self._wake_write]:
+            if(sock is not None):
+                sock.close()
+        self._listeners = []
+        self._udp_socket = None
+        self._wake_read = self._wake_write = None
+        if(self._selector is not None):
+            self._selector.close()
+            self._selector = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_stats(self):
+        return {
+            "frames_streamed": self.frames_streamed,
+            "frames_missed": self.frames_missed,
+            "clients": [client.stats() for client in list(self.clients)]
+        }
+
+    def _listen(self, kind, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        sock.listen()
+        sock.setblocking(False)
+        self._listeners.append(sock)
+        self._selector.register(sock, selectors.EVENT_READ, kind)
+        return sock.getsockname()[1]
+
+    def _wake(self, frame, timestamp):
+        """
+        Stream sink, wakes the I/O thread when a frame arrives
+        """
+        try:
+            self._wake_write.send(b"\0")
+        except (BlockingIOError, AttributeError, OSError):
+            pass
+
+    def _run(self):
+        selector = self._selector
+        while(not self._stop_event.is_set()):
+            for key, mask in selector.select(timeout=0.1):
+                data = key.data
+                if(data == "wake"):
+                    try:
+                        self._wake_read.recv(4096)
+                    except BlockingIOError:
+                        pass
+                elif(data == "udp"):
+                    self._receive_udp()
+                elif(data in ("tcp", "igtl")):
+                    self._accept(key.fileobj, data)
+                else:
+                    if(mask & selectors.EVENT_READ):
+                        self._receive(data)
+                    if(mask & selectors.EVENT_WRITE and data in self.clients):
+                        self._flush(data)
+            self._distribute()
+            self._expire_udp_clients()
+
+    def _accept(self, listener, kind):
+        try:
+            sock, address = listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = StreamClient(kind, address, sock, self.rate, self.batch)
+        self.clients.append(client)
+        self._selector.register(sock, selectors.EVENT_READ, client)
+        log.info("%s client connected from %s", kind, address)
+
+    def _receive(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if(not data):
+            self._disconnect(client)
+            return
+        if(client.kind == "igtl"):
+            # OpenIGTLink clients may send their own messages, e.g. GET_ or STT_ requests, they are not answered
+            return
+        client.input += data
+        while(b"\n" in client.input):
+            line, _, rest = bytes(client.input).partition(b"\n")
+            client.input = bytearray(rest)
+            try:
+                client.configure(**parse_options(line.decode(errors="replace")))
+            except ValueError:
+                pass
+
+    def _receive_udp(self):
+        while(True):
+            try:
+                data, address = self._udp_socket.recvfrom(4096)
+            except (BlockingIOError, OSError):
+                return
+            client = next((c for c in self.clients if(c.kind == "udp" and c.address == address)), None)
+            if(client is None):
+                client = StreamClient("udp", address, None, self.rate, self.batch)
+                self.clients.append(client)
+                log.info("udp client registered from %s", address)
+            client.last_seen = time.monotonic()
+            line = data.decode(errors="replace").strip()
+            if(line):
+                try:
+                    client.configure(**parse_options(line))
+                except ValueError:
+                    pass
+
+    def _expire_udp_clients(self):
+        now = time.monotonic()
+        expired = [c for c in self.clients if(c.kind == "udp" and now - c.last_seen > self.udp_timeout)]
+        for client in expired:
+            self.clients.remove(client)
+            log.info("udp client %s expired", client.address)
+
+    def _disconnect(self, client):
+        log.info("%s client %s disconnected", client.kind, client.address)
+        if(client in self.clients):
+            self.clients.remove(client)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _distribute(self):
+        frames, next_seq, dropped = self.stream.read(self._since)
+        self.frames_missed += dropped
+        first = next_seq - len(frames)
+        self._since = next_seq
+        if(not frames or not self.clients):
+            return
+        self.frames_streamed += len(frames)
+        encoded = {}
+        for i, (timestamp, frame) in enumerate(frames):
+            sequence = first + i
+            for client in list(self.clients):
+                if(not client.offer(timestamp)):
+                    continue
+                form = "igtl" if(client.kind == "igtl") else "binary"
+                key = (form, sequence)
+                if(key not in encoded):
+                    if(form == "igtl"):
+                        encoded[key] = encode_igtl_qtdata(timestamp + self._wall_offset, frame, self.device_name)
+                    else:
+                        encoded[key] = encode_frame(sequence, timestamp, frame)
+                client.pending.append(encoded[key])
+                if(len(client.pending) >= client.batch):
+                    self._emit(client)
+
+    def _emit(self, client):
+        """
+        Moves the client's pending frames into its output, or reduces them to the newest frame if it is backed up
+        """
+        if(client.kind == "udp"):
+            self._send_udp(client)
+            return
+        if(len(client.output) > self.max_backlog):
+            client.dropped += len(client.pending) - 1
+            client.pending = client.pending[-1:]
+            client.behind = True
+            return
+        client.behind = False
+        if(client.kind == "igtl"):
+            client.output += b"".join(client.pending)
+        else:
+            client.output += encode_packet(client.pending)
+        client.frames_sent += len(client.pending)
+        client.packets_sent += 1
+        client.pending = []
+        self._flush(client)
+
+    def _send_udp(self, client):
+        frames = client.pending
+        client.pending = []
+        while(frames):
+            # Split batches that do not fit in one datagram
+            count = len(frames)
+            packet = encode_packet(frames)
+            while(len(packet) > UDP_MAX_PAYLOAD and count > 1):
+                count = max(1, count // 2)
+                packet = encode_packet(frames[:count])
+            try:
+                self._udp_socket.sendto(packet, client.address)
+                client.frames_sent += count
+                client.packets_sent += 1
+            except (BlockingIOError, OSError):
+                # UDP has no backlog, a packet that cannot be sent now is dropped
+                client.dropped += count
+            frames = frames[count:]
+
+    def _flush(self, client):
+        if(client.output):
+            try:
+                sent = client.sock.send(client.output)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self._disconnect(client)
+                return
+            del client.output[:sent]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if(client.output) else 0)
+        self._selector.modify(client.sock, events, client)
+        if(not client.output and client.behind):
+            # Drained after a backlog: send the newest frame now instead of waiting for a full batch
+            self._emit(client)
+
+
+class TrackingClient:
+    """
+    Receives frames from a TrackingServer over TCP or UDP in the binary framing
+    Usage:
+        client = TrackingClient("tracker-pc", 8765, rate=20)
+        for sequence, host_time, frame in client.receive():
+            ...
+    """
+    def __init__(self, host, port, udp=False, rate=None, batch=None, timeout=1.0):
+        self.address = (host, port)
+        self.udp = udp
+        self.timeout = timeout
+        self.options = {"rate": rate, "batch": batch}
+        self._buffer = bytearray()
+        self._last_hello = 0.0
+        if(udp):
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.sock = socket.create_connection(self.address, timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.configure(rate, batch)
+
+    def configure(self, rate=None, batch=None):
+        """
+        Sends the client options to the server. Options left None keep the server's value (its --rate and --batch
+        defaults for a new client), rate=0 asks for every frame.
+        """
+        items = []
+        if(rate is not None):
+            self.options["rate"] = rate
+            items.append(f"rate={rate}")
+        if(batch is not None):
+            self.options["batch"] = batch
+            items.append(f"batch={batch}")
+        self._send_line(" ".join(items))
+
+    def _send_line(self, line):
+        line = (line + "\n").encode()
+        if(self.udp):
+            self.sock.sendto(line, self.address)
+        else:
+            self.sock.sendall(line)
+        self._last_hello = time.monotonic()
+
+    def receive(self):
+        """
+        Returns the frames of the next packet as a list of (sequence, host_time, TrackingFrame), empty on timeout
+        """
+        if(self.udp):
+            if(time.monotonic() - self._last_hello > 1.0):
+                # Keep alive, an empty line changes no options
+                self._send_line("")
+            try:
+                packet, _ = self.sock.recvfrom(UDP_MAX_PAYLOAD)
+            except socket.timeout:
+                return []
+            return decode_packet(packet)
+        while(True):
+            if(len(self._buffer) >= PACKET_HEADER.size):
+                length = PACKET_HEADER.size + PACKET_HEADER.unpack_from(self._buffer, 0)[4]
+                if(len(self._buffer) >= length):
+                    packet = bytes(self._buffer[:length])
+                    del self._buffer[:length]
+                    return decode_packet(packet)
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                return []
+            if(not data):
+                raise ConnectionError("Server closed the connection")
+            self._buffer += data
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,282 @@
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from AuroraBX import HandleTransform, TrackingFrame
+
+# Shared memory layout
+#   header : header_dtype (64 bytes)
+#   slots  : capacity x slot_dtype(max_handles), one decoded frame per slot
+# Each slot is guarded by its own sequence number (seqlock). For frame k the writer sets the sequence to 2k+1 (odd,
+# writing), writes the slot, then sets it to 2k+2 (even, complete) and finally publishes write_count = k+1 in the header.
+# A reader copies a slot and accepts it only if the sequence was 2k+2 both before and after the copy.
+SHM_MAGIC = b"AURSHM01"
+SHM_VERSION = 1
+DEFAULT_NAME = "aurora_poses"
+
+header_dtype = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("max_handles", "<u4"),
+    ("slot_size", "<u4"),
+    ("write_count", "<u8"),     # number of frames published, the next sequence number
+    ("publisher_pid", "<u4"),
+    ("reserved", "u1", (28,))
+])
+
+handle_dtype = np.dtype([
+    ("port_handle", "S2"),
+    ("handle_status", "u1"),     # 01 valid, 02 missing, 04 disabled
+    ("reserved", "u1"),
+    ("port_status", "<u4"),
+    ("frame_number", "<u4"),
+    ("quaternion", "<f4", (4,)),  # Q0, Qx, Qy, Qz
+    ("position", "<f4", (3,)),    # Tx, Ty, Tz in mm
+    ("error", "<f4")              # indicator value
+])
+
+
+def slot_dtype(max_handles):
+    """
+    One frame: sequence, host receive time, system status, number of handles and max_handles handle records
+    """
+    return np.dtype([
+        ("sequence", "<u8"),
+        ("host_time", "<f8"),
+        ("system_status", "<u4"),
+        ("num_handles", "<u4"),
+        ("handles", handle_dtype, (max_handles,))
+    ], align=True)
+
+
+def _attach(name):
+    """
+    Attaches to an existing block without registering it with the resource tracker, which would otherwise unlink the
+    publisher's block when a subscriber process exits (Python < 3.13)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((), dtype=header_dtype, buffer=shm.buf)
+        # In the publisher's own process the registration is the publisher's, keep it
+        if(int(header["publisher_pid"]) != os.getpid()):
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except (ImportError, AttributeError, KeyError):
+                pass
+        del header
+        return shm
+
+
+class SharedMemoryPublisher:
+    """
+    Publishes decoded frames into a shared memory ring, so any number of local processes can read the live poses of the
+    one process that owns the serial port.
+    Only one publisher may write to a block. Attach it to a stream with stream.add_sink(publisher.publish), or call
+    publish(frame, host_time) after each bx()/tx().
+    Usage:
+        publisher = SharedMemoryPublisher("aurora_poses")
+        stream = ndi_obj.start_streaming()
+        stream.add_sink(publisher.publish)
+    """
+    def __init__(self, name=DEFAULT_NAME, capacity=256, max_handles=16):
+        self.name = name
+        self.capacity = capacity
+        self.max_handles = max_handles
+        self.dtype = slot_dtype(max_handles)
+        size = header_dtype.itemsize + capacity * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray((), dtype=header_dtype, buffer=self.shm.buf)
+        self.slots = np.ndarray((capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=header_dtype.itemsize)
+        self.slots["sequence"] = 0
+        self.header["magic"] = SHM_MAGIC
+        self.header["version"] = SHM_VERSION
+        self.header["capacity"] = capacity
+        self.header["max_handles"] = max_handles
+        self.header["slot_size"] = self.dtype.itemsize
+        self.header["write_count"] = 0
+        self.header["publisher_pid"] = os.getpid()
+        self._sequence = self.slots["sequence"]
+        self._host_time = self.slots["host_time"]
+        self._system_status = self.slots["system_status"]
+        self._num_handles = self.slots["num_handles"]
+        self._handles = self.slots["handles"]
+        self._write_count = 0
+
+    def publish(self, frame, host_time):
+        """
+        Writes one TrackingFrame into the next slot. Only call from one thread.
+        """
+        handles = frame.handles
+        count = min(len(handles), self.max_handles)
+        records = [(handle.port_handle, handle.handle_status, 0, handle.port_status, handle.frame_number,
+                    (handle.q0, handle.qx, handle.qy, handle.qz), (handle.tx, handle.ty, handle.tz), handle.error)
+                   for handle in handles[:count]]
+        k = self._write_count
+        index = k % self.capacity
+        self._sequence[index] = 2 * k + 1
+        self._host_time[index] = host_time
+        self._system_status[index] = frame.system_status
+        self._num_handles[index] = count
+        self._handles[index, :count] = records
+        self._sequence[index] = 2 * k + 2
+        self._write_count = k + 1
+        self.header["write_count"] = k + 1
+
+    def __call__(self, frame, host_time):
+        self.publish(frame, host_time)
+
+    def close(self, unlink=True):
+        """
+        Releases the block, and removes it from the system unless unlink is False
+        """
+        self.header = None
+        self.slots = None
+        self._sequence = None
+        self._host_time = None
+        self._system_status = None
+        self._num_handles = None
+        self._handles = None
+        self.shm.close()
+        if(unlink):
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SharedMemorySubscriber:
+    """
+    Reads the frames of a SharedMemoryPublisher from another process.
+    Frames are copied slot by slot into arrays the caller can preallocate and reuse (no serialization, no allocation),
+    torn slots that the publisher overwrote during the copy are detected with the slot sequence numbers.
+    view() gives direct zero copy access to the ring, for readers that check the sequence numbers themselves.
+    """
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.shm = _attach(name)
+        self.header = np.ndarray((), dtype=header_dtype, buffer=self.shm.buf)
+        if(bytes(self.header["magic"]) != SHM_MAGIC):
+            self.shm.close()
+            raise ValueError(f"Shared memory block '{name}' is not an Aurora pose ring")
+        if(int(self.header["version"]) != SHM_VERSION):
+            self.shm.close()
+            raise ValueError(f"Unsupported pose ring version {int(self.header['version'])}")
+        self.capacity = int(self.header["capacity"])
+        self.max_handles = int(self.header["max_handles"])
+        self.dtype = slot_dtype(self.max_handles)
+        self.slots = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=header_dtype.itemsize)
+        self._sequence = self.slots["sequence"]
+
+    def get_write_count(self):
+        return int(self.header["write_count"])
+
+    def empty(self, count=1):
+        """
+        Preallocated output records for latest/read
+        """
+        return np.zeros(count, dtype=self.dtype)
+
+    def latest(self, out=None, retries=100):
+        """
+        Copies the newest complete frame into out (a 1 element array from empty()), returns it, or None if nothing was
+        published yet
+        """
+        if(out is None):
+            out = self.empty()
+        for _ in range(retries):
+            count = self.get_write_count()
+            if(count == 0):
+                return None
+            k = count - 1
+            index = k % self.capacity
+            expected = 2 * k + 2
+            if(self._sequence[index] != expected):
+                continue
+            out[0] = self.slots[index]
+            if(self._sequence[index] == expected):
+                return out
+        return None
+
+    def read(self, since=0, max_frames=None, out=None):
+        """
+        Copies the frames published since sequence number 'since' into out, like AuroraStream.FrameRingBuffer.read
+        Returns (records, next_since, dropped): the valid records in order, the sequence number to pass next time and the
+        number of frames that were overwritten before they could be read
+        """
+        count = self.get_write_count()
+        oldest = max(since, count - self.capacity)
+        dropped = oldest - since
+        if(max_frames is not None):
+            count = min(count, oldest + max_frames)
+        n = count - oldest
+        if(n <= 0):
+            return self.slots[:0].copy() if(out is None) else out[:0], max(since, count), dropped
+        if(out is None or len(out) < n):
+            out = self.empty(n)
+        start = oldest % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.slots[start:start + first]
+        out[first:n] = self.slots[:n - first]
+        records = out[:n]
+        # A slot is valid if it still holds the expected frame after the copy, and held it complete during the copy
+        expected = 2 * np.arange(oldest, count, dtype=np.uint64) + 2
+        indices = np.arange(oldest, count) % self.capacity
+        valid = (records["sequence"] == expected) & (self._sequence[indices] == expected)
+        if(not valid.all()):
+            dropped += int(np.count_nonzero(~valid))
+            records = records[valid]
+        return records, count, dropped
+
+    def view(self):
+        """
+        Zero copy view of the whole ring (capacity slots of slot_dtype). Slot contents can change at any time, check that
+        a slot's sequence is the same even number before and after using it.
+        """
+        return self.slots
+
+    def wait_for_frame(self, since, timeout=1.0, interval=0.001):
+        """
+        Polls until a frame newer than 'since' is published, returns the write count or None on timeout
+        """
+        end = time.monotonic() + timeout
+        while(time.monotonic() < end):
+            count = self.get_write_count()
+            if(count > since):
+                return count
+            time.sleep(interval)
+        return None
+
+    def to_frames(self, records):
+        """
+        Converts copied records to a list of (host time, TrackingFrame), like TrackingStream.read
+        """
+        frames = []
+        for record in records:
+            handles = []
+            for h in record["handles"][:record["num_handles"]].tolist():
+                port_handle, handle_status, _, port_status, frame_number, q, t, error = h
+                handles.append(HandleTransform(port_handle.decode(), handle_status, *q.tolist(), *t.tolist(), error, port_status,
+                                               frame_number))
+            frames.append((float(record["host_time"]), TrackingFrame(handles, int(record["system_status"]))))
+        return frames
+
+    def close(self):
+        self.header = None
+        self.slots = None
+        self._sequence = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,686 @@
+import math
+import os
+import random
+import threading
+import time
+
+from AuroraClock import FRAME_NUMBER_STEP
+from AuroraCRC16 import crc16_hex
+from AuroraBX import HandleTransform, bx_reply_encode, HANDLE_VALID, HANDLE_MISSING, HANDLE_DISABLED
+from AuroraTX import tx_reply_encode
+
+# Baud rate parameter of COMM -> bits per second
+comm_baud_rates = {
+    "0": 9600,
+    "1": 14400,
+    "2": 19200,
+    "3": 38400,
+    "4": 57600,
+    "5": 115200,
+    "6": 921600,
+    "A": 230400
+}
+
+# 1 start bit, 8 data bits, 1 stop bit
+BITS_PER_BYTE = 10
+
+# Tool SROM device and virtual tool definition sizes, both are read and written in 64 byte chunks
+SROM_SIZE = 2048
+DEFINITION_SIZE = 1024
+CHUNK_SIZE = 64
+
+
+def static_pose(q=(1.0, 0.0, 0.0, 0.0), t=(0.0, 0.0, -250.0), error=0.02):
+    """
+    Trajectory of a tool that does not move, e.g. a reference tool
+    """
+    pose = tuple(q) + tuple(t) + (error,)
+    return lambda elapsed: pose
+
+
+def circle_trajectory(radius=50.0, period=4.0, center=(0.0, 0.0, -250.0), phase=0.0, error=0.05):
+    """
+    Trajectory of a tool moving on a circle in the XY plane while rotating about Z
+    """
+    def trajectory(elapsed):
+        angle = 2.0 * math.pi * elapsed / period + phase
+        half = angle / 2.0
+        return (math.cos(half), 0.0, 0.0, math.sin(half),
+                center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle), center[2], error)
+    return trajectory
+
+
+class SimulatedTool:
+    """
+    A tool plugged into the virtual system
+    trajectory: function of elapsed seconds returning (q0, qx, qy, qz, tx, ty, tz, error), or None when missing
+    """
+    def __init__(self, port_handle, trajectory=None, serial_number="0B3876530000005B"):
+        self.port_handle = port_handle
+        self.trajectory = trajectory if(trajectory is not None) else static_pose()
+        self.serial_number = serial_number
+        self.assigned = False # a port handle is assigned by PHSR
+        self.initialized = False
+        self.enabled = False
+        self.priority = None
+        # 2 KB write-once SROM device, blank (0xFF) past a short tool description
+        self.srom = bytearray(b"\xff" * SROM_SIZE)
+        self.srom[:64] = bytes.fromhex("010041010000000200000000053CDD3302000000020000000000000000000000"
+                                       "0000000000000000000000000000000008000000780B6D3D9E0F73BE7DE9FFFF")
+        self.srom_selected = False
+        self.definition = None # tool definition uploaded with PVWR, overrides the SROM device until the port handle is freed
+
+    def port_status(self, out_of_volume=False):
+        status = 0x01
+        if(self.initialized):
+            status |= 0x10
+        if(self.enabled):
+            status |= 0x20
+        if(out_of_volume):
+            status |= 0x40
+        return status
+
+
+class VirtualAurora:
+    """
+    Software stand-in for an Aurora System with the pyserial interface NDI_Aurora uses (write, read, read_until,
+    readinto, in_waiting, baudrate, send_break, ...). Pass it as the 'ser' argument of NDI_Aurora.
+
+    Replies to APIREV, BEEP, COMM, ECHO, GET, INIT, PENA, PHF, PHSR, PINIT, PPRD, PPWR, PSEL, PSRCH, PVWR, RESET, SFLIST,
+    TSTART, TSTOP, BX, TX and VER with the system's framing and CRC16 values.
+
+    num_tools      : number of tools plugged in, port handles are assigned from 0A
+    trajectories   : optional list of trajectory functions, one per tool (see circle_trajectory and static_pose)
+    frame_rate     : tracking frame rate in Hz, None gives a new frame on every BX/TX
+    throttle       : deliver bytes no faster than the current baud rate allows
+    error_rate     : probability that a reply is corrupted (bad CRC)
+    drop_rate      : probability that a reply is never sent (host sees a timeout)
+    command_latency: seconds the system takes to process a command before replying
+    timeout        : read timeout in seconds, like pyserial's timeout parameter
+    """
+    def __init__(self, num_tools=1, trajectories=None, baudrate=9600, frame_rate=40.0, throttle=False,
+                 error_rate=0.0, drop_rate=0.0, command_latency=0.0, timeout=1.0, seed=None,
+                 serial_number="P6-00000", api_revision="D.001.006", firmware_revision="009"):
+        self.port = "VirtualAurora"
+        self.timeout = timeout
+        self.write_timeout = None
+        self.is_open = True
+        self.frame_rate = frame_rate
+        self.throttle = throttle
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.command_latency = command_latency
+        self.serial_number = serial_number
+        self.api_revision = api_revision
+        self.firmware_revision = firmware_revision
+        self.random = random.Random(seed)
+
+        self.tools = []
+        for i in range(num_tools):
+            trajectory = trajectories[i] if(trajectories is not None and i < len(trajectories)) else circle_trajectory(phase=i * math.pi / 4)
+            self.tools.append(SimulatedTool(f"{0x0A + i:02X}", trajectory))
+
+        self.user_parameters = {
+            "Info.Timeout.INIT": "3",
+            "Info.Timeout.COMM": "3",
+            "Info.Timeout.VER": "3",
+            "Info.Timeout.PHSR": "3",
+            "Info.Timeout.PINIT": "5",
+            "Info.Timeout.PENA": "3",
+            "Info.Timeout.TSTART": "3",
+            "Info.Timeout.TSTOP": "3",
+            "Info.Timeout.BX": "3",
+            "Info.Timeout.TX": "3",
+            "SCU-0.Features.Firmware.Version": firmware_revision,
+            "SCU-0.Features.Hardware.Model": "Aurora SCU (simulated)",
+            "SCU-0.Features.Hardware.Serial Number": serial_number,
+            "SCU-0.Features.Hardware.Max Ports": "4",
+            "SIU-0.Features.Hardware.Max Tool Ports": "4"
+        }
+
+        # Error injection: command name -> list of error codes returned by the next replies to that command
+        self.forced_errors = {}
+
+        self._host_baudrate = baudrate
+        self._device_baudrate = 9600
+        self._pending_baudrate = None
+        self._lock = threading.Condition()
+        self._input = bytearray()     # bytes written by the host, not yet a complete command
+        self._chunks = []             # replies on the wire: [start time, byte time, data, bytes consumed, baud rate]
+        self._wire_free_at = 0.0
+        self._start_time = time.monotonic()
+        self._frame_counter = 0
+        self._frame_offset = 0
+        self._reset_state()
+
+        # Statistics
+        self.commands_received = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    # pyserial interface
+    @property
+    def baudrate(self):
+        return self._host_baudrate
+
+    @baudrate.setter
+    def baudrate(self, baudrate):
+        self._host_baudrate = baudrate
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            return self._available(time.monotonic())
+
+    def write(self, data):
+        if(not self.is_open):
+            raise IOError("Port is closed")
+        data = bytes(data)
+        now = time.monotonic()
+        with self._lock:
+            self.bytes_written += len(data)
+            if(self._host_baudrate != self._device_baudrate):
+                # The system cannot frame bytes sent at another baud rate
+                return len(data)
+            self._input += data
+            while(b'\r' in self._input):
+                index = self._input.index(b'\r')
+                command = bytes(self._input[:index]).decode('ascii', errors='replace')
+                del self._input[:index + 1]
+                self.commands_received += 1
+                received_at = now + self._wire_time(len(command) + 1)
+                reply = self._execute(command)
+                if(reply is not None):
+                    self._queue_reply(reply, received_at + self.command_latency)
+            self._lock.notify_all()
+        return len(data)
+
+    def read(self, size=1):
+        out = bytearray()
+        deadline = None if(self.timeout is None) else time.monotonic() + self.timeout
+        with self._lock:
+            while(True):
+                out += self._take(size - len(out), time.monotonic())
+                if(len(out) >= size):
+                    break
+                if(not self._wait(deadline)):
+                    break
+        self.bytes_read += len(out)
+        return bytes(out)
+
+    def read_until(self, expected=b'\n', size=None):
+        out = bytearray()
+        deadline = None if(self.timeout is None) else time.monotonic() + self.timeout
+        with self._lock:
+            while(True):
+                now = time.monotonic()
+                available = self._peek(now)
+                index = available.find(expected)
+                if(index >= 0):
+                    count = index + len(expected)
+                    if(size is not None):
+                        count = min(count, size - len(out))
+                    out += self._take(count, now)
+                    break
+                limit = len(available) if(size is None) else min(len(available), size - len(out))
+                out += self._take(limit, now)
+                if(size is not None and len(out) >= size):
+                    break
+                if(not self._wait(deadline)):
+                    break
+        self.bytes_read += len(out)
+        return bytes(out)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._chunks = []
+
+    def reset_output_buffer(self):
+        with self._lock:
+            self._input.clear()
+
+    def flush(self):
+        pass
+
+    def send_break(self, duration=0.25):
+        """
+        A serial break resets the system: 9600 baud, setup mode, a RESET<CRC16><CR> reply
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._device_baudrate = 9600
+            self._pending_baudrate = None
+            self._input.clear()
+            self._chunks = []
+            self._wire_free_at = 0.0
+            self._reset_state()
+            self._queue_reply(self._text_reply("RESET"), now + duration)
+            self._lock.notify_all()
+
+    def close(self):
+        self.is_open = False
+
+    def open(self):
+        self.is_open = True
+
+    # Error injection
+    def inject_error(self, command, error_code="01", count=1):
+        """
+        The next 'count' replies to 'command' (e.g. "PINIT") will be ERROR<error_code>
+        """
+        with self._lock:
+            self.forced_errors.setdefault(command.upper(), []).extend([error_code] * count)
+
+    def unplug_tool(self, index):
+        """
+        Disconnects a tool, it is reported as disabled while tracking and its port handle needs to be freed
+        """
+        with self._lock:
+            tool = self.tools[index]
+            tool.trajectory = None
+
+    # Simulated device
+    def _reset_state(self):
+        self.tracking = False
+        self.initialized = False
+        for tool in self.tools:
+            tool.assigned = False
+            tool.initialized = False
+            tool.enabled = False
+            tool.priority = None
+            tool.srom_selected = False
+            tool.definition = None
+
+    def _wire_time(self, num_bytes):
+        if(not self.throttle):
+            return 0.0
+        return num_bytes * BITS_PER_BYTE / self._device_baudrate
+
+    def _queue_reply(self, reply, ready_at):
+        if(self.drop_rate and self.random.random() < self.drop_rate):
+            self._apply_pending_baudrate()
+            return
+        if(self.error_rate and self.random.random() < self.error_rate):
+            reply = bytearray(reply)
+            # Flip a bit in the middle of the reply, never in the terminating <CR>
+            reply[len(reply) // 2] ^= 0x01
+            reply = bytes(reply)
+        byte_time = BITS_PER_BYTE / self._device_baudrate if(self.throttle) else 0.0
+        start = max(ready_at, self._wire_free_at)
+        self._wire_free_at = start + len(reply) * byte_time
+        self._chunks.append([start, byte_time, reply, 0, self._device_baudrate])
+        self._apply_pending_baudrate()
+
+    def _apply_pending_baudrate(self):
+        if(self._pending_baudrate is not None):
+            # COMM takes effect once its OKAY reply has been sent
+            self._device_baudrate = self._pending_baudrate
+            self._pending_baudrate = None
+
+    def _received(self, data, baudrate):
+        """
+        Bytes as the host port receives them, garbage if it is not at the baud rate they were sent at. This is decided
+        when the bytes are read, the host may switch its baud rate after writing a command (RESET, COMM).
+        """
+        if(self._host_baudrate != baudrate):
+            return bytes(self.random.choice(range(0x80, 0xFF)) for _ in data)
+        return data
+
+    def _available(self, now):
+        available = 0
+        for start, byte_time, data, consumed, baudrate in self._chunks:
+            if(now < start):
+                break
+            ready = len(data) if(byte_time == 0.0) else min(len(data), int((now - start) / byte_time))
+            available += ready - consumed
+            if(ready < len(data)):
+                break
+        return available
+
+    def _peek(self, now):
+        out = bytearray()
+        for start, byte_time, data, consumed, baudrate in self._chunks:
+            if(now < start):
+                break
+            ready = len(data) if(byte_time == 0.0) else min(len(data), int((now - start) / byte_time))
+            out += self._received(data[consumed:ready], baudrate)
+            if(ready < len(data)):
+                break
+        return out
+
+    def _take(self, size, now):
+        out = bytearray()
+        while(self._chunks and len(out) < size):
+            chunk = self._chunks[0]
+            start, byte_time, data, consumed, baudrate = chunk
+            if(now < start):
+                break
+            ready = len(data) if(byte_time == 0.0) else min(len(data), int((now - start) / byte_time))
+            count = min(ready - consumed, size - len(out))
+            out += self._received(data[consumed:consumed + count], baudrate)
+            chunk[3] += count
+            if(chunk[3] == len(data)):
+                self._chunks.pop(0)
+            elif(chunk[3] == ready):
+                break
+        return out
+
+    def _wait(self, deadline):
+        """
+        Waits for more bytes to arrive on the wire, returns False once the read timed out
+        """
+        now = time.monotonic()
+        if(deadline is not None and now >= deadline):
+            return False
+        wake = deadline
+        if(self._chunks):
+            start, byte_time, data, consumed, baudrate = self._chunks[0]
+            next_byte = start + (consumed + 1) * byte_time
+            wake = next_byte if(wake is None) else min(wake, next_byte)
+        self._lock.wait(None if(wake is None) else max(0.0, wake - now))
+        return True
+
+    def _text_reply(self, text):
+        return f"{text}{crc16_hex(text)}\r".encode()
+
+    def _error_reply(self, error_code):
+        return self._text_reply(f"ERROR{error_code}")
+
+    def _elapsed(self):
+        return time.monotonic() - self._start_time
+
+    def _frame_number(self):
+        # Like the system, the frame number is incremented by 8 per frame
+        if(self.frame_rate is None):
+            self._frame_counter += FRAME_NUMBER_STEP
+            return self._frame_counter
+        return FRAME_NUMBER_STEP * (int(self._elapsed() * self.frame_rate) - self._frame_offset)
+
+    def _tool(self, port_handle):
+        for tool in self.tools:
+            if(tool.assigned and tool.port_handle == port_handle):
+                return tool
+        return None
+
+    def _handle_transforms(self):
+        frame_number = self._frame_number()
+        elapsed = self._elapsed()
+        handles = []
+        for tool in self.tools:
+            if(not tool.enabled):
+                continue
+            if(tool.trajectory is None):
+                handles.append(HandleTransform(tool.port_handle, HANDLE_DISABLED, *([math.nan] * 8), 0, 0))
+                continue
+            pose = tool.trajectory(elapsed)
+            if(pose is None):
+                handles.append(HandleTransform(tool.port_handle, HANDLE_MISSING, *([math.nan] * 8), tool.port_status(True), frame_number))
+            else:
+                handles.append(HandleTransform(tool.port_handle, HANDLE_VALID, *pose, tool.port_status(), frame_number))
+        return handles
+
+    def _execute(self, command):
+        """
+        Returns the reply bytes to one command (without its <CR>)
+        """
+        crc_given = None
+        if(":" in command[:8]):
+            # <Command>:<Parameters><CRC16>, the CRC16 covers everything before it
+            crc_given = command[-4:]
+            command = command[:-4]
+            if(crc16_hex(command) != crc_given.upper()):
+                return self._error_reply("04")
+            name, _, params = command.partition(":")
+        else:
+            name, _, params = command.partition(" ")
+        name = name.upper()
+        params = params.strip()
+
+        forced = self.forced_errors.get(name)
+        if(forced):
+            return self._error_reply(forced.pop(0))
+
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if(handler is None):
+            return self._error_reply("01")
+        return handler(params)
+
+    def _cmd_apirev(self, params):
+        return self._text_reply(self.api_revision)
+
+    def _cmd_beep(self, params):
+        if(not params.isdigit() or not 1 <= int(params) <= 9):
+            return self._error_reply("23")
+        return self._text_reply("1")
+
+    def _cmd_comm(self, params):
+        if(len(params) != 5 or not params[0] in comm_baud_rates):
+            return self._error_reply("06")
+        self._pending_baudrate = comm_baud_rates[params[0]]
+        return self._text_reply("OKAY")
+
+    def _cmd_echo(self, params):
+        return self._text_reply(params)
+
+    def _cmd_get(self, params):
+        if(params.endswith("*")):
+            prefix = params[:-1]
+            names = [name for name in self.user_parameters if name.startswith(prefix)]
+        else:
+            names = [params] if(params in self.user_parameters) else []
+        if(not names):
+            return self._error_reply("2B" if(params) else "07")
+        return self._text_reply("\n".join(f"{name}={self.user_parameters[name]}" for name in names))
+
+    def _cmd_init(self, params):
+        self.tracking = False
+        self.initialized = True
+        return self._text_reply("OKAY")
+
+    def _cmd_phsr(self, params):
+        option = params if(params) else "00"
+        if(not self.initialized):
+            return self._error_reply("10")
+        if(self.tracking):
+            return self._error_reply("0C")
+        for tool in self.tools:
+            if(tool.trajectory is not None):
+                tool.assigned = True
+        selection = {
+            "00": lambda tool: True,
+            "01": lambda tool: tool.trajectory is None,
+            "02": lambda tool: tool.trajectory is not None and not tool.initialized and not tool.enabled,
+            "03": lambda tool: tool.trajectory is not None and tool.initialized and not tool.enabled,
+            "04": lambda tool: tool.enabled
+        }
+        if(not option in selection):
+            return self._error_reply("23")
+        tools = [tool for tool in self.tools if tool.assigned and selection[option](tool)]
+        reply = f"{len(tools):02X}" + "".join(f"{tool.port_handle}{tool.port_status() if tool.trajectory is not None else 0:03X}" for tool in tools)
+        return self._text_reply(reply)
+
+    def _cmd_phf(self, params):
+        tool = self._tool(params)
+        if(tool is None):
+            return self._error_reply("08")
+        tool.assigned = False
+        tool.initialized = False
+        tool.enabled = False
+        tool.definition = None
+        return self._text_reply("OKAY")
+
+    def _cmd_psrch(self, params):
+        tool = self._tool(params)
+        if(tool is None):
+            return self._error_reply("1D")
+        return self._text_reply(f"1{tool.serial_number}")
+
+    def _cmd_psel(self, params):
+        tool = self._tool(params[:2])
+        if(tool is None or params[2:].upper() != tool.serial_number):
+            return self._error_reply("20")
+        tool.srom_selected = True
+        return self._text_reply("OKAY")
+
+    def _chunk_address(self, text, size):
+        try:
+            address = int(text, 16)
+        except ValueError:
+            return None
+        return address if(address % CHUNK_SIZE == 0 and address + CHUNK_SIZE <= size) else None
+
+    def _cmd_pprd(self, params):
+        tool = self._tool(params[:2])
+        address = self._chunk_address(params[2:6], SROM_SIZE)
+        if(tool is None or not tool.srom_selected or address is None):
+            return self._error_reply("1E")
+        return self._text_reply(tool.srom[address:address + CHUNK_SIZE].hex().upper())
+
+    def _cmd_ppwr(self, params):
+        tool = self._tool(params[:2])
+        address = self._chunk_address(params[2:6], SROM_SIZE)
+        if(tool is None or not tool.srom_selected or address is None or len(params) != 6 + 2 * CHUNK_SIZE):
+            return self._error_reply("1F")
+        data = bytes.fromhex(params[6:])
+        # Write once: bits can only be cleared
+        if(any(new & ~old & 0xFF for new, old in zip(data, tool.srom[address:address + CHUNK_SIZE]))):
+            return self._error_reply("1F")
+        tool.srom[address:address + CHUNK_SIZE] = data
+        return self._text_reply("OKAY")
+
+    def _cmd_pvwr(self, params):
+        tool = self._tool(params[:2])
+        if(tool is None):
+            return self._error_reply("08")
+        address = self._chunk_address(params[2:6], DEFINITION_SIZE)
+        if(address is None or len(params) != 6 + 2 * CHUNK_SIZE):
+            return self._error_reply("23")
+        if(tool.definition is None):
+            tool.definition = bytearray(DEFINITION_SIZE)
+        tool.definition[address:address + CHUNK_SIZE] = bytes.fromhex(params[6:])
+        return self._text_reply("OKAY")
+
+    def _cmd_pinit(self, params):
+        if(self.tracking):
+            return self._error_reply("0C")
+        tool = self._tool(params)
+        if(tool is None):
+            return self._error_reply("08")
+        if(tool.trajectory is None):
+            return self._error_reply("0D")
+        tool.initialized = True
+        tool.enabled = False
+        return self._text_reply("OKAY")
+
+    def _cmd_pena(self, params):
+        if(self.tracking):
+            return self._error_reply("0C")
+        tool = self._tool(params[:2])
+        if(tool is None):
+            return self._error_reply("08")
+        if(not tool.initialized):
+            return self._error_reply("0E")
+        if(not params[2:] in ["S", "D", "B"]):
+            return self._error_reply("23")
+        tool.enabled = True
+        tool.priority = params[2:]
+        return self._text_reply("OKAY")
+
+    def _cmd_reset(self, params):
+        option = params if(params) else "1"
+        self._reset_state()
+        # The reply is already sent with the default communication settings
+        self._device_baudrate = 9600
+        return self._text_reply("OKAY" if(option == "0") else "RESET")
+
+    def _cmd_tstart(self, params):
+        if(not self.initialized):
+            return self._error_reply("10")
+        if(params and int(params, 16) & 0x80):
+            self._frame_offset = int(self._elapsed() * self.frame_rate) if(self.frame_rate) else 0
+            self._frame_counter = 0
+        self.tracking = True
+        return self._text_reply("OKAY")
+
+    def _cmd_tstop(self, params):
+        self.tracking = False
+        return self._text_reply("OKAY")
+
+    def _cmd_bx(self, params):
+        if(not self.tracking):
+            return self._error_reply("0C")
+        return bx_reply_encode(self._handle_transforms(), 0)
+
+    def _cmd_tx(self, params):
+        if(not self.tracking):
+            return self._error_reply("0C")
+        return tx_reply_encode(self._handle_transforms(), 0)
+
+    def _cmd_sflist(self, params):
+        replies = {
+            # Multiple volumes, magnetic ports, Field Generator
+            "00": "00090004",
+            "03": ("2" "9-025000+025000-025000+025000-055000-005000+000000+000000+000000+00000011\n"
+                   "A+005000+048000+005000+066000+000000+000000+000000+000000+000000+00000011\n"),
+            "10": f"{len(self.tools):02X}"
+        }
+        if(not params in replies):
+            return self._error_reply("23")
+        return self._text_reply(replies[params])
+
+    def _cmd_ver(self, params):
+        option = params if(params) else "0"
+        replies = {
+            "0": f"Aurora SCU (simulated)\n{self.serial_number}\n20231103\nFreeze Tag\n20231103\nCopyright (simulated)\n",
+            "4": f"Aurora SCU (simulated) {self.firmware_revision}.000\n{self.serial_number}\n20231103\nFreeze Tag\n20231103\nCopyright (simulated)\n",
+            "5": self.firmware_revision,
+            "7": "FG-00000\nAurora Planar Field Generator (simulated)\n20231103\n",
+            "8": "SIU-00000\n"
+        }
+        if(not option in replies):
+            return self._error_reply("23")
+        return self._text_reply(replies[option])
+
+    # pty bridge, for clients that open a real serial port path (e.g. AsyncNDI_Aurora.open)
+    def open_pty(self):
+        """
+        Serves this virtual system on a pseudo terminal and returns the path to open, POSIX only
+        """
+        import pty
+        import tty
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        self._pty_master = master
+        self._pty_slave = slave
+        self.timeout = 0.05
+        threading.Thread(target=self._pty_writer, daemon=True, name="VirtualAuroraPtyWriter").start()
+        threading.Thread(target=self._pty_reader, daemon=True, name="VirtualAuroraPtyReader").start()
+        return os.ttyname(slave)
+
+    def _pty_reader(self):
+        while(self.is_open):
+            try:
+                data = os.read(self._pty_master, 4096)
+            except OSError:
+                return
+            if(not data):
+                return
+            self.write(data)
+
+    def _pty_writer(self):
+        while(self.is_open):
+            with self._lock:
+                data = self._take(4096, time.monotonic())
+                if(not data):
+                    self._wait(time.monotonic() + self.timeout)
+                    continue
+            if(data):
+                try:
+                    os.write(self._pty_master, data)
+                except OSError:
+                    return
@@ -0,0 +1,231 @@
+import threading
+import time
+
+from AuroraClock import FRAME_NUMBER_STEP
+from AuroraLogging import get_logger
+
+log = get_logger("stream")
+
+# Consecutive poll timeouts before the reader thread backs off, and the longest wait between polls after that
+TIMEOUT_BACKOFF_AFTER = 3
+TIMEOUT_BACKOFF_MAX = 0.1
+
+
+class FrameRingBuffer:
+    """
+    Fixed-capacity ring buffer of tracking frames and their host receive times.
+    Slots are allocated once. A single writer (the reader thread) never waits on consumers, when consumers fall behind
+    the oldest frames are overwritten and reported as dropped to the consumer that missed them.
+    """
+    def __init__(self, capacity=1024):
+        if(capacity < 1):
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._frames = [None] * capacity
+        self._timestamps = [0.0] * capacity
+        self._write_count = 0 # total number of frames ever written, the next sequence number
+
+    def append(self, frame, timestamp):
+        """
+        Stores a frame, overwriting the oldest one when full. Only call from one thread.
+        """
+        index = self._write_count % self.capacity
+        self._frames[index] = frame
+        self._timestamps[index] = timestamp
+        # Publish after the slot is filled, readers never see a half written slot
+        self._write_count += 1
+
+    def get_write_count(self):
+        return self._write_count
+
+    def __len__(self):
+        return min(self._write_count, self.capacity)
+
+    def latest(self):
+        """
+        Returns (timestamp, frame) of the newest frame, or None if nothing was written yet
+        """
+        count = self._write_count
+        if(count == 0):
+            return None
+        index = (count - 1) % self.capacity
+        return self._timestamps[index], self._frames[index]
+
+    def read(self, since=0, max_frames=None):
+        """
+        Returns the frames written at or after sequence number 'since' without blocking the writer
+        Returns:
+            frames   : list of (timestamp, frame), oldest first
+            next_seq : pass as 'since' on the next call
+            dropped  : number of frames that were overwritten before they could be read
+        """
+        count = self._write_count
+        oldest = max(since, count - self.capacity)
+        if(max_frames is not None):
+            count = min(count, oldest + max_frames)
+        frames = []
+        for seq in range(oldest, count):
+            index = seq % self.capacity
+            frames.append((self._timestamps[index], self._frames[index]))
+        # Slots the writer lapped while they were being copied are no longer the frames that were asked for
+        overwritten = min(self._write_count - self.capacity - oldest, count - oldest)
+        if(overwritten > 0):
+            frames = frames[overwritten:]
+            oldest += overwritten
+        dropped = oldest - since if(oldest > since) else 0
+        return frames, count, dropped
+
+
+class TrackingStream:
+    """
+    Continuous tracking: starts tracking mode, then a dedicated reader thread polls BX (or TX) back to back and stores every
+    decoded frame in a FrameRingBuffer. Consumers read the buffer from their own threads and never block the serial I/O.
+    The Aurora API has no unsolicited streaming command, so back to back polling is the fastest available mode.
+    """
+    def __init__(self, ndi_obj, capacity=1024, mode="BX", reply_option="0001", tstart_option="00", skip_duplicates=True,
+                 frame_filter=None, sinks=None):
+        modes = {
+            "BX": ndi_obj.bx,
+            "TX": ndi_obj.tx
+        }
+        if(not mode in modes):
+            raise ValueError(f"Invalid mode ({mode}). Select one from {list(modes.keys())}.")
+        self.ndi_obj = ndi_obj
+        self.mode = mode
+        self.poll = modes[mode]
+        self.reply_option = reply_option
+        self.tstart_option = tstart_option
+        self.skip_duplicates = skip_duplicates # the system produces a new frame every 25 ms, polling faster repeats it
+        self.frame_filter = frame_filter # optional AuroraFilters.PoseFilter applied to each frame before it is stored
+        self.sinks = list(sinks) if(sinks) else [] # callables sink(frame, timestamp), e.g. SharedMemoryPublisher.publish
+        self.buffer = FrameRingBuffer(capacity)
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self.finished = False # set when the source has no more replies, e.g. an exhausted AuroraRecording.ReplaySerial
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, send_tstart=True):
+        """
+        Starts tracking mode and the reader thread
+        """
+        if(self.is_running()):
+            return
+        if(send_tstart):
+            self.ndi_obj.tstart(self.tstart_option)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"Aurora{self.mode}Stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, send_tstop=True, timeout=2.0):
+        """
+        Stops the reader thread, then tracking mode. Returns True once the thread has stopped. If it is still inside a
+        poll or a recovery after timeout seconds (None waits for good), the thread is kept, tracking mode is left on and
+        False is returned, call stop() again.
+        """
+        self._stop_event.set()
+        if(self._thread is not None):
+            self._thread.join(timeout)
+            if(self._thread.is_alive()):
+                return False
+            self._thread = None
+        if(send_tstop):
+            self.ndi_obj.tstop()
+        return True
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_sink(self, sink):
+        """
+        Calls sink(frame, timestamp) on the reader thread for every stored frame, keep it short
+        """
+        self.sinks = self.sinks + [sink]
+
+    def remove_sink(self, sink):
+        self.sinks = [s for s in self.sinks if s is not sink]
+
+    def latest(self):
+        return self.buffer.latest()
+
+    def read(self, since=0, max_frames=None):
+        frames, next_seq, dropped = self.buffer.read(since, max_frames)
+        metrics = self.ndi_obj.metrics
+        if(dropped and metrics is not None):
+            metrics.count("dropped_frames", dropped)
+        return frames, next_seq, dropped
+
+    def _run(self):
+        poll = self.poll
+        reply_option = self.reply_option
+        append = self.buffer.append
+        frame_filter = self.frame_filter
+        clock = time.monotonic
+        last_frame_numbers = None
+        last_frame_number = 0
+        timeouts = 0
+        while(not self._stop_event.is_set()):
+            recovery = self.ndi_obj.recovery
+            try:
+                # With a SessionRecovery the polls time out sooner so a dead link is detected quickly
+                frame = poll(reply_option, recovery.read_timeout if(recovery is not None) else None)
+            except (TimeoutError, ValueError, OSError) as e:
+                # Timeouts and CRC errors: keep polling, the next reply starts a fresh frame
+                self.errors += 1
+                self.last_error = e
+                log.debug("%s poll failed: %s", self.mode, e)
+                if(isinstance(e, TimeoutError)):
+                    if(getattr(self.ndi_obj.ser, "finished", False)):
+                        log.info("%s stream source finished", self.mode)
+                        self.finished = True
+                        break
+                    timeouts += 1
+                    if(timeouts >= TIMEOUT_BACKOFF_AFTER):
+                        # A silent port that returns at once (no read timeout) would otherwise spin a core
+                        self._stop_event.wait(min(0.001 * 2 ** (timeouts - TIMEOUT_BACKOFF_AFTER), TIMEOUT_BACKOFF_MAX))
+                if(recovery is not None):
+                    if(recovery.failure(e)):
+                        recovery.recover(repr(e), self.mode, reply_option)
+                elif(not isinstance(e, (TimeoutError, ValueError))):
+                    # The serial port failed (e.g. unplugged), nothing to poll without a SessionRecovery
+                    log.error("%s stream stopped: %r", self.mode, e)
+                    raise
+                continue
+            timeouts = 0
+            # Receive time of the reply, taken before decoding
+            timestamp = self.ndi_obj.last_reply_time or clock()
+            self.polls += 1
+            if(frame is None):
+                self.errors += 1
+                if(recovery is not None and recovery.failure(None)):
+                    recovery.recover("ERROR replies", self.mode, reply_option)
+                continue
+            if(recovery is not None):
+                recovery.success(frame, timestamp)
+            metrics = self.ndi_obj.metrics
+            if(self.skip_duplicates):
+                frame_numbers = [handle.frame_number for handle in frame.handles]
+                if(frame_numbers == last_frame_numbers):
+                    if(metrics is not None):
+                        metrics.count("duplicate_frames")
+                    continue
+                last_frame_numbers = frame_numbers
+            if(metrics is not None):
+                frame_number = max((handle.frame_number for handle in frame.handles), default=0)
+                # Frame numbers advance by FRAME_NUMBER_STEP per frame
+                missed = (frame_number - last_frame_number) // FRAME_NUMBER_STEP - 1
+                if(last_frame_number and missed > 0):
+                    metrics.count("missed_frames", missed)
+                last_frame_number = frame_number or last_frame_number
+                metrics.frame(timestamp)
+            if(frame_filter is not None):
+                frame = frame_filter.filter_frame(frame, timestamp)
+            append(frame, timestamp)
+            for sink in self.sinks:
+                try:
+                    sink(frame, timestamp)
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = e
+                    log.warning("Stream sink %r failed: %s", sink, e)
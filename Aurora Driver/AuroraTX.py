@@ -0,0 +1,256 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from AuroraBX import HandleTransform, TrackingFrame, HANDLE_VALID, HANDLE_MISSING, HANDLE_DISABLED, NAN
+from AuroraCRC16 import crc16_hex, check_reply, check_reply_batch, CRCMismatchError
+
+# Text (TX) reply layout
+# <Number of Handles>
+# <Handle 1><Reply Option 0001 Data><LF>
+# ...
+# <Handle n><Reply Option 0001 Data><LF>
+# <System Status><CRC16><CR>
+# Every handle line has a fixed width, so its kind is known from its length:
+#   valid    : <Handle><Q0><Qx><Qy><Qz><Tx><Ty><Tz><Indicator Value><Port Status><Frame Number>  2+4*6+3*7+6+8+8 = 69
+#   missing  : <Handle>MISSING<Port Status><Frame Number>                                       2+7+8+8 = 25
+#   disabled : <Handle>DISABLED                                                                 2+8 = 10
+TX_VALID_LENGTH = 69
+TX_MISSING_LENGTH = 25
+TX_DISABLED_LENGTH = 10
+
+# Fixed-width fields of a valid handle line including its <LF>, viewed directly on the reply bytes
+tx_line_dtype = None if(np is None) else np.dtype([
+    ("port_handle", "S2"),
+    ("quaternion", "S6", (4,)),  # sign + 5 digits, x10000
+    ("position", "S7", (3,)),    # sign + 6 digits, mm x100
+    ("error", "S6"),             # sign + 5 digits, x10000
+    ("port_status", "S8"),       # hex
+    ("frame_number", "S8"),      # hex
+    ("line_feed", "S1")
+])
+# <Handle>MISSING<Port Status><Frame Number><LF>
+tx_missing_dtype = None if(np is None) else np.dtype([
+    ("port_handle", "S2"),
+    ("missing", "S7"),
+    ("port_status", "S8"),
+    ("frame_number", "S8"),
+    ("line_feed", "S1")
+])
+
+tx_reply_options = {
+    "0001": "Transformation data (default)",
+    "0800": "Out-of-volume transformations, must be OR'd with 0001",
+    "0801": "Transformation data including out-of-volume transformations"
+}
+
+# One row per handle line of a batch of TX replies, see tx_reply_decode_batch
+tx_dtype = None if(np is None) else np.dtype([
+    ("reply_index", "u4"),       # index of the reply in the batch
+    ("port_handle", "U2"),
+    ("handle_status", "u1"),     # 01 valid, 02 missing, 04 disabled
+    ("port_status", "u4"),
+    ("frame_number", "u4"),
+    ("quaternion", "f4", (4,)),  # Q0, Qx, Qy, Qz
+    ("position", "f4", (3,)),    # Tx, Ty, Tz in mm
+    ("error", "f4")              # indicator value
+])
+
+
+def _hex_table():
+    table = np.full(256, -1, dtype=np.int64)
+    table[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+    table[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+    table[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+    return table
+
+_hex_values = None if(np is None) else _hex_table()
+_hex_weights = None if(np is None) else 16 ** np.arange(7, -1, -1, dtype=np.int64)
+
+
+def _hex_fields(lines, name):
+    """
+    Values of an 8 character hex field of an array of line records, with one table lookup
+    """
+    offset = lines.dtype.fields[name][1]
+    chars = lines.view(np.uint8).reshape(len(lines), lines.dtype.itemsize)[:, offset:offset + 8]
+    digits = _hex_values[chars]
+    if((digits < 0).any()):
+        raise ValueError("Malformed TX reply, invalid hex character")
+    return digits @ _hex_weights
+
+
+def _hex_columns(chars):
+    """
+    Values of rows of hex characters, (n, width) uint8 -> (n,) int64
+    """
+    digits = _hex_values[chars]
+    if((digits < 0).any()):
+        raise ValueError("Malformed TX reply, invalid hex character")
+    return digits @ (16 ** np.arange(chars.shape[1] - 1, -1, -1, dtype=np.int64))
+
+
+def _decode_valid_lines(lines):
+    """
+    Decodes a tx_line_dtype array, returns quaternions (n, 4), positions (n, 3), errors, port status and frame numbers.
+    The signed decimal fields are parsed by NumPy's string to integer conversion, which rejects malformed digits.
+    """
+    try:
+        quaternion = lines["quaternion"].astype(np.int64) * 1e-4
+        position = lines["position"].astype(np.int64) * 1e-2
+        error = lines["error"].astype(np.int64) * 1e-4
+    except ValueError:
+        raise ValueError("Malformed TX reply, invalid decimal field")
+    return quaternion, position, error, _hex_fields(lines, "port_status"), _hex_fields(lines, "frame_number")
+
+
+def tx_reply_decode_batch(replies, check_crc=True):
+    """
+    Decodes many complete TX replies at once, e.g. from a log, with NumPy fixed-width field extraction.
+    All replies are joined into one buffer, handle lines are found from the <LF> positions and classified by their
+    length, and each field is decoded for all lines of a kind with one array operation.
+    replies: list of bytes (or str), each <Number of Handles>...<System Status><CRC16>[<CR>]
+    Returns (rows, system_status): a tx_dtype array with one row per handle line in reply order, and a uint16 array with
+    the system status of every reply.
+    Raises ValueError on a CRC16 mismatch or malformed reply.
+    """
+    if(np is None):
+        raise ImportError("The TX parser requires numpy")
+    replies = [reply.encode() if(isinstance(reply, str)) else bytes(reply) for reply in replies]
+    if(check_crc and len(replies) > 0):
+        ok = check_reply_batch(replies)
+        if(not ok.all()):
+            raise CRCMismatchError(f"TX reply CRC16 mismatch (reply {int(np.flatnonzero(~ok)[0])})")
+    buffer = np.frombuffer(b"".join(replies), dtype=np.uint8)
+    lengths = np.array([len(reply) for reply in replies], dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    if((lengths == 0).any()):
+        raise ValueError("Malformed TX reply, empty reply")
+    # Position right after <System Status><CRC16>, without the <CR>
+    ends = starts + lengths - (buffer[starts + lengths - 1] == ord('\r'))
+    if((ends - starts < 10).any()):
+        raise ValueError("Malformed TX reply, too short")
+
+    num_handles = _hex_columns(buffer[starts[:, None] + np.arange(2)])
+    system_status = _hex_columns(buffer[(ends - 8)[:, None] + np.arange(4)]).astype(np.uint16)
+
+    # Every handle line ends with <LF>, a line starts after the previous <LF> or after <Number of Handles>
+    line_ends = np.flatnonzero(buffer == ord('\n'))
+    line_replies = np.searchsorted(starts, line_ends, side="right") - 1
+    line_starts = np.empty_like(line_ends)
+    if(len(line_ends) > 0):
+        line_starts[0] = starts[line_replies[0]] + 2
+        first_in_reply = line_replies[1:] != line_replies[:-1]
+        line_starts[1:] = np.where(first_in_reply, starts[line_replies[1:]] + 2, line_ends[:-1] + 1)
+    if(not np.array_equal(np.bincount(line_replies, minlength=len(replies)), num_handles)):
+        raise ValueError("Malformed TX reply, number of handle lines does not match <Number of Handles>")
+    line_lengths = line_ends - line_starts
+
+    rows = np.zeros(len(line_ends), dtype=tx_dtype)
+    rows["reply_index"] = line_replies
+    handles = buffer[line_starts[:, None] + np.arange(2)]
+    rows["port_handle"] = handles.view("S2").ravel().astype("U2")
+    rows["quaternion"] = NAN
+    rows["position"] = NAN
+    rows["error"] = NAN
+
+    # Handle lines are classified by their length, then gathered with their <LF> into contiguous records
+    valid = np.flatnonzero(line_lengths == TX_VALID_LENGTH)
+    missing = np.flatnonzero(line_lengths == TX_MISSING_LENGTH)
+    disabled = np.flatnonzero(line_lengths == TX_DISABLED_LENGTH)
+    if(len(valid) + len(missing) + len(disabled) != len(line_ends)):
+        raise ValueError("Malformed TX reply, unexpected handle line length")
+
+    if(len(valid) > 0):
+        lines = buffer[line_starts[valid][:, None] + np.arange(TX_VALID_LENGTH + 1)].view(tx_line_dtype).ravel()
+        quaternion, position, error, port_status, frame_number = _decode_valid_lines(lines)
+        rows["handle_status"][valid] = HANDLE_VALID
+        rows["quaternion"][valid] = quaternion
+        rows["position"][valid] = position
+        rows["error"][valid] = error
+        rows["port_status"][valid] = port_status
+        rows["frame_number"][valid] = frame_number
+    if(len(missing) > 0):
+        lines = buffer[line_starts[missing][:, None] + np.arange(TX_MISSING_LENGTH + 1)].view(tx_missing_dtype).ravel()
+        rows["handle_status"][missing] = HANDLE_MISSING
+        rows["port_status"][missing] = _hex_fields(lines, "port_status")
+        rows["frame_number"][missing] = _hex_fields(lines, "frame_number")
+    rows["handle_status"][disabled] = HANDLE_DISABLED
+    return rows, system_status
+
+
+def tx_reply_decode(reply, check_crc=True):
+    """
+    Decodes a complete TX reply (reply option 0001, optionally OR'd with 0800)
+    Reply structure:
+        <Number of Handles> - 2 hex characters
+        <Handle n> - 2 hex characters, followed by one of
+            <Q0><Qx><Qy><Qz> (sign + 5 digits, x10000) <Tx><Ty><Tz> (sign + 6 digits, mm x100)
+            <Indicator Value> (sign + 5 digits, x10000) <Port Status><Frame Number> (8 hex characters each) <LF>
+            MISSING<Port Status><Frame Number><LF>
+            DISABLED<LF>
+        <System Status> - 4 hex characters
+        <CRC16><CR> - 4 hex characters
+    Example reply:
+        010A+03298+00786-08402+04231-001603+005330-179831+0205600000031000000E9<LF>0000BC7B
+    Returns a TrackingFrame of HandleTransform tuples, like AuroraBX.bx_reply_decode
+    """
+    if(np is None):
+        raise ImportError("The TX parser requires numpy")
+    if(isinstance(reply, str)):
+        reply = reply.encode()
+    # The table driven CRC16 is faster than the column wise batch check for a single reply
+    if(check_crc and not check_reply(reply)):
+        raise CRCMismatchError("TX reply CRC16 mismatch")
+    # Common case, every handle valid: the handle lines are contiguous and viewed in place
+    end = len(reply) - 1 if(reply[-1:] == b'\r') else len(reply)
+    try:
+        num_handles = int(reply[:2], 16)
+        system_status = int(reply[end - 8:end - 4], 16)
+    except ValueError:
+        raise ValueError("Malformed TX reply")
+    if(end - 10 == num_handles * tx_line_dtype.itemsize):
+        lines = np.frombuffer(reply, dtype=tx_line_dtype, count=num_handles, offset=2)
+        if(num_handles == 0 or (lines["line_feed"] == b'\n').all()):
+            quaternion, position, error, port_status, frame_number = _decode_valid_lines(lines)
+            handles = [HandleTransform(port_handle.decode(), HANDLE_VALID, *q, *t, e, status, frame)
+                       for port_handle, q, t, e, status, frame in zip(lines["port_handle"].tolist(), quaternion.tolist(),
+                                                                     position.tolist(), error.tolist(),
+                                                                     port_status.tolist(), frame_number.tolist())]
+            return TrackingFrame(handles, system_status)
+    rows, system_status = tx_reply_decode_batch([reply], check_crc=False)
+    return tx_rows_to_frames(rows, system_status)[0]
+
+
+def tx_rows_to_frames(rows, system_status):
+    """
+    Converts the output of tx_reply_decode_batch to a list of TrackingFrame, one per reply
+    """
+    frames = [TrackingFrame([], int(status)) for status in system_status]
+    values = zip(rows["reply_index"].tolist(), rows["port_handle"].tolist(), rows["handle_status"].tolist(),
+                 rows["quaternion"].tolist(), rows["position"].tolist(), rows["error"].tolist(),
+                 rows["port_status"].tolist(), rows["frame_number"].tolist())
+    for reply_index, port_handle, handle_status, quaternion, position, error, port_status, frame_number in values:
+        frames[reply_index].handles.append(HandleTransform(port_handle, handle_status, *quaternion, *position, error,
+                                                           port_status, frame_number))
+    return frames
+
+
+def tx_reply_encode(handles, system_status=0):
+    """
+    Builds a TX reply from HandleTransform tuples, the inverse of tx_reply_decode
+    """
+    lines = [f"{len(handles):02X}"]
+    for handle in handles:
+        prefix = handle.port_handle
+        if(handle.handle_status == HANDLE_DISABLED):
+            lines.append(f"{prefix}DISABLED\n")
+        elif(handle.handle_status == HANDLE_MISSING):
+            lines.append(f"{prefix}MISSING{handle.port_status:08X}{handle.frame_number:08X}\n")
+        else:
+            q = "".join(f"{round(v * 10000):+06d}" for v in handle[2:6])
+            t = "".join(f"{round(v * 100):+07d}" for v in handle[6:9])
+            lines.append(f"{prefix}{q}{t}{round(handle.error * 10000):+06d}{handle.port_status:08X}{handle.frame_number:08X}\n")
+    text = "".join(lines) + f"{system_status:04X}"
+    return f"{text}{crc16_hex(text)}\r".encode()
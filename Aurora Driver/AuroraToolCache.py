@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+
+# Tool SROM devices are 2 KB, tool definitions uploaded with PVWR up to 1 KB, both move in 64 byte chunks
+SROM_SIZE = 2048
+DEFINITION_SIZE = 1024
+CHUNK_SIZE = 64
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "aurora_driver")
+
+
+def definition_digest(data):
+    """
+    Content address of a tool definition, SHA-256 as 64 hexadecimal characters
+    """
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+
+def chunks(data, size=CHUNK_SIZE, fill=b"\x00"):
+    """
+    Splits data into (address, chunk) with every chunk padded to size with fill
+    """
+    data = bytes(data)
+    return [(address, data[address:address + size].ljust(size, fill)) for address in range(0, len(data), size)]
+
+
+def _is_digest(text):
+    return isinstance(text, str) and len(text) == 64 and all(c in "0123456789abcdef" for c in text)
+
+
+class ToolDefinitionCache:
+    """
+    On-disk cache of tool definition files (.rom) and tool SROM device images:
+        <directory>/definitions/<sha256>.rom   tool definitions, addressed by their content
+        <directory>/srom/<SROM device ID>.bin  SROM images read with PPRD, keyed by the 16 character device ID
+    SROM devices are write-once, so an image read once stays valid, PPWR writes update it. Files are written to a
+    temporary name and renamed, several processes can share a directory.
+    Usage:
+        cache = ToolDefinitionCache()
+        ndi_obj.set_tool_cache(cache)
+        ndi_obj.load_tool_definition("0A", "Sensor_SROM/DDRO-080-061-01_GENERIC.rom")
+    """
+    def __init__(self, directory=None):
+        self.directory = directory if(directory is not None) else DEFAULT_CACHE_DIRECTORY
+        self.definitions_directory = os.path.join(self.directory, "definitions")
+        self.srom_directory = os.path.join(self.directory, "srom")
+        os.makedirs(self.definitions_directory, exist_ok=True)
+        os.makedirs(self.srom_directory, exist_ok=True)
+        self._definitions = {} # digest -> bytes, loaded this session
+        self._srom = {}        # SROM device ID -> bytes
+        self._lock = threading.Lock()
+
+    def _write(self, path, data):
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def add(self, data):
+        """
+        Stores a tool definition, returns its digest
+        """
+        data = bytes(data)
+        if(len(data) > DEFINITION_SIZE):
+            raise ValueError(f"Tool definition of {len(data)} bytes, at most {DEFINITION_SIZE} fit")
+        digest = definition_digest(data)
+        with self._lock:
+            if(digest not in self._definitions):
+                path = os.path.join(self.definitions_directory, f"{digest}.rom")
+                if(not os.path.exists(path)):
+                    self._write(path, data)
+                self._definitions[digest] = data
+        return digest
+
+    def add_file(self, path):
+        """
+        Stores a tool definition file, returns its digest
+        """
+        with open(path, "rb") as f:
+            return self.add(f.read())
+
+    def get(self, digest):
+        """
+        Tool definition bytes of a digest, None if it is not cached
+        """
+        if(not _is_digest(digest)):
+            return None
+        with self._lock:
+            data = self._definitions.get(digest)
+            if(data is None):
+                path = os.path.join(self.definitions_directory, f"{digest}.rom")
+                if(not os.path.exists(path)):
+                    return None
+                with open(path, "rb") as f:
+                    data = f.read()
+                if(definition_digest(data) != digest):
+                    # Damaged file, it is written again by the next add
+                    os.remove(path)
+                    return None
+                self._definitions[digest] = data
+            return data
+
+    def __contains__(self, digest):
+        return self.get(digest) is not None
+
+    def get_srom(self, device_id):
+        """
+        Cached SROM image of a device ID, None if it was never read
+        """
+        device_id = device_id.upper()
+        with self._lock:
+            data = self._srom.get(device_id)
+            if(data is None):
+                path = os.path.join(self.srom_directory, f"{device_id}.bin")
+                if(not os.path.exists(path)):
+                    return None
+                with open(path, "rb") as f:
+                    data = f.read()
+                self._srom[device_id] = data
+            return data
+
+    def put_srom(self, device_id, data):
+        device_id = device_id.upper()
+        data = bytes(data)
+        with self._lock:
+            self._write(os.path.join(self.srom_directory, f"{device_id}.bin"), data)
+            self._srom[device_id] = data
@@ -0,0 +1,181 @@
+import numpy as np
+
+from AuroraBX import HANDLE_VALID
+from AuroraPortStatus import port_status_array, PORT_FAULT_MASK
+
+# One row per frame and port handle
+frame_dtype = np.dtype([
+    ("host_time", "f8"),         # host receive time, seconds (time.monotonic)
+    ("frame_number", "u4"),
+    ("handle_status", "u1"),     # 01 valid, 02 missing, 04 disabled
+    ("port_status", "u4"),
+    ("quaternion", "f4", (4,)),  # Q0, Qx, Qy, Qz
+    ("position", "f4", (3,)),    # Tx, Ty, Tz in mm
+    ("error", "f4")              # indicator value
+])
+
+
+class HandleBlock:
+    """
+    Preallocated, growable block of rows for one port handle
+    """
+    def __init__(self, port_handle, capacity):
+        self.port_handle = port_handle
+        self.rows = np.zeros(capacity, dtype=frame_dtype)
+        self.count = 0
+
+    def reserve(self, extra):
+        needed = self.count + extra
+        if(needed > len(self.rows)):
+            capacity = max(needed, 2 * len(self.rows))
+            rows = np.zeros(capacity, dtype=frame_dtype)
+            rows[:self.count] = self.rows[:self.count]
+            self.rows = rows
+
+    def view(self):
+        return self.rows[:self.count]
+
+
+class TrackingSession:
+    """
+    Columnar store for the frames of a tracking session, backed by NumPy structured arrays (frame_dtype).
+    Each port handle has its own block of rows that grows by doubling, so appending is amortized O(1) and no per-sample
+    Python objects are kept.
+    Slicing by handle and by time returns views, not copies. Views are only valid until the block grows again, copy them
+    (np.copy) to keep them while still appending.
+    Usage:
+        session = TrackingSession()
+        frames, since, dropped = stream.read(since)
+        session.extend(frames)
+        positions = session.handle("0A")["position"]
+    """
+    def __init__(self, initial_capacity=4096):
+        self.initial_capacity = initial_capacity
+        self.blocks = {}
+
+    def _block(self, port_handle):
+        block = self.blocks.get(port_handle)
+        if(block is None):
+            block = HandleBlock(port_handle, self.initial_capacity)
+            self.blocks[port_handle] = block
+        return block
+
+    def append(self, frame, host_time):
+        """
+        Appends one TrackingFrame (from NDI_Aurora.bx) received at host_time
+        """
+        for handle in frame.handles:
+            block = self._block(handle.port_handle)
+            if(block.count == len(block.rows)):
+                block.reserve(1)
+            block.rows[block.count] = (host_time, handle.frame_number, handle.handle_status, handle.port_status,
+                                       (handle.q0, handle.qx, handle.qy, handle.qz), (handle.tx, handle.ty, handle.tz), handle.error)
+            block.count += 1
+
+    def extend(self, frames):
+        """
+        Appends a list of (host_time, TrackingFrame), e.g. the frames returned by TrackingStream.read
+        Rows are gathered per handle first and written with one array assignment per handle.
+        """
+        columns = {}
+        for host_time, frame in frames:
+            for handle in frame.handles:
+                rows = columns.get(handle.port_handle)
+                if(rows is None):
+                    rows = columns[handle.port_handle] = []
+                rows.append((host_time, handle.frame_number, handle.handle_status, handle.port_status,
+                             (handle.q0, handle.qx, handle.qy, handle.qz), (handle.tx, handle.ty, handle.tz), handle.error))
+        for port_handle, rows in columns.items():
+            self.append_rows(port_handle, np.array(rows, dtype=frame_dtype))
+
+    def append_rows(self, port_handle, rows):
+        """
+        Appends a structured array of frame_dtype rows for one port handle
+        """
+        block = self._block(port_handle)
+        block.reserve(len(rows))
+        block.rows[block.count:block.count + len(rows)] = rows
+        block.count += len(rows)
+
+    def port_handles(self):
+        return list(self.blocks.keys())
+
+    def __len__(self):
+        return sum(block.count for block in self.blocks.values())
+
+    def nbytes(self):
+        """
+        Bytes allocated for all blocks, including unused capacity
+        """
+        return sum(block.rows.nbytes for block in self.blocks.values())
+
+    def handle(self, port_handle):
+        """
+        View of all rows of one port handle
+        """
+        return self._block(port_handle).view() if(port_handle in self.blocks) else np.zeros(0, dtype=frame_dtype)
+
+    def column(self, port_handle, name):
+        """
+        View of one column of one port handle, e.g. column("0A", "position") -> (n, 3) array
+        """
+        return self.handle(port_handle)[name]
+
+    def valid(self, port_handle):
+        """
+        Rows of one port handle with a valid transformation (boolean indexing, returns a copy)
+        """
+        rows = self.handle(port_handle)
+        return rows[rows["handle_status"] == HANDLE_VALID]
+
+    def port_status_flags(self, port_handle):
+        """
+        Decoded port status of every row of one port handle, structured bool array (AuroraPortStatus.port_status_dtype)
+        """
+        return port_status_array(self.column(port_handle, "port_status"))
+
+    def faults(self, port_handle, mask=PORT_FAULT_MASK):
+        """
+        Rows of one port handle with any bit of mask set in their port status, by default out of volume, partially out
+        of volume and sensor faults (boolean indexing, returns a copy)
+        """
+        rows = self.handle(port_handle)
+        return rows[(rows["port_status"] & mask) != 0]
+
+    def time_slice(self, port_handle, start=None, stop=None):
+        """
+        View of the rows of one port handle with start <= host_time < stop
+        Rows are appended in receive order, so the bounds are found by binary search.
+        """
+        rows = self.handle(port_handle)
+        times = rows["host_time"]
+        first = 0 if(start is None) else np.searchsorted(times, start, side="left")
+        last = len(rows) if(stop is None) else np.searchsorted(times, stop, side="left")
+        return rows[first:last]
+
+    def time_slices(self, start=None, stop=None):
+        """
+        time_slice for every port handle, returns {port handle: view}
+        """
+        return {port_handle: self.time_slice(port_handle, start, stop) for port_handle in self.blocks}
+
+    def trim(self):
+        """
+        Releases unused capacity, e.g. once the session is complete
+        """
+        for block in self.blocks.values():
+            block.rows = block.rows[:block.count].copy()
+
+    def save(self, path):
+        """
+        Saves the session as a .npz file, one array per port handle
+        """
+        np.savez(path, **{port_handle: block.view() for port_handle, block in self.blocks.items()})
+
+    @classmethod
+    def load(cls, path):
+        session = cls()
+        with np.load(path) as data:
+            for port_handle in data.files:
+                session.append_rows(port_handle, data[port_handle])
+        return session
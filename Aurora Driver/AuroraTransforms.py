@@ -0,0 +1,200 @@
+import numpy as np
+
+# Pose math on decoded frames, vectorized over any number of leading dimensions (frames, tools, ...).
+# Quaternions are (..., 4) arrays in the system's order Q0, Qx, Qy, Qz, positions are (..., 3) arrays in mm and poses are
+# (..., 4, 4) homogeneous matrices. Missing and disabled handles carry NaN, which propagates through every function.
+
+
+def normalize_quaternions(q):
+    """
+    Unit quaternions, (..., 4) -> (..., 4). Zero quaternions become NaN.
+    The system reports 4 to 5 significant digits, so its quaternions are only approximately unit length.
+    """
+    q = np.asarray(q, dtype=np.float64)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(norm > 0, q / norm, np.nan)
+
+
+def quaternions_to_matrices(q, normalize=True):
+    """
+    Rotation matrices of quaternions, (..., 4) -> (..., 3, 3)
+    """
+    if(normalize):
+        q = normalize_quaternions(q)
+    q = np.asarray(q, dtype=np.float64)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    rotation = np.empty(q.shape[:-1] + (3, 3))
+    rotation[..., 0, 0] = 1 - 2 * (yy + zz)
+    rotation[..., 0, 1] = 2 * (xy - wz)
+    rotation[..., 0, 2] = 2 * (xz + wy)
+    rotation[..., 1, 0] = 2 * (xy + wz)
+    rotation[..., 1, 1] = 1 - 2 * (xx + zz)
+    rotation[..., 1, 2] = 2 * (yz - wx)
+    rotation[..., 2, 0] = 2 * (xz - wy)
+    rotation[..., 2, 1] = 2 * (yz + wx)
+    rotation[..., 2, 2] = 1 - 2 * (xx + yy)
+    return rotation
+
+
+def matrices_to_quaternions(rotation):
+    """
+    Quaternions (Q0 >= 0) of rotation matrices, (..., 3, 3) or (..., 4, 4) -> (..., 4)
+    Each matrix uses the numerically stable branch for its largest diagonal term, selected with masks.
+    """
+    r = np.asarray(rotation, dtype=np.float64)[..., :3, :3]
+    m00, m11, m22 = r[..., 0, 0], r[..., 1, 1], r[..., 2, 2]
+    trace = m00 + m11 + m22
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Candidate for each branch, then pick per matrix
+        s0 = np.sqrt(np.maximum(1 + trace, 0)) * 2
+        s1 = np.sqrt(np.maximum(1 + m00 - m11 - m22, 0)) * 2
+        s2 = np.sqrt(np.maximum(1 + m11 - m00 - m22, 0)) * 2
+        s3 = np.sqrt(np.maximum(1 + m22 - m00 - m11, 0)) * 2
+        candidates = np.stack([
+            np.stack([s0 / 4, (r[..., 2, 1] - r[..., 1, 2]) / s0, (r[..., 0, 2] - r[..., 2, 0]) / s0, (r[..., 1, 0] - r[..., 0, 1]) / s0], axis=-1),
+            np.stack([(r[..., 2, 1] - r[..., 1, 2]) / s1, s1 / 4, (r[..., 0, 1] + r[..., 1, 0]) / s1, (r[..., 0, 2] + r[..., 2, 0]) / s1], axis=-1),
+            np.stack([(r[..., 0, 2] - r[..., 2, 0]) / s2, (r[..., 0, 1] + r[..., 1, 0]) / s2, s2 / 4, (r[..., 1, 2] + r[..., 2, 1]) / s2], axis=-1),
+            np.stack([(r[..., 1, 0] - r[..., 0, 1]) / s3, (r[..., 0, 2] + r[..., 2, 0]) / s3, (r[..., 1, 2] + r[..., 2, 1]) / s3, s3 / 4], axis=-1)
+        ], axis=-2)
+    branch = np.argmax(np.stack([trace, m00, m11, m22], axis=-1), axis=-1)
+    q = np.take_along_axis(candidates, branch[..., None, None], axis=-2)[..., 0, :]
+    # NaN matrices pick branch 0, keep them NaN
+    q[np.isnan(trace)] = np.nan
+    return np.where(q[..., :1] < 0, -q, q)
+
+
+def poses_to_matrices(q, t, normalize=True):
+    """
+    Homogeneous transformations of quaternions and positions, (..., 4) and (..., 3) -> (..., 4, 4)
+    """
+    q = np.asarray(q, dtype=np.float64)
+    poses = np.zeros(q.shape[:-1] + (4, 4))
+    poses[..., :3, :3] = quaternions_to_matrices(q, normalize)
+    poses[..., :3, 3] = t
+    poses[..., 3, 3] = 1
+    return poses
+
+
+def matrices_to_poses(poses):
+    """
+    Quaternions and positions of homogeneous transformations, (..., 4, 4) -> (..., 4), (..., 3)
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    return matrices_to_quaternions(poses), poses[..., :3, 3].copy()
+
+
+def invert_poses(poses):
+    """
+    Inverses of rigid transformations, (..., 4, 4) -> (..., 4, 4), using R^T and -R^T t instead of a general inverse
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    rotation_t = np.swapaxes(poses[..., :3, :3], -1, -2)
+    inverse = np.zeros_like(poses)
+    inverse[..., :3, :3] = rotation_t
+    inverse[..., :3, 3] = -np.einsum("...ij,...j->...i", rotation_t, poses[..., :3, 3])
+    inverse[..., 3, 3] = 1
+    return inverse
+
+
+def compose(*poses):
+    """
+    Product of transformations, left to right, broadcasting over leading dimensions.
+    E.g. compose(registration, tool_poses, tip_calibration) maps tool tip coordinates to image coordinates.
+    """
+    result = np.asarray(poses[0], dtype=np.float64)
+    for pose in poses[1:]:
+        result = np.matmul(result, pose)
+    return result
+
+
+def transform_points(poses, points):
+    """
+    Applies transformations to points, (..., 4, 4) and (..., 3) -> (..., 3)
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    return np.einsum("...ij,...j->...i", poses[..., :3, :3], points) + poses[..., :3, 3]
+
+
+def relative_poses(tool_poses, reference_poses):
+    """
+    Tool poses in the coordinates of a reference tool: inverse(reference) x tool
+    tool_poses: (N, M, 4, 4) for N frames and M tools, reference_poses: (N, 4, 4) from the same frames
+    Returns (N, M, 4, 4). Frames where the reference is missing are NaN.
+    """
+    return np.matmul(invert_poses(reference_poses)[..., None, :, :], tool_poses)
+
+
+def quaternion_multiply(a, b):
+    """
+    Hamilton product of quaternions, (..., 4) x (..., 4) -> (..., 4)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    aw, ax, ay, az = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    bw, bx, by, bz = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw
+    ], axis=-1)
+
+
+def quaternion_conjugate(q):
+    q = np.array(q, dtype=np.float64)
+    q[..., 1:] *= -1
+    return q
+
+
+def relative_quaternion_poses(tool_q, tool_t, reference_q, reference_t):
+    """
+    Same as relative_poses without building matrices, the cheaper choice when only quaternions and positions are needed
+    tool_q (N, M, 4), tool_t (N, M, 3), reference_q (N, 4), reference_t (N, 3) -> (N, M, 4), (N, M, 3)
+    """
+    reference_inverse = quaternion_conjugate(normalize_quaternions(reference_q))[..., None, :]
+    q = quaternion_multiply(reference_inverse, normalize_quaternions(tool_q))
+    rotation = quaternions_to_matrices(reference_inverse, normalize=False)
+    t = np.einsum("...ij,...j->...i", rotation, np.asarray(tool_t) - np.asarray(reference_t)[..., None, :])
+    return q, t
+
+
+def reference_port_handle(port_handle_table):
+    """
+    Port handle of the static reference tool (enabled with tool tracking priority "S") in the table returned by
+    NDI_Aurora.bring_up_tools, None if there is none
+    """
+    for port_handle, info in port_handle_table.items():
+        if(info.enabled and info.tool_tracking_priority == "S"):
+            return port_handle
+    return None
+
+
+def session_poses(session, port_handles):
+    """
+    Pose arrays of several port handles of an AuroraTrackingSession.TrackingSession, aligned on the frames that contain
+    all of them (rows of one frame share its host time).
+    Returns host_time (N,), quaternions (N, M, 4), positions (N, M, 3) and the handle status (N, M), in port_handles order
+    """
+    rows = [session.handle(port_handle) for port_handle in port_handles]
+    times = rows[0]["host_time"]
+    for handle_rows in rows[1:]:
+        times = np.intersect1d(times, handle_rows["host_time"], assume_unique=True)
+    selected = [handle_rows[np.searchsorted(handle_rows["host_time"], times)] for handle_rows in rows]
+    quaternions = np.stack([handle_rows["quaternion"] for handle_rows in selected], axis=1)
+    positions = np.stack([handle_rows["position"] for handle_rows in selected], axis=1)
+    status = np.stack([handle_rows["handle_status"] for handle_rows in selected], axis=1)
+    return times, quaternions, positions, status
+
+
+def session_relative_poses(session, reference, port_handles):
+    """
+    Poses of port_handles relative to the reference port handle for every frame of a session that contains all of them
+    Returns host_time (N,) and (N, M, 4, 4) relative poses
+    """
+    times, quaternions, positions, _ = session_poses(session, [reference] + list(port_handles))
+    poses = poses_to_matrices(quaternions, positions)
+    return times, relative_poses(poses[:, 1:], poses[:, 0])
@@ -0,0 +1,274 @@
+"""
+Benchmarks for the Aurora driver against the simulated system (AuroraSimulator.VirtualAurora).
+
+Measures:
+    - send_command round trip latency (p50, p99, max) at each baud rate
+    - parsing cost per frame for BX and TX, and for TX in batches
+    - CRC16 cost
+    - reply framing: ReplyFramer per reply, and SerialReader against pyserial's read_until() on a pseudo terminal (POSIX)
+    - end-to-end tracking frames per second for 1, 4 and 8 enabled port handles at each baud rate COMM supports
+
+Results are written as JSON so runs can be compared between commits:
+    python aurora_benchmark.py --output before.json
+    python aurora_benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from AuroraDriver import NDI_Aurora
+from AuroraSimulator import VirtualAurora, comm_baud_rates
+from AuroraBX import bx_reply_decode, bx_reply_encode, read_bx_reply
+from AuroraFraming import ReplyFramer, SerialReader
+from AuroraTX import tx_reply_decode, tx_reply_decode_batch, tx_reply_encode
+from AuroraCRC16 import crc16, check_reply
+
+HANDLE_COUNTS = [1, 4, 8]
+
+
+def percentiles(samples):
+    """
+    p50, p99 and max of a list of durations in seconds, reported in microseconds
+    """
+    ordered = sorted(samples)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1e6
+    return {
+        "count": len(ordered),
+        "p50_us": pick(0.50),
+        "p99_us": pick(0.99),
+        "max_us": ordered[-1] * 1e6,
+        "mean_us": sum(ordered) / len(ordered) * 1e6
+    }
+
+
+def time_per_call(function, min_time=0.2):
+    """
+    Average seconds per call of function(), repeated for at least min_time seconds
+    """
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while(elapsed < min_time):
+        for _ in range(100):
+            function()
+        calls += 100
+        elapsed = time.perf_counter() - start
+    return elapsed / calls
+
+
+def connect(num_tools, baud_code="0", throttle=True):
+    """
+    Returns an NDI_Aurora on a simulated system with num_tools enabled and tracking started at the given COMM baud rate
+    """
+    sim = VirtualAurora(num_tools=num_tools, throttle=throttle, frame_rate=None, seed=0)
+    ndi_obj = NDI_Aurora(serial_port=sim.port, ser=sim)
+    if(baud_code != "0"):
+        ndi_obj.comm(baud_rate=baud_code)
+        sim.baudrate = comm_baud_rates[baud_code]
+    ndi_obj.init()
+    ndi_obj.bring_up_tools()
+    ndi_obj.tstart()
+    return ndi_obj
+
+
+def bench_command_latency(duration):
+    results = {}
+    for baud_code, baud_rate in sorted(comm_baud_rates.items(), key=lambda item: item[1]):
+        ndi_obj = connect(1, baud_code)
+        samples = []
+        end = time.perf_counter() + duration
+        while(time.perf_counter() < end):
+            start = time.perf_counter()
+            ndi_obj.send_command("ECHO Testing!\r")
+            samples.append(time.perf_counter() - start)
+        results[str(baud_rate)] = percentiles(samples)
+    return results
+
+
+def bench_parsing():
+    results = {}
+    for num_tools in HANDLE_COUNTS:
+        sim = VirtualAurora(num_tools=num_tools, frame_rate=None)
+        for tool in sim.tools:
+            tool.assigned = tool.initialized = tool.enabled = True
+        handles = sim._handle_transforms()
+        reply = bx_reply_encode(handles)
+        results[f"bx_{num_tools}_handles"] = {
+            "bytes": len(reply),
+            "us_per_frame": time_per_call(lambda: bx_reply_decode(reply)) * 1e6,
+            "us_per_frame_no_crc": time_per_call(lambda: bx_reply_decode(reply, check_crc=False)) * 1e6
+        }
+        text_reply = tx_reply_encode(handles)
+        batch = [text_reply] * 100
+        results[f"tx_{num_tools}_handles"] = {
+            "bytes": len(text_reply),
+            "us_per_frame": time_per_call(lambda: tx_reply_decode(text_reply)) * 1e6,
+            "us_per_frame_no_crc": time_per_call(lambda: tx_reply_decode(text_reply, check_crc=False)) * 1e6,
+            "us_per_frame_batch_100": time_per_call(lambda: tx_reply_decode_batch(batch)) / len(batch) * 1e6
+        }
+    return results
+
+
+def bench_crc():
+    results = {}
+    for size in [8, 64, 256, 1024]:
+        data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+        seconds = time_per_call(lambda: crc16(data))
+        results[f"crc16_{size}_bytes"] = {"us_per_call": seconds * 1e6, "ns_per_byte": seconds / size * 1e9}
+    reply = b"OKAYA896\r"
+    results["check_reply_okay"] = {"us_per_call": time_per_call(lambda: check_reply(reply)) * 1e6}
+    return results
+
+
+def bench_framing():
+    results = {}
+    framer = ReplyFramer()
+    def frame(reply):
+        framer.feed(reply)
+        framer.next_reply()
+    text_reply = b"OKAYA896\r"
+    results["framer_text"] = {"bytes": len(text_reply), "us_per_reply": time_per_call(lambda: frame(text_reply)) * 1e6}
+    replies = {"text": text_reply}
+    for num_tools in HANDLE_COUNTS:
+        sim = VirtualAurora(num_tools=num_tools, frame_rate=None)
+        for tool in sim.tools:
+            tool.assigned = tool.initialized = tool.enabled = True
+        reply = bx_reply_encode(sim._handle_transforms())
+        replies[f"bx_{num_tools}_handles"] = reply
+        results[f"framer_bx_{num_tools}_handles"] = {
+            "bytes": len(reply),
+            "us_per_reply": time_per_call(lambda: frame(reply)) * 1e6
+        }
+    results.update(bench_serial_reads(replies))
+    return results
+
+
+def bench_serial_reads(replies):
+    """
+    Reads each reply from a pseudo terminal, through SerialReader and through the unbuffered pyserial calls it replaced
+    (read_until() for text, AuroraBX.read_bx_reply for BX). Skipped where there are no pseudo terminals.
+    """
+    if(not hasattr(os, "openpty")):
+        return {}
+    import serial
+    master, slave = os.openpty()
+    ser = serial.Serial(os.ttyname(slave), timeout=1.0)
+    reader = SerialReader(ser)
+    results = {}
+    try:
+        for name, reply in replies.items():
+            def buffered():
+                os.write(master, reply)
+                reader.read_reply()
+            def unbuffered():
+                os.write(master, reply)
+                if(name == "text"):
+                    ser.read_until(b'\r')
+                else:
+                    read_bx_reply(ser)
+            buffered_us = time_per_call(buffered) * 1e6
+            unbuffered_us = time_per_call(unbuffered) * 1e6
+            results[f"pty_{name}"] = {
+                "bytes": len(reply),
+                "serial_reader_us": buffered_us,
+                "pyserial_us": unbuffered_us,
+                "speedup": unbuffered_us / buffered_us
+            }
+    finally:
+        ser.close()
+        os.close(master)
+    return results
+
+
+def bench_frame_rate(duration):
+    results = {}
+    for num_tools in HANDLE_COUNTS:
+        for baud_code, baud_rate in sorted(comm_baud_rates.items(), key=lambda item: item[1]):
+            ndi_obj = connect(num_tools, baud_code)
+            frames = 0
+            start = time.perf_counter()
+            end = start + duration
+            while(time.perf_counter() < end):
+                if(ndi_obj.bx() is not None):
+                    frames += 1
+            elapsed = time.perf_counter() - start
+            results[f"{num_tools}_handles_{baud_rate}"] = {
+                "handles": num_tools,
+                "baud_rate": baud_rate,
+                "frames_per_second": frames / elapsed
+            }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(duration=1.0, sections=None):
+    benchmarks = {
+        "command_latency": lambda: bench_command_latency(duration),
+        "parsing": bench_parsing,
+        "crc": bench_crc,
+        "framing": bench_framing,
+        "frame_rate": lambda: bench_frame_rate(duration)
+    }
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "duration_s": duration
+        }
+    }
+    for name, benchmark in benchmarks.items():
+        if(sections is None or name in sections):
+            print(f"Running {name} ...")
+            results[name] = benchmark()
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints every numeric metric that is present in both runs with its relative change
+    """
+    def flatten(tree, prefix=""):
+        flat = {}
+        for key, value in tree.items():
+            if(isinstance(value, dict)):
+                flat.update(flatten(value, f"{prefix}{key}."))
+            elif(isinstance(value, (int, float)) and not isinstance(value, bool)):
+                flat[f"{prefix}{key}"] = value
+        return flat
+    new = flatten({k: v for k, v in results.items() if k != "meta"})
+    old = flatten({k: v for k, v in baseline.items() if k != "meta"})
+    print(f"Comparing {results['meta'].get('commit')} against {baseline.get('meta', {}).get('commit')}")
+    for key in sorted(new):
+        if(key in old and old[key]):
+            change = (new[key] - old[key]) / old[key] * 100.0
+            print(f"{key:<60} {old[key]:>14.2f} -> {new[key]:>14.2f} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aurora driver benchmarks against the simulated system")
+    parser.add_argument("--output", default="aurora_benchmark.json", help="JSON results file")
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds per latency and frame rate measurement")
+    parser.add_argument("--only", nargs="+", choices=["command_latency", "parsing", "crc", "framing", "frame_rate"], help="run only these sections")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = run(args.duration, args.only)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if(args.compare):
+        with open(args.compare) as f:
+            compare(results, json.load(f))
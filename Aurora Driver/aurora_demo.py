@@ -1,4 +1,5 @@
 import AuroraDriver
+from AuroraCapabilities import ProfileStore, load_device_profile
 
 os_type = AuroraDriver.HelperClass.get_os()
 
@@ -15,12 +16,12 @@ elif(os_type == "Mac"):
 
 
 def startup_sequence():
-    ndi_obj.comm()
-    ndi_obj.beep()
-    ndi_obj.api_rev()
-    ndi_obj.ver()
-    ndi_obj.init()
+    # One VER 4 query when the stored profile of this system is still valid, APIREV, VER and SFLIST otherwise
+    load_device_profile(ndi_obj, ProfileStore())
+    if(not ndi_obj.get_init_flag()):
+        ndi_obj.init()
     # ndi_obj.phsr()
+    # ndi_obj.bring_up_tools()
 
 ### working commands
 # ndi_obj.comm()
@@ -32,15 +33,13 @@ def startup_sequence():
 # ndi_obj.init()
 # ndi_obj.get()
 # ndi_obj.phsr()
+# ndi_obj.reset()
 
 ### partially working commands 
 # ndi_obj.bx()
 # ndi_obj.tstop()
 # ndi_obj.led()
 
-### not working commands
-# ndi_obj.reset()
-
 ### untested commands
 
 # AuroraDriver.NDI_Aurora.reply_decoder(self=None, reply="ERROR133A42", command="PINIT 0A")
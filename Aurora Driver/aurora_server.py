@@ -0,0 +1,63 @@
+"""
+Network streaming server: owns the NDI_Aurora connection and streams decoded poses to clients on other machines.
+
+    python aurora_server.py --serial-port COM3 --host 0.0.0.0 --port 8765 --udp-port 8766 --igtl-port 18944
+    python aurora_server.py --simulate 4            # simulated system with 4 tools, for testing over localhost
+
+Clients use AuroraServer.TrackingClient (binary framing over TCP or UDP) or any OpenIGTLink client on --igtl-port.
+"""
+import argparse
+import json
+import time
+
+from AuroraDriver import NDI_Aurora
+from AuroraServer import TrackingServer, IGTL_PORT
+
+
+def connect(args):
+    """
+    Opens the system (or a simulated one), initializes it and enables every tool
+    """
+    if(args.simulate):
+        from AuroraSimulator import VirtualAurora
+        sim = VirtualAurora(num_tools=args.simulate)
+        ndi_obj = NDI_Aurora(serial_port=sim.port, ser=sim)
+    else:
+        ndi_obj = NDI_Aurora(serial_port=args.serial_port, baudrate=args.baudrate)
+    ndi_obj.init()
+    port_handles = ndi_obj.bring_up_tools()
+    print(f"Enabled port handles: {[ph for ph, info in port_handles.items() if(info.enabled)]}")
+    return ndi_obj
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream Aurora tracking data to network clients")
+    parser.add_argument("--serial-port", help="serial port of the system, e.g. COM3 or /dev/ttyUSB0")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--simulate", type=int, default=0, metavar="TOOLS", help="use a simulated system with this many tools")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on, 0.0.0.0 for every interface")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port, binary framing")
+    parser.add_argument("--udp-port", type=int, help="UDP port, binary framing")
+    parser.add_argument("--igtl-port", type=int, nargs="?", const=IGTL_PORT, help=f"TCP port for OpenIGTLink clients ({IGTL_PORT} if no value is given)")
+    parser.add_argument("--rate", type=float, help="default maximum frames per second per client")
+    parser.add_argument("--batch", type=int, default=1, help="default frames per packet")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="seconds between statistics printouts, 0 to disable")
+    args = parser.parse_args()
+    if(not args.simulate and not args.serial_port):
+        parser.error("--serial-port or --simulate is required")
+
+    ndi_obj = connect(args)
+    server = TrackingServer(ndi_obj, host=args.host, port=args.port, udp_port=args.udp_port, igtl_port=args.igtl_port,
+                            rate=args.rate, batch=args.batch)
+    server.start()
+    print(f"Streaming on {args.host}: TCP {server.port}, UDP {server.udp_port}, OpenIGTLink {server.igtl_port}")
+    try:
+        while(True):
+            time.sleep(args.stats_interval if(args.stats_interval > 0) else 3600)
+            if(args.stats_interval > 0):
+                print(json.dumps(server.get_stats()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        ndi_obj.close()
@@ -0,0 +1,65 @@
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Aurora Driver"))
+from AuroraCRC16 import crc16, crc16_batch, check_reply, check_reply_batch
+
+def calc_crc16(data, crc16_value=0):
+    """
+    Line by line port of CalcCRC16 in Helper/CalcCRC16.cpp
+    """
+    oddparity = [0, 1, 1, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0, 1, 1, 0]
+    for ch in data:
+        ch = (ch ^ (crc16_value & 0xff)) & 0xff
+        crc16_value >>= 8
+        if(oddparity[ch & 0x0f] ^ oddparity[ch >> 4]):
+            crc16_value ^= 0xc001
+        ch <<= 6
+        crc16_value ^= ch
+        ch <<= 1
+        crc16_value ^= ch
+    return crc16_value
+
+def run_cpp(data_str):
+    """
+    Compiles and runs Helper/CalcCRC16.cpp with a different data string, if a C++ compiler is available
+    """
+    compiler = shutil.which("g++") or shutil.which("clang++")
+    if(compiler is None):
+        return None
+    source = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "CalcCRC16.cpp")).read()
+    source = source.replace('"RESET"', f'"{data_str}"').replace("0xFFFF", "0")
+    with tempfile.TemporaryDirectory() as tmp:
+        cpp_path = os.path.join(tmp, "CalcCRC16.cpp")
+        exe_path = os.path.join(tmp, "CalcCRC16")
+        open(cpp_path, "w").write(source)
+        subprocess.check_call([compiler, cpp_path, "-o", exe_path])
+        output = subprocess.check_output([exe_path]).decode()
+    return int(output.split(" is ")[-1].strip(".\n"))
+
+# Documented replies from the API guide, CRC16 starts at 0
+replies = ["OKAYA896", "RESETBE6F", "Testing!A81C", "040A01F0B01F0C01F0D01F2DDB", "001414", "010A001C1B5", "Info.Timeout.PINIT=5A6C2"]
+for r in replies:
+    print(f"{r:<30} -> check_reply: {check_reply(r)}")
+
+# Random data, table driven vs CalcCRC16 port
+rng = random.Random(0)
+frames = [bytes(rng.randrange(256) for _ in range(rng.randrange(1, 96))) for _ in range(2000)]
+mismatches = sum(crc16(f) != calc_crc16(f) for f in frames)
+# Running value carried over from a previous call, as HelperClass.calc_crc16 does
+mismatches += sum(crc16(memoryview(bytearray(f)), 0xFFFF) != calc_crc16(f, 0xFFFF) for f in frames)
+print(f"Random frames: {len(frames)}, mismatches: {mismatches}")
+
+batch = crc16_batch(frames)
+print(f"crc16_batch mismatches: {sum(int(c) != calc_crc16(f) for c, f in zip(batch, frames))}")
+print(f"check_reply_batch: {check_reply_batch(replies).all()}")
+
+cpp_crc = run_cpp("RESET")
+if(cpp_crc is None):
+    print("No C++ compiler found, skipping CalcCRC16.cpp")
+else:
+    print(f"CalcCRC16.cpp 'RESET' = {cpp_crc:04X} | AuroraCRC16 = {crc16('RESET'):04X}")
@@ -5,7 +5,7 @@ def install(package):
     subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
 # Add the libraries you want to install to this list
-libraries = ["pyserial"]
+libraries = ["pyserial", "numpy"]
 
 for library in libraries:
     install(library)